@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmarks: whole legends runs against a local bare remote.
+
+    python benchmarks/macro.py                       # 10, 1k and 10k timeline events
+    python benchmarks/macro.py --sizes 10,1000 --save
+    python benchmarks/macro.py --backend fast-import
+
+Every run gets a scratch directory with the local GitHub stand-in
+(`legends.fakegh`) first on PATH as `gh`, so `create-repo` creates a bare
+repository there and PRs are kept in a JSON file; nothing talks to GitHub. Two workloads are timed:
+
+- `commands`: one `legends` process per step, the way the Makefile drives
+  it (create-repo, create-branch, commit, open-pr, merge-pr, commit-all);
+- `timeline-N`: `run-timeline` on N generated JSONL events.
+
+For each one the wall time, the processes legends spawned and the bytes
+added to the working repository and its remote are reported per event.
+`--save` writes benchmarks/baselines/macro/<version>.json; later runs are
+compared with the newest saved release.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from legends import fakegh  # noqa: E402
+from legends.generate import ActivityModel, generate_events, write_jsonl  # noqa: E402
+
+BASELINES = ROOT / "benchmarks" / "baselines" / "macro"
+DEFAULT_SIZES = "10,1000,10000"
+DEFAULT_THRESHOLD = 0.25
+REPO = "bench"
+METRICS = ("ms/event", "procs/event", "bytes/event")
+
+
+class Sandbox:
+    """A scratch directory holding the fake gh, its state, the remote and the working repo."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.bin = root / "bin"
+        fakegh.install(self.bin, home=root / "github")
+        home = root / "home"
+        home.mkdir()
+        (home / ".gitconfig").write_text(
+            "[user]\n\tname = Bench Mark\n\temail = bench@example.com\n"
+            "[init]\n\tdefaultBranch = main\n",
+            encoding="utf-8",
+        )
+        self.env = {
+            **os.environ,
+            "PATH": f"{self.bin}{os.pathsep}{os.environ.get('PATH', '')}",
+            "PYTHONPATH": str(ROOT / "src"),
+            "HOME": str(home),
+            "GH_TOKEN": "fake",
+            "LEGENDS_CACHE_DIR": str(root / "cache"),
+            "GIT_CONFIG_NOSYSTEM": "1",
+            "GIT_CONFIG_GLOBAL": str(home / ".gitconfig"),
+            # Time legends' own work, not the pacing it applies for GitHub's limits.
+            "GHB_GH_WRITES_PER_MINUTE": "0",
+        }
+        for key in ("GHB_CONFIG", "GHB_DRY_RUN", "GH_HOST"):
+            self.env.pop(key, None)
+        self.spawned = 0
+
+    @property
+    def repo(self) -> Path:
+        return self.root / REPO
+
+    def legends(self, *argv: str, cwd: Optional[Path] = None) -> None:
+        """Run one legends process; count the processes it spawned itself."""
+        stats = self.root / "stats.json"
+        cmd = [sys.executable, __file__, "--child", str(stats), "--", *argv]
+        r = subprocess.run(cmd, cwd=cwd or self.root, env=self.env, capture_output=True, text=True)
+        if r.returncode != 0:
+            raise SystemExit(f"legends {' '.join(argv)} failed ({r.returncode}):\n{r.stderr}")
+        self.spawned += sum(json.loads(stats.read_text(encoding="utf-8")).values())
+
+    def disk_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.root.rglob("*") if p.is_file())
+
+
+def _child(stats: str, argv: list[str]) -> int:
+    """Run legends in this process, then leave its spawn counts in `stats`."""
+    from legends import cli
+    from legends.executor import default_executor
+
+    sys.argv = ["legends", *argv]
+    try:
+        return cli.main()
+    finally:
+        spawned = default_executor().stats.spawned
+        Path(stats).write_text(json.dumps(dict(spawned)), encoding="utf-8")
+
+
+def _measure(sandbox: Sandbox, events: int, run) -> dict:
+    before = sandbox.disk_bytes()
+    t0 = time.perf_counter()
+    run()
+    wall = time.perf_counter() - t0
+    grown = sandbox.disk_bytes() - before
+    return {
+        "events": events,
+        "ms/event": wall * 1000 / events,
+        "procs/event": sandbox.spawned / events,
+        "bytes/event": grown / events,
+    }
+
+
+def commands(sandbox: Sandbox) -> dict:
+    """Makefile-style run: one process per step, ending with a commit-all."""
+    repo = sandbox.repo
+    steps: list[tuple[str, ...]] = []
+    for i in range(2):
+        b = f"feature/f{i}"
+        steps += [
+            ("create-branch", b, "--date", f"2025-02-0{2 * i + 1}T09:00:00"),
+            ("commit", "--branch", b, "--date", f"2025-02-0{2 * i + 1}T10:00:00",
+             "--message", f"feat: f{i}", "--touch", f"f{i}.txt"),
+            ("open-pr", "--branch", b, "--title", f"F{i}"),
+            ("merge-pr", "--branch", b, "--date", f"2025-02-0{2 * i + 2}T09:00:00"),
+        ]  # fmt: skip
+    steps.append(
+        ("commit-all", "--branch", "feature/f2", "--commit-date", "2025-02-06T10:00:00",
+         "--message", "feat: f2", "--merge-date", "2025-02-07T10:00:00")
+    )  # fmt: skip
+
+    def run() -> None:
+        sandbox.legends("-v", "create-repo", REPO, "--date", "2025-02-01T08:00:00")
+        for argv in steps:
+            sandbox.legends("-v", *argv, cwd=repo)
+
+    return _measure(sandbox, 1 + len(steps), run)
+
+
+def timeline(sandbox: Sandbox, backend: str, size: int) -> dict:
+    """`run-timeline` on the first `size` events of a seeded synthetic history."""
+    path = sandbox.root / "timeline.jsonl"
+    model = ActivityModel(start=date(2015, 1, 5), end=date(2045, 1, 1), seed=size)
+    events = generate_events(model, repo=REPO)
+    with path.open("w", encoding="utf-8") as out:
+        # The header plus `size` events.
+        write_jsonl((ev for _, ev in zip(range(size + 1), events)), out)
+
+    def run() -> None:
+        sandbox.legends("run-timeline", str(path), "--backend", backend)
+
+    return _measure(sandbox, size, run)
+
+
+def run(sizes: list[int], backend: str, keep: bool) -> dict:
+    workloads = [("commands", commands)]
+    workloads += [(f"timeline-{n}", lambda s, n=n: timeline(s, backend, n)) for n in sizes]
+    results = {}
+    for name, fn in workloads:
+        root = Path(tempfile.mkdtemp(prefix=f"legends-{name}-"))
+        try:
+            results[name] = fn(Sandbox(root))
+        finally:
+            if keep:
+                print(f"kept {root}", file=sys.stderr)
+            else:
+                shutil.rmtree(root, ignore_errors=True)
+        r = results[name]
+        print(
+            f"{name:<16} {r['events']:>7} events  {r['ms/event']:>8.2f} ms/event  "
+            f"{r['procs/event']:>6.2f} procs/event  {r['bytes/event']:>9.0f} bytes/event",
+            flush=True,
+        )
+    return {
+        "version": project_version(),
+        "backend": backend,
+        "git": subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "recorded": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+def project_version() -> str:
+    text = (ROOT / "pyproject.toml").read_text(encoding="utf-8")
+    m = re.search(r'^version\s*=\s*"([^"]+)"', text, re.MULTILINE)
+    return m.group(1) if m else "0.0.0"
+
+
+def _latest_baseline() -> Optional[Path]:
+    def key(p: Path):
+        return tuple(int(x) if x.isdigit() else x for x in re.split(r"[.\-]", p.stem))
+
+    found = sorted(BASELINES.glob("*.json"), key=key)
+    return found[-1] if found else None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print per-event changes and return the metrics that grew beyond `threshold`."""
+    print(f"baseline {baseline['version']} ({baseline['recorded']}, backend {baseline['backend']})")
+    worse = []
+    for name, r in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        cells = []
+        for metric in METRICS:
+            change = r[metric] / base[metric] - 1 if base[metric] else 0.0
+            cells.append(f"{metric} {change:>+6.0%}")
+            if change > threshold:
+                worse.append(f"{name} {metric}")
+        print(f"{name:<16} " + "  ".join(cells))
+    return worse
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        return _child(argv[1], argv[3:])
+
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help="Timeline sizes in events (comma list).")
+    p.add_argument(
+        "--backend",
+        default="steps",
+        choices=["steps", "dag", "worktree", "fast-import", "two-phase"],
+        help="run-timeline backend.",
+    )  # fmt: skip
+    p.add_argument("--save", action="store_true", help="Write the results for this version.")
+    p.add_argument("--baseline", help="Version (or JSON path) to compare with (default: latest).")
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed growth per event before failing (default {DEFAULT_THRESHOLD:.0%}%).",
+    )
+    p.add_argument("--keep", action="store_true", help="Keep the scratch directories.")
+    ns = p.parse_args(argv)
+
+    sizes = [int(s) for s in ns.sizes.split(",") if s.strip()]
+    current = run(sizes, ns.backend, ns.keep)
+
+    if ns.save:
+        BASELINES.mkdir(parents=True, exist_ok=True)
+        out = BASELINES / f"{current['version']}.json"
+        out.write_text(json.dumps(current, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"saved {out.relative_to(ROOT)}")
+        return 0
+
+    path = Path(ns.baseline) if ns.baseline and Path(ns.baseline).suffix else None
+    if ns.baseline and path is None:
+        path = BASELINES / f"{ns.baseline}.json"
+    path = path or _latest_baseline()
+    if path is None or not path.exists():
+        print("no baseline to compare with (use --save)")
+        return 0
+    worse = compare(current, json.loads(path.read_text(encoding="utf-8")), ns.threshold)
+    if worse:
+        print(f"{len(worse)} metric(s) over {ns.threshold:.0%}: {', '.join(worse)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the pure-Python code that runs once per event.
+
+    python benchmarks/micro.py                  # compare with the baseline of this version
+    python benchmarks/micro.py --save           # write benchmarks/baselines/<version>.json
+    python benchmarks/micro.py --baseline 0.2.0 --threshold 0.2 -k date
+
+Each timing is the best of several interleaved rounds, compared after
+dividing it by a fixed pure-Python calibration loop timed alongside it; that
+cancels most of the drift of a busy machine and keeps a baseline from one
+machine roughly usable on another.
+Exit status is 1 when any benchmark is slower than its baseline by more
+than the threshold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import re
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from legends import cli, templates  # noqa: E402
+from legends.config import load_config  # noqa: E402
+from legends.core import dates  # noqa: E402
+from legends.timeline import stream_plan  # noqa: E402
+from legends.utils import build_commit_env  # noqa: E402
+
+BASELINES = ROOT / "benchmarks" / "baselines"
+DEFAULT_THRESHOLD = 0.25
+
+# name -> factory returning the zero-argument callable to time
+BENCHES: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def bench(name: str):
+    def register(factory):
+        BENCHES[name] = factory
+        return factory
+
+    return register
+
+
+def _calibration() -> Callable[[], object]:
+    data = list(range(200))
+    return lambda: sum(x * 2 for x in data if x & 1)
+
+
+def _distinct_dates(n: int = 100_000) -> list[str]:
+    """More distinct strings than the parse cache holds, so every call in a cycle misses."""
+    t0 = datetime(2015, 1, 1, 9, 0, 0)
+    return [(t0 + timedelta(minutes=7 * i)).strftime("%Y-%m-%d %H:%M:%S") for i in range(n)]
+
+
+@bench("dates.normalize_git_date[cached]")
+def _normalize_cached():
+    return lambda: dates.normalize_git_date("2025-02-10 15:00:00")
+
+
+@bench("dates.normalize_git_date[cold]")
+def _normalize_cold():
+    it = itertools.cycle(_distinct_dates())
+    return lambda: dates.normalize_git_date(next(it))
+
+
+@bench("dates.normalize_git_date[cold,tz]")
+def _normalize_cold_tz():
+    it = itertools.cycle(_distinct_dates())
+    return lambda: dates.normalize_git_date(next(it), "Europe/Berlin")
+
+
+@bench("utils.build_commit_env")
+def _env_utils():
+    env = dict(os.environ)
+    return lambda: build_commit_env(
+        env,
+        date="2025-02-10T15:00:00Z",
+        author_name="Ann",
+        author_email="ann@example.com",
+        committer_name="bot",
+        committer_email="bot@example.com",
+    )
+
+
+@bench("core.dates.build_commit_env")
+def _env_core():
+    return lambda: dates.build_commit_env(
+        "2025-02-10T15:00:00Z", author_name="Ann", author_email="ann@example.com"
+    )
+
+
+@bench("templates.render_merge_message")
+def _render_merge():
+    return lambda: templates.render_merge_message(base="main", branch="feature/x", pr_number=42)
+
+
+@bench("templates.render_pr_body")
+def _render_pr_body():
+    return lambda: templates.render_pr_body(
+        summary="Add login", branch="feature/login", base="main", date="2025-02-10"
+    )
+
+
+@bench("templates.render_many[commit_message,per row]")
+def _render_many():
+    rows = [
+        {"type": "feat", "branch": f"b{i}", "summary": "change", "date": "2025-02-10"}
+        for i in range(1000)
+    ]
+    tset = templates.templates()
+    # Reported per row: the registry divides by `per_call`.
+    return lambda: tset.render_many("commit_message", rows)
+
+
+_render_many.per_call = 1000  # type: ignore[attr-defined]
+
+
+@bench("config.load_config[env only]")
+def _config_env():
+    return lambda: load_config(None)
+
+
+@bench("config.load_config[defaults.yaml]")
+def _config_yaml():
+    path = str(ROOT / "config" / "defaults.yaml")
+    return lambda: load_config(path)
+
+
+@bench("cli._parse_args[commit]")
+def _parse_args():
+    argv = [
+        "legends", "commit", "--branch", "feature/x", "--date", "2025-02-10T15:00:00",
+        "--message", "feat: x", "--allow-empty",
+    ]  # fmt: skip
+
+    def run():
+        saved, sys.argv = sys.argv, argv
+        try:
+            return cli._parse_args()
+        finally:
+            sys.argv = saved
+
+    return run
+
+
+@bench("timeline.stream_plan[per event]")
+def _stream_plan():
+    cfg = load_config(None)
+    stamps = _distinct_dates(1000)
+    events = [{"event": "branch", "branch": "f", "date": stamps[0]}]
+    events += [{"event": "commit", "branch": "f", "date": d, "message": "m"} for d in stamps[1:]]
+    return lambda: sum(1 for _ in stream_plan(events, cfg, create_repo=False))
+
+
+_stream_plan.per_call = 1000  # type: ignore[attr-defined]
+
+
+class _Timed:
+    """A benchmark's timer and loop count, fixed once so rounds are comparable."""
+
+    def __init__(self, fn: Callable[[], object], per_call: int = 1):
+        self.timer = timeit.Timer(fn)
+        self.number, _ = self.timer.autorange()
+        self.per_call = per_call
+        self.best = float("inf")
+
+    def sample(self) -> None:
+        self.best = min(self.best, self.timer.timeit(self.number))
+
+    @property
+    def ns(self) -> float:
+        return self.best / self.number / self.per_call * 1e9
+
+
+def project_version() -> str:
+    text = (ROOT / "pyproject.toml").read_text(encoding="utf-8")
+    m = re.search(r'^version\s*=\s*"([^"]+)"', text, re.MULTILINE)
+    return m.group(1) if m else "0.0.0"
+
+
+def _latest_baseline() -> Optional[Path]:
+    def key(p: Path):
+        return tuple(int(x) if x.isdigit() else x for x in re.split(r"[.\-]", p.stem))
+
+    found = sorted(BASELINES.glob("*.json"), key=key)
+    return found[-1] if found else None
+
+
+def run(selected: list[str], rounds: int) -> dict:
+    """
+    Time every benchmark `rounds` times, interleaved, keeping the best sample
+    of each; a burst of load on the machine then costs one round, not a
+    whole benchmark. Each benchmark has its own calibration timer next to it.
+    """
+    timed = {}
+    for name in selected:
+        factory = BENCHES[name]
+        timed[name] = (_Timed(_calibration()), _Timed(factory(), getattr(factory, "per_call", 1)))
+    for _ in range(rounds):
+        for cal, t in timed.values():
+            cal.sample()
+            t.sample()
+    return {
+        "version": project_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "recorded": datetime.now().isoformat(timespec="seconds"),
+        "calibration_ns": {name: cal.ns for name, (cal, _) in timed.items()},
+        "results": {name: t.ns for name, (_, t) in timed.items()},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print a table and return the names that regressed beyond `threshold`."""
+    print(f"{'benchmark':<46} {'ns/op':>10} {'baseline':>10} {'change':>8}")
+    regressed = []
+    for name, ns in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<46} {ns:>10.0f} {'-':>10} {'new':>8}")
+            continue
+        # Baseline time expressed in this run's calibration units.
+        scale = baseline["calibration_ns"][name] / current["calibration_ns"][name]
+        change = ns * scale / base - 1
+        flag = "  <-- regression" if change > threshold else ""
+        print(f"{name:<46} {ns:>10.0f} {base / scale:>10.0f} {change:>+7.0%}{flag}")
+        if change > threshold:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    p.add_argument("-k", dest="pattern", help="Only run benchmarks whose name contains this.")
+    p.add_argument("--rounds", type=int, default=7, help="Timing rounds (best one is kept).")
+    p.add_argument("--save", action="store_true", help="Write the baseline for this version.")
+    p.add_argument("--baseline", help="Version (or JSON path) to compare with (default: latest).")
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed slowdown before failing (default {DEFAULT_THRESHOLD:.0%}%).",
+    )
+    ns = p.parse_args(argv)
+
+    selected = [n for n in BENCHES if not ns.pattern or ns.pattern in n]
+    current = run(selected, ns.rounds)
+
+    if ns.save:
+        BASELINES.mkdir(parents=True, exist_ok=True)
+        out = BASELINES / f"{current['version']}.json"
+        out.write_text(json.dumps(current, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"saved {out.relative_to(ROOT)}")
+
+    if ns.baseline:
+        path = Path(ns.baseline)
+        if not path.suffix:
+            path = BASELINES / f"{ns.baseline}.json"
+    else:
+        path = _latest_baseline()
+    if path is None or not path.exists():
+        for name, v in current["results"].items():
+            print(f"{name:<46} {v:>10.0f} ns/op")
+        print("no baseline to compare with (use --save)")
+        return 0
+
+    print(f"baseline: {path.relative_to(ROOT) if path.is_relative_to(ROOT) else path}")
+    regressed = compare(current, json.loads(path.read_text(encoding="utf-8")), ns.threshold)
+    if regressed:
+        print(f"{len(regressed)} regression(s) over {ns.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cold-start check: the cost of `import legends.cli`, from `python -X importtime`.
+
+    python benchmarks/startup.py                  # best of 5 runs against the budget
+    python benchmarks/startup.py --runs 10 --budget-ms 80
+
+Every `legends` command is a new process, so a Makefile-driven history pays
+for startup once per step. The check fails (exit 1) when the best run takes
+longer than the budget, or when a module that only some commands need is
+imported before any command runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_MS = 120.0
+
+# Imported by the commands that use them, never on the way in.
+LAZY = (
+    "asyncio",
+    "yaml",
+    "importlib.metadata",
+    "legends.dag",
+    "legends.fastimport",
+    "legends.generate",
+    "legends.identity",
+    "legends.journal",
+    "legends.fakegh",
+    "legends.fleet",
+    "legends.publish",
+    "legends.server",
+    "legends.session",
+    "legends.worktrees",
+)
+
+
+def importtime(code: str = "import legends.cli") -> list[tuple[int, int, int, str]]:
+    """One cold run of `code` as (self µs, cumulative µs, depth, module) rows."""
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    r = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, total, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(own), int(total), depth, name.strip()))
+    return rows
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    p.add_argument("--runs", type=int, default=5, help="Cold imports to time (best one counts).")
+    p.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help=f"Allowed import time of legends.cli (default {DEFAULT_BUDGET_MS:.0f} ms).",
+    )
+    p.add_argument("--top", type=int, default=8, help="Slowest direct imports to list.")
+    ns = p.parse_args(argv)
+
+    # Modules the interpreter loads before running any code are not ours to count.
+    interpreter = {name for *_, name in importtime("pass")}
+
+    def ours(rows):
+        return [r for r in rows if r[2] == 0 and r[3] not in interpreter]
+
+    runs = [importtime() for _ in range(ns.runs)]
+    best = min(runs, key=lambda rows: sum(r[1] for r in ours(rows)))
+    total_ms = sum(r[1] for r in ours(best)) / 1000
+    # The package itself, and what legends.cli imports directly.
+    direct = sorted((r for r in best if r[2] == 1 or r[3] == "legends"), key=lambda r: -r[1])
+    for _, total, _, name in direct[: ns.top]:
+        print(f"  {name:<28} {total / 1000:>7.1f} ms")
+    print(
+        f"import legends.cli: {total_ms:.1f} ms (best of {ns.runs}, budget {ns.budget_ms:.0f} ms)"
+    )
+
+    failed = False
+    eager = sorted({name for *_, name in best if name in LAZY})
+    if eager:
+        print(f"imported at startup but meant to be lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > ns.budget_ms:
+        print(f"over budget by {total_ms - ns.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
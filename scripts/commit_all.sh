@@ -112,7 +112,10 @@ done
 	exit 2
 }
 
-if command -v legends >/dev/null 2>&1; then
+if [[ -S "${LEGENDS_SOCKET:-}" ]] && command -v legends-client >/dev/null 2>&1; then
+	# A `legends serve` is running: skip interpreter and config start-up per call.
+	CLI=(legends-client)
+elif command -v legends >/dev/null 2>&1; then
 	CLI=(legends)
 elif python -c 'import legends' >/dev/null 2>&1; then
 	CLI=(python -m legends)
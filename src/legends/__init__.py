@@ -6,14 +6,31 @@ Local-first automation for simulating historical GitHub activity via
 backdated git commits, branches, and merge commits, plus PR orchestration
 through the GitHub CLI.
 
-Public API surface: the CLI (see `cli.py`).
+Public API surface: the CLI (see `cli.py`) and `legends.Session`, the same
+commands as methods (see `session.py`).
 """
 
-from importlib.metadata import version as _get_version, PackageNotFoundError
+from typing import TYPE_CHECKING
 
-try:
-    __version__ = _get_version(__package__ or "legends")
-except PackageNotFoundError:
-    __version__ = "0.0.0"
+if TYPE_CHECKING:
+    from .session import Session
 
-__all__ = ["__version__"]
+__all__ = ["Session", "__version__"]
+
+
+def __getattr__(name: str):
+    # Resolved on first use: importlib.metadata costs more than the rest of startup.
+    if name == "__version__":
+        from importlib.metadata import PackageNotFoundError, version
+
+        try:
+            value = version(__package__ or "legends")
+        except PackageNotFoundError:
+            value = "0.0.0"
+        globals()["__version__"] = value
+        return value
+    if name == "Session":
+        from .session import Session
+
+        return Session
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,34 @@
 from __future__ import annotations
 
 import argparse
+import datetime
+import functools
+import itertools
 import json
 import logging
 import os
+import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 
+from . import plumbing, tracing
 from .config import AppConfig, load_config
-from .exceptions import BackdateError, CommandError
+from .exceptions import BackdateError, CommandError, ConfigError, TimelineError
+from .executor import default_executor
+from .prs import PRPool, PRSpec, PullRequest, acreate_pr, create_args, pr_states
+from .pushq import PushQueue
+from .ratelimit import github_scheduler
+from .templates import render_merge_subject, set_template_dirs
+from .timeline import (
+    Step,
+    apply_timeline_config,
+    compile_plan,
+    is_event_stream,
+    load_timeline,
+    read_stream_header,
+    stream_plan,
+)
 from .utils import (
     RunResult,
     build_commit_env,
@@ -17,15 +37,32 @@ from .utils import (
     json_loads,
     pushd,
     ensure_tool,
-    resolve_github_identity,
-    resolve_github_login,
+    split_ident,
     LOG,
 )
 
+# Modules only some commands need are imported where they are used, so that
+# `legends commit` does not pay for asyncio, the DAG runner or fast-import.
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from .dag import DagRunner
+    from .generate import ActivityModel
+    from .journal import Journal, Key
+    from .worktrees import Worktrees
+
 
-def _bool_flag(parser: argparse.ArgumentParser, name: str, *, default: bool, help: str):
+def _bool_flag(
+    parser: argparse.ArgumentParser,
+    name: str,
+    *,
+    default: bool,
+    help: str,
+    no_help: Optional[str] = None,
+):
     """
-    Register a --<name>/--no-<name> boolean flag pair.
+    Register a --<name>/--no-<name> boolean flag pair. `no_help` describes
+    --no-<name> (default: "Disable <help>").
 
     We always store it in argparse's Namespace using a valid Python identifier:
     e.g. name='delete-branch' -> dest='delete_branch' -> ns.delete_branch (bool)
@@ -33,18 +70,65 @@ def _bool_flag(parser: argparse.ArgumentParser, name: str, *, default: bool, hel
     dest = name.replace("-", "_")
     g = parser.add_mutually_exclusive_group()
     g.add_argument(f"--{name}", dest=dest, action="store_true", help=help)
-    g.add_argument(f"--no-{name}", dest=dest, action="store_false", help=f"Disable {help}")
+    no_help = no_help or f"Disable {help}"
+    g.add_argument(f"--no-{name}", dest=dest, action="store_false", help=no_help)
     parser.set_defaults(**{dest: default})
 
 
-def _parse_args() -> argparse.Namespace:
+def _add_run_options(parser: argparse.ArgumentParser) -> None:
+    """Options shared by the commands that execute a timeline."""
+    parser.add_argument(
+        "--skip-create-repo",
+        action="store_true",
+        help="Ignore 'initial_commit' and run features in the current repository.",
+    )
+    _bool_flag(
+        parser,
+        "resume",
+        default=True,
+        help="Skip steps already recorded in the run journal (.git/legends/).",
+        no_help="Run every step, ignoring the run journal.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["steps", "dag", "worktree", "fast-import", "two-phase"],
+        default="steps",
+        help="'steps' runs each command in order; 'dag' overlaps pushes and PR calls with "
+        "local git work and reports the critical path; 'worktree' is 'dag' with one git worktree "
+        "per feature branch, so branches are built at once; 'fast-import' writes the whole "
+        "history with one git fast-import process and pushes once (PRs are not opened); "
+        "'two-phase' builds like 'fast-import', then pushes and opens all PRs in parallel.",
+    )
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(
         prog="legends",
         description="Automate historical GitHub repo activity with backdated commits and merges.",
     )
     p.add_argument("--config", help="Optional YAML config file.")
     p.add_argument("--dry-run", action="store_true", help="Print actions without executing.")
+    p.add_argument(
+        "--plumbing",
+        action="store_true",
+        help="Build commits and merges with git plumbing; never check out branches.",
+    )
+    p.add_argument(
+        "--defer-push",
+        action="store_true",
+        help="Queue pushes and send them as few atomic pushes (before PRs and at the end).",
+    )
     p.add_argument("--verbose", "-v", action="count", default=0, help="Increase verbosity.")
+    p.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Record every git/gh call and command stage to FILE (Chrome trace JSON).",
+    )
+    p.add_argument(
+        "--refresh-identity",
+        action="store_true",
+        help="Ignore the cached GitHub identity and fetch it again.",
+    )
 
     sub = p.add_subparsers(dest="cmd", required=True)
 
@@ -66,6 +150,19 @@ def _parse_args() -> argparse.Namespace:
     pb.add_argument("--message", default=None, help="Initial commit message (optional).")
     pb.add_argument("--push", action="store_true", help="Push the new branch to origin.")
 
+    pbs = sub.add_parser(
+        "create-branches", help="Create (or delete) many branches in one ref transaction."
+    )
+    pbs.add_argument(
+        "--from-file",
+        required=True,
+        help="One branch per line: 'name [base]', '-name' to delete, or a JSON object "
+        "with branch/base/date/message/author (\"delete\": true to delete).",
+    )
+    pbs.add_argument("--base", default=None, help="Default base branch (default from config).")
+    pbs.add_argument("--date", default=None, help="Birth date for lines that give none.")
+    pbs.add_argument("--push", action="store_true", help="Push the changes with one atomic push.")
+
     pc = sub.add_parser("commit", help="Make a backdated commit on a branch.")
     pc.add_argument("--branch", required=True, help="Target branch.")
     pc.add_argument("--date", required=True, help="Commit date.")
@@ -73,6 +170,7 @@ def _parse_args() -> argparse.Namespace:
     pc.add_argument("--allow-empty", action="store_true", help="Allow empty commit if no changes.")
     pc.add_argument("--add-all", action="store_true", help="Run 'git add -A' before commit.")
     pc.add_argument("--touch", help="Create/modify this file to ensure a non-empty commit.")
+    pc.add_argument("--author", help="Commit author as 'Name <email>' (default from config).")
     pc.add_argument("--push", action="store_true", help="Push branch after committing.")
 
     pp = sub.add_parser("open-pr", help="Open a PR from branch to base via GitHub CLI.")
@@ -100,7 +198,72 @@ def _parse_args() -> argparse.Namespace:
     pa.add_argument("--merge-date", required=True, help="Merge commit date.")
     _bool_flag(pa, "delete-branch", default=True, help="Delete remote branch after merge.")
 
-    return p.parse_args()
+    pt = sub.add_parser("run-timeline", help="Run a timeline file in a single process.")
+    pt.add_argument(
+        "file",
+        help="Timeline YAML file (see config/timeline.example.yaml), or a .jsonl event "
+        "file that is read and run one event at a time.",
+    )
+    _add_run_options(pt)
+
+    pn = sub.add_parser(
+        "run-many", help="Run one timeline per repository from a manifest, in parallel."
+    )
+    pn.add_argument("manifest", help="YAML manifest listing the timelines (see legends.fleet).")
+    pn.add_argument(
+        "--jobs", "-j", type=int, help="Worker processes (default: manifest 'jobs', else CPUs)."
+    )
+    _add_run_options(pn)
+
+    pg = sub.add_parser(
+        "generate", help="Generate a synthetic timeline (JSONL) from an activity model."
+    )
+    pg.add_argument("--start", help="First day (YYYY-MM-DD; default: --years before today).")
+    pg.add_argument("--end", help="Day after the last one (default: --years after --start).")
+    pg.add_argument("--years", type=float, default=1.0, help="Length of the history.")
+    pg.add_argument("--seed", type=int, help="Random seed; the same seed gives the same events.")
+    pg.add_argument("--commits-per-day", type=float, default=4.0, help="Mean weekday commits.")
+    pg.add_argument(
+        "--weekend-factor", type=float, default=0.15, help="Weekend rate as a share of weekdays."
+    )
+    pg.add_argument("--work-hours", default="9-18", help="Working-hours window, e.g. '9-18'.")
+    pg.add_argument(
+        "--after-hours", type=float, default=0.1, help="Share of commits outside working hours."
+    )
+    pg.add_argument("--branch-days", type=float, default=3.0, help="Mean feature-branch lifetime.")
+    pg.add_argument(
+        "--parallel-branches", type=int, default=3, help="Feature branches open at once (max)."
+    )
+    pg.add_argument(
+        "--merge-lag-hours", type=float, default=6.0, help="Mean lag from last commit to merge."
+    )
+    pg.add_argument("--pr-ratio", type=float, default=1.0, help="Share of branches given a PR.")
+    pg.add_argument(
+        "--author",
+        action="append",
+        default=[],
+        help="Commit author 'Name <email>' (repeatable; earlier ones commit more).",
+    )
+    pg.add_argument("--repo", help="Repository name for the timeline header.")
+    pg.add_argument("--timezone", default="UTC", help="Zone the generated times are in.")
+    pg.add_argument("--output", "-o", default="-", help="JSONL file to write ('-' for stdout).")
+    pg.add_argument(
+        "--run",
+        action="store_true",
+        help="Run the generated events right away instead of writing them (needs --repo "
+        "unless --skip-create-repo).",
+    )
+    _add_run_options(pg)
+
+    ps = sub.add_parser(
+        "serve", help="Stay running and execute commands sent by legends-client over a socket."
+    )
+    ps.add_argument(
+        "--socket",
+        help="Unix socket path (default: $LEGENDS_SOCKET, else legends.sock in the cache dir).",
+    )
+
+    return p.parse_args(argv)
 
 
 def _apply_verbosity(level: int):
@@ -112,28 +275,52 @@ def _apply_verbosity(level: int):
         LOG.setLevel(logging.WARNING)
 
 
-def _resolve_config(ns: argparse.Namespace) -> AppConfig:
-    cfg = load_config(ns.config) if ns.config else load_config(None)
+def _resolve_config(ns: argparse.Namespace, cfg: Optional[AppConfig] = None) -> AppConfig:
+    """Config for this command line; `cfg`, when given, is used instead of loading one."""
+    if cfg is None:
+        cfg = load_config(ns.config) if ns.config else load_config(None)
+    if ns.cmd == "run-timeline":
+        if is_event_stream(ns.file):
+            ns.timeline = read_stream_header(ns.file)
+        else:
+            ns.timeline = load_timeline(ns.file)
+        apply_timeline_config(cfg, ns.timeline)
     if ns.dry_run:
         cfg.dry_run = True
+    if ns.plumbing:
+        cfg.plumbing = True
+    if ns.defer_push:
+        cfg.defer_push = True
     return cfg
 
 
-def _hydrate_identity(cfg: AppConfig) -> AppConfig:
+def _hydrate_identity(
+    cfg: AppConfig, *, refresh: bool = False, offline: bool = False
+) -> AppConfig:
     """
     Ensure cfg has author/committer identity. If not provided via YAML/env,
-    resolve from `gh`. Committer.name is set to the GitHub *username*.
+    resolve from `gh` (one cached lookup). Committer.name is set to the GitHub
+    *username*. With `offline` (dry runs) only a cached identity is used.
     """
-    if not cfg.author_name or not cfg.author_email:
-        gh_name, gh_email = resolve_github_identity()
-        if not cfg.author_name and gh_name:
-            cfg.author_name = gh_name
-        if not cfg.author_email and gh_email:
-            cfg.author_email = gh_email
-
-    login = resolve_github_login()
+    from .identity import github_identity
+
+    ident = None
+    if not cfg.author_name or not cfg.author_email or not cfg.committer_name:
+        ident = github_identity(
+            ttl=cfg.identity_ttl,
+            refresh=refresh,
+            public_email=cfg.identity_public_email,
+            cached_only=offline,
+        )
+
+    if ident is not None:
+        if not cfg.author_name:
+            cfg.author_name = ident.name
+        if not cfg.author_email:
+            cfg.author_email = ident.email
+
     if not cfg.committer_name:
-        cfg.committer_name = login or cfg.author_name
+        cfg.committer_name = (ident.login if ident else None) or cfg.author_name
     if not cfg.committer_email:
         cfg.committer_email = cfg.author_email
 
@@ -179,12 +366,78 @@ def _exec_gh(
     return gh(args, env=env, cwd=cwd)
 
 
-def _commit_env(cfg: AppConfig, date: Optional[str]) -> dict:
+def _ref_exists(ref: str, *, dry: bool) -> bool:
+    LOG.info("git rev-parse --verify %s", ref)
+    if dry:
+        return True
+    return default_executor().ref_exists(ref)
+
+
+def _exec_plumbing(what: str, fn, *args, dry: bool, **kwargs):
+    LOG.info("plumbing: %s", what)
+    if dry:
+        return None
+    return fn(*args, **kwargs)
+
+
+def _pushes(cfg: AppConfig) -> PushQueue:
+    if cfg.push_queue is None:
+        cfg.push_queue = PushQueue(cfg.remote_name, cwd=Path.cwd())
+    return cfg.push_queue
+
+
+def _push_branch(branch: str, cfg: AppConfig, *, upstream_first: bool = False) -> None:
+    """Push `branch` now, or queue it when pushes are deferred."""
+    if cfg.defer_push:
+        LOG.info("queued push: %s", branch)
+        _pushes(cfg).push(branch)
+        return
+    first = ["push", "-u", cfg.remote_name, branch]
+    second = ["push", cfg.remote_name, branch]
+    if not upstream_first:
+        first, second = second, first
+    try:
+        _exec_git(first, dry=cfg.dry_run)
+    except CommandError:
+        _exec_git(second, dry=cfg.dry_run)
+
+
+def _flush_pushes(cfg: AppConfig) -> None:
+    """Send queued pushes (no-op unless pushes are deferred)."""
+    if cfg.push_queue is not None:
+        cfg.push_queue.flush(dry=cfg.dry_run)
+
+
+def _prs(cfg: AppConfig) -> PRPool:
+    if cfg.pr_pool is None:
+        cfg.pr_pool = PRPool(cfg.pr_workers, cwd=Path.cwd())
+    return cfg.pr_pool
+
+
+def _submit_pr(spec: PRSpec, cfg: AppConfig) -> Optional[Future]:
+    """Open a PR in the background; `_pr_number` waits for it when needed."""
+    LOG.info("gh %s", " ".join(create_args(spec, spec.title or "<tip subject>")))
+    if cfg.dry_run:
+        return None
+    return _prs(cfg).submit(spec)
+
+
+def _pr_number(branch: str, cfg: AppConfig) -> Optional[int]:
+    """Number of the open PR for `branch`: opened earlier in this run, else asked of gh."""
+    if cfg.dry_run:
+        return None
+    pr = cfg.pr_pool.get(branch) if cfg.pr_pool is not None else None
+    return pr.number if pr is not None else _get_pr_number_for_branch(branch)
+
+
+def _commit_env(cfg: AppConfig, date: Optional[str], author: Optional[str] = None) -> dict:
+    """Commit env for `date`; `author` ('Name <email>') overrides the configured author only."""
+    name, email = split_ident(author) if author else (cfg.author_name, cfg.author_email)
     return build_commit_env(
         os.environ,
         date=date,
-        author_name=cfg.author_name,
-        author_email=cfg.author_email,
+        author_name=name,
+        author_email=email,
         committer_name=cfg.committer_name or cfg.author_name,
         committer_email=cfg.committer_email or cfg.author_email,
     )
@@ -231,34 +484,122 @@ def cmd_create_repo(ns: argparse.Namespace, cfg: AppConfig) -> None:
 def cmd_create_branch(ns: argparse.Namespace, cfg: AppConfig) -> None:
     base = ns.base or cfg.base_branch
     msg = ns.message or f"chore({ns.branch}): branch birth"
-    _exec_git(["checkout", base], dry=cfg.dry_run)
-    _exec_git(["checkout", "-b", ns.branch], dry=cfg.dry_run)
     env = _commit_env(cfg, ns.date)
-    _exec_git(["commit", "--allow-empty", "-m", msg], dry=cfg.dry_run, env=env)
+    if cfg.plumbing:
+        _exec_plumbing(
+            f"create {ns.branch} from {base}", plumbing.create_branch,
+            ns.branch, base, msg, env=env, dry=cfg.dry_run,
+        )
+    else:
+        _exec_git(["checkout", base], dry=cfg.dry_run)
+        _exec_git(["checkout", "-b", ns.branch], dry=cfg.dry_run)
+        _exec_git(["commit", "--allow-empty", "-m", msg], dry=cfg.dry_run, env=env)
     if getattr(ns, "push", False):
-        try:
-            _exec_git(["push", "-u", cfg.remote_name, ns.branch], dry=cfg.dry_run)
-        except CommandError:
-            _exec_git(["push", cfg.remote_name, ns.branch], dry=cfg.dry_run)
+        _push_branch(ns.branch, cfg, upstream_first=True)
+
+
+def _branch_list(ns: argparse.Namespace, cfg: AppConfig) -> tuple[list[tuple], list[str]]:
+    """Read `create-branches --from-file` into (births, deletions) for plumbing.create_branches."""
+    births, deletions = [], []
+    path = Path(ns.from_file)
+    if not path.exists():
+        raise ConfigError(f"Branch list not found: {path}")
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            where = f"{path}:{lineno}"
+            if line.startswith("{"):
+                try:
+                    entry = json.loads(line)
+                except ValueError as exc:
+                    raise ConfigError(f"{where}: {exc}") from exc
+                if not entry.get("branch"):
+                    raise ConfigError(f"{where}: missing 'branch'")
+            elif line.startswith("-"):
+                entry = {"branch": line[1:].strip(), "delete": True}
+            else:
+                name, _, base = line.partition(" ")
+                entry = {"branch": name, "base": base.strip() or None}
+            branch = str(entry["branch"])
+            if entry.get("delete") or entry.get("event") == "delete":
+                deletions.append(branch)
+                continue
+            date = entry.get("date") or ns.date
+            if not date:
+                raise ConfigError(f"{where}: no date for {branch!r} (add one, or pass --date)")
+            births.append((
+                branch,
+                str(entry.get("base") or ns.base or cfg.base_branch),
+                entry.get("message") or f"chore({branch}): branch birth",
+                _commit_env(cfg, str(date), entry.get("author")),
+            ))  # fmt: skip
+    return births, deletions
+
+
+def cmd_create_branches(ns: argparse.Namespace, cfg: AppConfig) -> None:
+    """
+    Create many branches, each at a backdated empty birth commit, and delete
+    others, as one all-or-nothing ref update (see plumbing.create_branches).
+    """
+    births, deletions = _branch_list(ns, cfg)
+    LOG.info("create-branches: %d to create, %d to delete", len(births), len(deletions))
+    t0 = time.perf_counter()
+    _exec_plumbing(
+        f"create {len(births)} and delete {len(deletions)} branch(es)",
+        plumbing.create_branches, births, deletions, dry=cfg.dry_run,
+    )  # fmt: skip
+    LOG.info("create-branches: done in %.2fs", time.perf_counter() - t0)
+    if ns.push and (births or deletions):
+        refspecs = [f"refs/heads/{b}:refs/heads/{b}" for b, *_ in births]
+        refspecs += [f":refs/heads/{b}" for b in deletions]
+        _exec_git(["push", "--atomic", cfg.remote_name, *refspecs], dry=cfg.dry_run)
+
+
+def _plumbing_commit(ns: argparse.Namespace, cfg: AppConfig) -> None:
+    LOG.info("plumbing: commit on %s", ns.branch)
+    if cfg.dry_run:
+        return
+    files: dict[str, str] = {}
+    paths = []
+    if ns.touch:
+        # A file that does not exist yet goes straight into the commit as an
+        # empty blob; creating it here would leave it untracked on another branch.
+        rel = plumbing.repo_paths([ns.touch])
+        if Path(ns.touch).exists():
+            paths = rel
+        elif not default_executor().ref_exists(f"refs/heads/{ns.branch}:{rel[0]}"):
+            files = {rel[0]: ""}
+    if ns.add_all:
+        paths = sorted({*paths, *plumbing.worktree_changes()})
+    plumbing.commit(
+        ns.branch,
+        ns.message,
+        env=_commit_env(cfg, ns.date, getattr(ns, "author", None)),
+        files=files,
+        paths=paths,
+        allow_empty=ns.allow_empty,
+    )
 
 
 def cmd_commit(ns: argparse.Namespace, cfg: AppConfig) -> None:
-    _exec_git(["checkout", ns.branch], dry=cfg.dry_run)
-    if ns.touch:
-        _maybe_touch(ns.touch)
-        _exec_git(["add", ns.touch], dry=cfg.dry_run)
-    if ns.add_all:
-        _exec_git(["add", "-A"], dry=cfg.dry_run)
-    args = ["commit", "-m", ns.message]
-    if ns.allow_empty:
-        args.insert(1, "--allow-empty")
-    env = _commit_env(cfg, ns.date)
-    _exec_git(args, dry=cfg.dry_run, env=env)
+    if cfg.plumbing:
+        _plumbing_commit(ns, cfg)
+    else:
+        _exec_git(["checkout", ns.branch], dry=cfg.dry_run)
+        if ns.touch:
+            _maybe_touch(ns.touch)
+            _exec_git(["add", ns.touch], dry=cfg.dry_run)
+        if ns.add_all:
+            _exec_git(["add", "-A"], dry=cfg.dry_run)
+        args = ["commit", "-m", ns.message]
+        if ns.allow_empty:
+            args.insert(1, "--allow-empty")
+        env = _commit_env(cfg, ns.date, getattr(ns, "author", None))
+        _exec_git(args, dry=cfg.dry_run, env=env)
     if getattr(ns, "push", False):
-        try:
-            _exec_git(["push", cfg.remote_name, ns.branch], dry=cfg.dry_run)
-        except CommandError:
-            _exec_git(["push", "-u", cfg.remote_name, ns.branch], dry=cfg.dry_run)
+        _push_branch(ns.branch, cfg)
 
 
 def _get_pr_number_for_branch(branch: str) -> Optional[int]:
@@ -280,17 +621,14 @@ def cmd_open_pr(ns: argparse.Namespace, cfg: AppConfig) -> None:
     """
     base = ns.base or cfg.base_branch
 
-    try:
-        _exec_git(["rev-parse", "--verify", ns.branch], dry=cfg.dry_run)
-    except CommandError as e:
+    if not _ref_exists(ns.branch, dry=cfg.dry_run):
         raise BackdateError(
             f"Branch {ns.branch!r} does not exist locally. Did you run 'create-branch' and 'commit'?"
-        ) from e
+        )
 
-    try:
-        _exec_git(["push", "-u", cfg.remote_name, ns.branch], dry=cfg.dry_run)
-    except CommandError:
-        _exec_git(["push", cfg.remote_name, ns.branch], dry=cfg.dry_run)
+    _push_branch(ns.branch, cfg, upstream_first=True)
+    # GitHub needs the head (and any queued base updates) before the PR exists.
+    _flush_pushes(cfg)
     try:
         diff = git(["rev-list", "--left-right", "--count", f"{base}...{ns.branch}"])
         ahead_behind = (diff.stdout or "0\t0").strip().replace(" ", "\t").split("\t")
@@ -303,14 +641,61 @@ def cmd_open_pr(ns: argparse.Namespace, cfg: AppConfig) -> None:
     except Exception:
         pass
 
-    args = ["pr", "create", "--head", ns.branch, "--base", base]
-    if ns.title:
-        args += ["--title", ns.title]
-    if ns.body:
-        args += ["--body", ns.body]
-    if getattr(ns, "draft", False):
-        args += ["--draft"]
-    _exec_gh(args, dry=cfg.dry_run)
+    spec = PRSpec(ns.branch, base, ns.title, ns.body, bool(getattr(ns, "draft", False)))
+    _submit_pr(spec, cfg)
+
+
+def _sync_base(base: str, cfg: AppConfig) -> None:
+    if cfg.plumbing:
+        _exec_plumbing(
+            f"sync {base} from {cfg.remote_name}", plumbing.sync_from_remote,
+            base, cfg.remote_name, dry=cfg.dry_run,
+        )
+    else:
+        _exec_git(["checkout", base], dry=cfg.dry_run)
+        _exec_git(["pull", cfg.remote_name, base], dry=cfg.dry_run)
+
+
+def _merge_noff(base: str, branch: str, msg: str, env: dict, cfg: AppConfig) -> None:
+    if cfg.plumbing:
+        _exec_plumbing(
+            f"merge {branch} into {base}", plumbing.merge_noff,
+            base, branch, msg, env=env, dry=cfg.dry_run,
+        )
+    else:
+        _exec_git(["merge", "--no-ff", "--no-commit", branch], dry=cfg.dry_run)
+        _exec_git(["commit", "-m", msg], dry=cfg.dry_run, env=env)
+
+
+def _cleanup_branch(branch: str, pr_number: Optional[int], cfg: AppConfig) -> None:
+    """
+    Delete a merged head branch on the remote. An OPEN PR (GitHub has not seen
+    the merge) is closed with --delete-branch instead. With deferred pushes the
+    base has not been pushed yet, so the deletion is queued behind it.
+    """
+    if cfg.defer_push:
+        LOG.info("queued delete: %s", branch)
+        _pushes(cfg).delete(branch)
+        return
+
+    if pr_number:
+        try:
+            state = pr_states([pr_number]).get(pr_number, "")
+        except CommandError:
+            state = ""
+
+        if state == "OPEN":
+            try:
+                _exec_gh(["pr", "close", str(pr_number), "--delete-branch"], dry=cfg.dry_run)
+                return
+            except CommandError:
+                pass
+    _exec_git(["push", cfg.remote_name, "--delete", branch], dry=cfg.dry_run)
+
+
+def _is_merged(branch: str, base: str) -> bool:
+    r = git(["merge-base", "--is-ancestor", branch, base], check=False)
+    return r.returncode == 0
 
 
 def cmd_merge_pr(ns: argparse.Namespace, cfg: AppConfig) -> None:
@@ -319,10 +704,9 @@ def cmd_merge_pr(ns: argparse.Namespace, cfg: AppConfig) -> None:
     pr_number = ns.pr
 
     if not pr_number and branch:
-        pr_number = _get_pr_number_for_branch(branch)
+        pr_number = _pr_number(branch, cfg)
 
-    _exec_git(["checkout", base], dry=cfg.dry_run)
-    _exec_git(["pull", cfg.remote_name, base], dry=cfg.dry_run)
+    _sync_base(base, cfg)
 
     if not branch:
         if pr_number is None:
@@ -333,148 +717,553 @@ def cmd_merge_pr(ns: argparse.Namespace, cfg: AppConfig) -> None:
             branch = info.get("headRefName")
         except CommandError:
             raise BackdateError("Could not resolve branch name for PR; pass --branch explicitly.")
-    _exec_git(["merge", "--no-ff", "--no-commit", branch], dry=cfg.dry_run)
 
-    default_msg = (
-        f"Merge pull request #{pr_number} from {branch}"
-        if pr_number
-        else f"Merge branch '{branch}' into {base}"
-    )
-    msg = ns.message or default_msg
-    env = _commit_env(cfg, ns.date)
-    _exec_git(["commit", "-m", msg], dry=cfg.dry_run, env=env)
+    msg = ns.message or render_merge_subject(base=base, branch=branch, pr_number=pr_number or None)
+    if not cfg.dry_run and _is_merged(branch, base):
+        # e.g. a resumed run whose merge was pushed before the step was recorded
+        LOG.info("%s is already merged into %s; skipping the merge commit", branch, base)
+    else:
+        _merge_noff(base, branch, msg, _commit_env(cfg, ns.date), cfg)
 
-    _exec_git(["push", cfg.remote_name, base], dry=cfg.dry_run)
+    _push_branch(base, cfg)
 
     if getattr(ns, "delete_branch", True):
-        if pr_number:
-            state = ""
-            try:
-                info = gh(["pr", "view", str(pr_number), "--json", "state"]).stdout
-                data = json_loads(info)
-                state = (data.get("state") or "").upper()
-            except CommandError:
-                state = ""
-
-            if state == "OPEN":
-                try:
-                    _exec_gh(["pr", "close", str(pr_number), "--delete-branch"], dry=cfg.dry_run)
-                except CommandError:
-                    _exec_git(["push", cfg.remote_name, "--delete", branch], dry=cfg.dry_run)
-            else:
-                _exec_git(["push", cfg.remote_name, "--delete", branch], dry=cfg.dry_run)
-        else:
-            _exec_git(["push", cfg.remote_name, "--delete", branch], dry=cfg.dry_run)
+        _cleanup_branch(branch, pr_number, cfg)
 
 
 def cmd_commit_all(ns: argparse.Namespace, cfg: AppConfig) -> None:
     base = ns.base or cfg.base_branch
     branch = ns.branch
 
-    exists = False
-    try:
-        r = git(["rev-parse", "--verify", branch])
-        exists = r.returncode == 0
-    except CommandError:
-        exists = False
+    exists = default_executor().ref_exists(branch)
 
-    if exists:
-        _exec_git(["checkout", branch], dry=cfg.dry_run)
+    marker = Path(".backdate_work.txt")
+    marker_text = f"{ns.commit_date} :: {ns.message}\n"
+    env_c = _commit_env(cfg, ns.commit_date)
+    if cfg.plumbing:
+        _exec_plumbing(
+            f"commit on {branch}", plumbing.commit, branch, ns.message,
+            env=env_c, files={marker.name: marker_text}, start_point=base, dry=cfg.dry_run,
+        )
     else:
-        _exec_git(["checkout", base], dry=cfg.dry_run)
-        _exec_git(["checkout", "-b", branch], dry=cfg.dry_run)
+        if exists:
+            _exec_git(["checkout", branch], dry=cfg.dry_run)
+        else:
+            _exec_git(["checkout", base], dry=cfg.dry_run)
+            _exec_git(["checkout", "-b", branch], dry=cfg.dry_run)
+        if not cfg.dry_run:
+            marker.write_text(marker_text, encoding="utf-8")
+        _exec_git(["add", str(marker)], dry=cfg.dry_run)
+        _exec_git(["commit", "-m", ns.message], dry=cfg.dry_run, env=env_c)
 
-    marker = Path(".backdate_work.txt")
-    if not cfg.dry_run:
-        marker.write_text(f"{ns.commit_date} :: {ns.message}\n", encoding="utf-8")
-    _exec_git(["add", str(marker)], dry=cfg.dry_run)
+    _push_branch(branch, cfg)
+    _flush_pushes(cfg)
 
-    env_c = _commit_env(cfg, ns.commit_date)
-    _exec_git(["commit", "-m", ns.message], dry=cfg.dry_run, env=env_c)
+    _submit_pr(PRSpec(branch, base, ns.pr_title or ns.message, ns.pr_body), cfg)
+    pr_number = _pr_number(branch, cfg)
 
-    try:
-        _exec_git(["push", cfg.remote_name, branch], dry=cfg.dry_run)
-    except CommandError:
-        _exec_git(["push", "-u", cfg.remote_name, branch], dry=cfg.dry_run)
+    _sync_base(base, cfg)
 
-    pr_title = ns.pr_title or ns.message
-    args = ["pr", "create", "--head", branch, "--base", base, "--title", pr_title]
-    if ns.pr_body:
-        args += ["--body", ns.pr_body]
-    _exec_gh(args, dry=cfg.dry_run)
+    env_m = _commit_env(cfg, ns.merge_date)
+    merge_msg = render_merge_subject(base=base, branch=branch, pr_number=pr_number or None)
+    _merge_noff(base, branch, merge_msg, env_m, cfg)
 
-    pr_number: Optional[int] = None
-    if not cfg.dry_run:
-        try:
-            r = gh(["pr", "list", "--state", "open", "--head", branch, "--json", "number"])
-            data = json_loads(r.stdout)
-            if isinstance(data, list) and data:
-                pr_number = int(data[0]["number"])
-        except CommandError:
-            pr_number = None
+    if getattr(ns, "delete_branch", True):
+        _cleanup_branch(branch, pr_number, cfg)
 
-    _exec_git(["checkout", base], dry=cfg.dry_run)
-    _exec_git(["pull", cfg.remote_name, base], dry=cfg.dry_run)
-    _exec_git(["merge", "--no-ff", "--no-commit", branch], dry=cfg.dry_run)
+    _push_branch(base, cfg)
 
-    env_m = _commit_env(cfg, ns.merge_date)
-    merge_msg = (
-        f"Merge pull request #{pr_number} from {branch}"
-        if pr_number else f"Merge branch '{branch}' into {base}"
+
+def cmd_run_timeline(ns: argparse.Namespace, cfg: AppConfig) -> None:
+    """
+    Execute every step of a timeline in this process, sharing one config and
+    one resolved identity across all steps.
+    """
+    name = Path(ns.file).stem
+    if is_event_stream(ns.file):
+        _run_stream(ns.file, name, ns, cfg)
+        return
+    from .journal import step_keys
+
+    plan = compile_plan(ns.timeline, cfg, create_repo=not ns.skip_create_repo)
+    LOG.info("Timeline %s: %d steps", ns.file, len(plan))
+    keyed = step_keys(plan)
+    repo = next(keyed) if plan and plan[0].kind == "create-repo" else None
+    _run_timeline(keyed, repo, name, ns, cfg)
+
+
+def cmd_run_many(ns: argparse.Namespace, cfg: AppConfig) -> None:
+    """Run the timelines of a manifest on a pool of worker processes (see legends.fleet)."""
+    from .fleet import load_manifest, run_many
+
+    jobs, workers = load_manifest(ns.manifest, backend=ns.backend)
+    report = run_many(
+        jobs,
+        cfg,
+        workers=ns.jobs or workers,
+        skip_create_repo=ns.skip_create_repo,
+        resume=ns.resume,
     )
-    _exec_git(["commit", "-m", merge_msg], dry=cfg.dry_run, env=env_m)
+    print(report.format())
+    if report.failed:
+        raise BackdateError(f"run-many: {len(report.failed)} of {len(jobs)} repositories failed")
 
-    if getattr(ns, "delete_branch", True):
-        if pr_number:
-            state = ""
-            try:
-                info = gh(["pr", "view", str(pr_number), "--json", "state"]).stdout
-                data = json_loads(info)
-                state = (data.get("state") or "").upper()
-            except CommandError:
-                state = ""
 
-            if state == "OPEN":
-                try:
-                    _exec_gh(["pr", "close", str(pr_number), "--delete-branch"], dry=cfg.dry_run)
-                except CommandError:
-                    _exec_git(["push", cfg.remote_name, "--delete", branch], dry=cfg.dry_run)
-            else:
-                _exec_git(["push", cfg.remote_name, "--delete", branch], dry=cfg.dry_run)
+def _run_stream(source, name: str, ns: argparse.Namespace, cfg: AppConfig) -> None:
+    """Run JSONL events; they are keyed by position and never held in memory all at once."""
+    stream = stream_plan(source, cfg, create_repo=not ns.skip_create_repo)
+    head = next(stream, None)
+    if head is not None and head.kind == "create-repo":
+        repo: Optional[tuple[Key, Step]] = ("create-repo", head)
+    else:
+        repo, stream = None, itertools.chain([head] if head else [], stream)
+    _run_timeline(enumerate(stream, 1), repo, name, ns, cfg)
+
+
+def _run_timeline(
+    keyed: Iterator[tuple[Key, Step]],
+    repo: Optional[tuple[Key, Step]],
+    name: str,
+    ns: argparse.Namespace,
+    cfg: AppConfig,
+) -> None:
+    """Run keyed steps with the chosen backend; `repo` is the create-repo step, if any."""
+    created = None
+    if repo is not None:
+        created, first = repo
+        repo_dir = Path(first.args["name"]).resolve()
+        if ns.resume and _journaled(repo_dir, name, created):
+            LOG.info("Repository %s already created (journal); skipping", repo_dir)
+            created = None
         else:
-            _exec_git(["push", cfg.remote_name, "--delete", branch], dry=cfg.dry_run)
+            _run_step(first, cfg)
+    else:
+        repo_dir = Path.cwd()
+
+    with pushd(repo_dir):
+        steps = (step for _, step in keyed)
+        if ns.backend == "fast-import":
+            from .fastimport import import_history, push_history
+
+            result = import_history(steps, cfg)
+            push_history(result, cfg)
+            return
+        if ns.backend == "two-phase":
+            from .publish import build, publish
+
+            publish(build(steps, cfg), cfg)
+            return
+        if ns.backend in ("dag", "worktree"):
+            _sync_base(cfg.base_branch, cfg)
+            trees = None
+            if ns.backend == "worktree":
+                from .worktrees import Worktrees
+
+                trees = Worktrees(cfg, Path.cwd())
+            try:
+                report = _timeline_dag(steps, cfg, trees).run()
+            finally:
+                if trees is not None:
+                    trees.close()
+            print(report.format())
+            return
+        if cfg.dry_run:
+            for step in steps:
+                _run_step(step, cfg)
+            _finish(cfg)
+            return
+        from .journal import Journal, journal_path
+
+        with Journal(journal_path(name), fresh=not ns.resume) as journal:
+            if created:
+                journal.record(created, first, refs={cfg.base_branch: _tip(cfg.base_branch)})
+            elif not len(journal):
+                journal.start({cfg.base_branch: _tip(cfg.base_branch)})
+            _run_journaled(keyed, cfg, journal)
+
+
+def _activity_model(ns: argparse.Namespace) -> ActivityModel:
+    from .generate import ActivityModel
+
+    span = datetime.timedelta(days=round(365.25 * ns.years))
+    try:
+        start = datetime.date.fromisoformat(ns.start) if ns.start else None
+        end = datetime.date.fromisoformat(ns.end) if ns.end else None
+        lo, _, hi = ns.work_hours.partition("-")
+        hours = (int(lo), int(hi))
+    except ValueError as exc:
+        raise ConfigError(f"generate: {exc}") from exc
+    if start is None:
+        start = (end or datetime.date.today()) - span
+    return ActivityModel(
+        start=start,
+        end=end or start + span,
+        commits_per_day=ns.commits_per_day,
+        weekend_factor=ns.weekend_factor,
+        work_hours=hours,
+        after_hours=ns.after_hours,
+        branch_days=ns.branch_days,
+        parallel_branches=ns.parallel_branches,
+        merge_lag_hours=ns.merge_lag_hours,
+        pr_ratio=ns.pr_ratio,
+        authors=list(ns.author),
+        seed=ns.seed,
+    )
 
-    _exec_git(["push", cfg.remote_name, base], dry=cfg.dry_run)
 
-def main() -> int:
-    ns = _parse_args()
-    if ns.verbose >= 2:
-        LOG.setLevel(logging.DEBUG)
-    elif ns.verbose == 1:
-        LOG.setLevel(logging.INFO)
+def cmd_generate(ns: argparse.Namespace, cfg: AppConfig) -> None:
+    """
+    Write a synthetic JSONL timeline, or with --run execute it as it is
+    generated (the same path as `run-timeline file.jsonl`).
+    """
+    from .generate import generate_events, write_jsonl
+
+    events = generate_events(_activity_model(ns), repo=ns.repo, timezone=ns.timezone)
+    if ns.run:
+        if not ns.repo and not ns.skip_create_repo:
+            raise ConfigError("generate --run needs --repo (or --skip-create-repo)")
+        if ns.seed is None:
+            # Without a seed a second run generates different events; nothing to resume.
+            ns.resume = False
+        _run_stream(events, f"generate-{ns.seed}", ns, cfg)
+        return
+    t0 = time.perf_counter()
+    if ns.output == "-":
+        n = write_jsonl(events, sys.stdout)
     else:
-        LOG.setLevel(logging.WARNING)
+        with open(ns.output, "w", encoding="utf-8") as f:
+            n = write_jsonl(events, f)
+    LOG.info("generated %d events in %.2fs", n, time.perf_counter() - t0)
+
+
+def _tip(branch: str) -> Optional[str]:
+    return default_executor().resolve(f"refs/heads/{branch}")
+
+
+def _journaled(repo_dir: Path, name: str, key: Key) -> bool:
+    from .journal import Journal, journal_path
+
+    if not (repo_dir / ".git").exists():
+        return False
+    with pushd(repo_dir):
+        path = journal_path(name)
+    if not path.exists():
+        return False
+    with Journal(path) as journal:
+        return journal.is_done(key)
+
+
+def _writes(step: Step, cfg: AppConfig) -> list[str]:
+    """Local branches a step moves."""
+    a = step.args
+    if step.kind in ("create-branch", "commit"):
+        return [a["branch"]]
+    if step.kind == "merge-pr":
+        return [a["base"] or cfg.base_branch]
+    if step.kind == "commit-all":
+        return [a["branch"], a["base"] or cfg.base_branch]
+    return []
+
+
+def _step_refs(step: Step, cfg: AppConfig) -> dict[str, Optional[str]]:
+    """Branch tips to journal after `step`; None marks a branch deleted on the remote."""
+    refs: dict[str, Optional[str]] = {b: _tip(b) for b in _writes(step, cfg)}
+    if step.kind in ("merge-pr", "commit-all") and step.args.get("delete_branch", True):
+        refs[step.args["branch"]] = None
+    return refs
+
+
+def _rewind(step: Step, journal: Journal, cfg: AppConfig) -> None:
+    """
+    Undo local effects of a step that was interrupted before it was journaled.
+    Effects that already reached the remote are kept (merge-pr then skips the
+    merge it finds already done).
+    """
+    ex = default_executor()
+    for ref in _writes(step, cfg):
+        want, have = journal.refs.get(ref), _tip(ref)
+        if have == want or have is None:
+            continue
+        if have == ex.resolve(f"refs/remotes/{cfg.remote_name}/{ref}"):
+            LOG.warning("%s: %s was pushed by the interrupted step; keeping it", step.kind, ref)
+            continue
+        LOG.warning("%s: rolling %s back to the last journaled state", step.kind, ref)
+        if want is None:
+            head = git(["symbolic-ref", "-q", "HEAD"], check=False).stdout.strip()
+            if head == f"refs/heads/{ref}":
+                git(["checkout", "-q", step.args.get("base") or cfg.base_branch])
+            ex.update_refs([f"delete refs/heads/{ref} {have}"])
+        else:
+            plumbing.update_branch(ref, want, have)
+
+
+def _republish(journal: Journal, cfg: AppConfig) -> None:
+    """Push journaled branch tips (and deletions) the remote has not seen yet."""
+    ex = default_executor()
+    for ref, want in journal.refs.items():
+        remote_tip = ex.resolve(f"refs/remotes/{cfg.remote_name}/{ref}")
+        if want is None:
+            if remote_tip is not None:
+                _cleanup_branch(ref, None, cfg)
+        elif _tip(ref) != want:
+            LOG.warning("%s moved since it was journaled; not pushing it", ref)
+        elif remote_tip != want:
+            _push_branch(ref, cfg)
+
+
+def _run_journaled(keyed: Iterable[tuple[Key, Step]], cfg: AppConfig, journal: Journal) -> None:
+    skipped, resumed = 0, False
+    for key, step in keyed:
+        if journal.is_done(key):
+            skipped += 1
+            continue
+        if skipped and not resumed:
+            _resume(step, skipped, journal, cfg)
+        resumed = True
+
+        _run_step(step, cfg)
+        if step.kind == "open-pr":
+            fut = cfg.pr_pool.future(step.args["branch"]) if cfg.pr_pool is not None else None
+            if fut is not None:
+                journal.record_when_done(fut, key, step)
+                continue
+        journal.record(key, step, refs=_step_refs(step, cfg))
+        if step.kind == "merge-pr" and cfg.pr_pool is not None:
+            cfg.pr_pool.release(step.args["branch"])
+    if skipped and not resumed:
+        _resume(None, skipped, journal, cfg)
+    _finish(cfg)
+
+
+def _resume(step: Optional[Step], skipped: int, journal: Journal, cfg: AppConfig) -> None:
+    """Repair state left by an interrupted run before running `step`, the first pending one."""
+    LOG.info("Resuming: %d steps already done", skipped)
+    if step is not None:
+        _rewind(step, journal, cfg)
+    _republish(journal, cfg)
+
+
+def _finish(cfg: AppConfig) -> None:
+    """Wait for PRs still being opened, then send whatever pushes are queued."""
+    pool, cfg.pr_pool = cfg.pr_pool, None
+    if pool is not None:
+        try:
+            with tracing.span("wait for PRs", "stage"):
+                pool.wait()
+            LOG.info("opened %d PR(s)", len(pool))
+        finally:
+            pool.close()
+    with tracing.span("drain pushes", "stage"):
+        _drain_pushes(cfg)
+
 
+def _drain_pushes(cfg: AppConfig) -> None:
+    q = cfg.push_queue
+    if q is not None and len(q):
+        q.drain(dry=cfg.dry_run)
+        LOG.info("deferred pushes: %d atomic push(es)", q.flushes)
+
+
+def _timeline_dag(steps, cfg: AppConfig, trees: Optional[Worktrees] = None) -> DagRunner:
+    """
+    Build the dependency DAG for timeline steps. Local git work is chained per
+    branch (and branch births wait for the latest merge into their base);
+    pushes, PR creation and remote deletions are network tasks, so they run
+    while the next branch is being built. With `trees`, each feature branch
+    is built in its own worktree, so work on different branches overlaps too.
+    """
+    import asyncio
+
+    from .dag import NETWORK, DagRunner, Task
+
+    dag = DagRunner(network_slots=cfg.pr_workers)
+    cwd = Path.cwd()
+    last: dict[str, Task] = {}  # latest local task per branch
+    born: dict[str, list[Task]] = {}  # births from each base since its latest merge
+    pushed: dict[str, Task] = {}  # latest push of each base branch
+    opening: dict[str, Task] = {}
+    opened: dict[str, PullRequest] = {}
+
+    def handler(step: Step):
+        a = step.args
+        if trees is None:
+            ns = argparse.Namespace(**a)
+            return functools.partial(asyncio.to_thread, _COMMANDS[step.kind], ns, cfg)
+        env = _commit_env(cfg, a["date"], a.get("author"))
+        if step.kind == "create-branch":
+            base = a["base"] or cfg.base_branch
+            msg = a["message"] or f"chore({a['branch']}): branch birth"
+            return functools.partial(
+                asyncio.to_thread, trees.create_branch, a["branch"], base, msg, env
+            )
+        return functools.partial(asyncio.to_thread, trees.commit, a, env)
+
+    def lock(branch: str) -> str:
+        return trees.lock(branch) if trees is not None else ""
+
+    async def git_remote(args: list[str]) -> None:
+        LOG.info("git %s", " ".join(args))
+        if not cfg.dry_run:
+            await default_executor().arun(["git", *args], cwd=cwd)
+
+    async def open_pr(spec: PRSpec) -> None:
+        LOG.info("gh %s", " ".join(create_args(spec, spec.title or "<tip subject>")))
+        if not cfg.dry_run:
+            opened[spec.head] = await acreate_pr(spec, cwd=cwd)
+
+    async def merge(a: dict, base: str) -> None:
+        branch, pr = a["branch"], opened.get(a["branch"])
+        msg = a.get("message") or render_merge_subject(
+            base=base, branch=branch, pr_number=pr.number if pr else None
+        )
+
+        def run() -> None:
+            if trees is not None:
+                trees.merge(base, branch, msg, _commit_env(cfg, a["date"]))
+                return
+            if not cfg.plumbing:
+                _exec_git(["checkout", base], dry=cfg.dry_run)
+            _merge_noff(base, branch, msg, _commit_env(cfg, a["date"]), cfg)
+
+        await asyncio.to_thread(run)
+
+    for step in steps:
+        a = step.args
+        branch = a["branch"]
+        if step.kind == "create-branch":
+            base = a["base"] or cfg.base_branch
+            last[branch] = dag.add(
+                f"create-branch {branch}", handler(step), deps=[last.get(base)], lock=lock(branch)
+            )
+            born.setdefault(base, []).append(last[branch])
+        elif step.kind == "commit":
+            last[branch] = dag.add(
+                f"commit {branch}: {a['message']}",
+                handler(step),
+                deps=[last.get(branch)],
+                lock=lock(branch),
+            )
+        elif step.kind == "open-pr":
+            spec = PRSpec(branch, a["base"] or cfg.base_branch, a["title"], a["body"], a["draft"])
+            refspec = f"refs/heads/{branch}:refs/heads/{branch}"
+            push = dag.add(
+                f"push {branch}",
+                functools.partial(git_remote, ["push", cfg.remote_name, refspec]),
+                deps=[last.get(branch)],
+                kind=NETWORK,
+            )
+            opening[branch] = dag.add(
+                f"open-pr {branch}", functools.partial(open_pr, spec), deps=[push], kind=NETWORK
+            )
+        elif step.kind == "merge-pr":
+            base = a["base"] or cfg.base_branch
+            last[base] = dag.add(
+                f"merge-pr {branch}",
+                functools.partial(merge, a, base),
+                # Births before this merge in the plan must not see it.
+                deps=[last.get(branch), last.get(base), opening.get(branch), *born.pop(base, [])],
+                lock=lock(base),
+            )
+            if trees is not None:
+                # The merge removes the branch's worktree; later work on it waits.
+                last[branch] = last[base]
+            pushed[base] = dag.add(
+                f"push {base}",
+                functools.partial(git_remote, ["push", cfg.remote_name, base]),
+                deps=[last[base], pushed.get(base)],
+                kind=NETWORK,
+            )
+            if a.get("delete_branch", True):
+                dag.add(
+                    f"delete {branch}",
+                    functools.partial(git_remote, ["push", cfg.remote_name, "--delete", branch]),
+                    deps=[pushed[base]],
+                    kind=NETWORK,
+                )
+        else:
+            raise TimelineError(f"dag backend does not support step {step.kind!r}")
+    return dag
+
+
+def cmd_serve(ns: argparse.Namespace, cfg: AppConfig) -> None:
+    """Serve commands on a Unix socket until stopped (see legends.server)."""
+    from .server import serve
+
+    serve(cfg, ns.socket, ns.config)
+
+
+def _run_step(step: Step, cfg: AppConfig) -> None:
+    LOG.info("step: %s %s", step.kind, step.feature or "")
+    name = f"{step.kind} {step.args.get('branch') or step.args.get('name') or ''}".strip()
+    with tracing.span(name, "step", feature=step.feature):
+        _COMMANDS[step.kind](argparse.Namespace(**step.args), cfg)
+
+
+_COMMANDS = {
+    "create-repo": cmd_create_repo,
+    "create-branch": cmd_create_branch,
+    "create-branches": cmd_create_branches,
+    "commit": cmd_commit,
+    "open-pr": cmd_open_pr,
+    "merge-pr": cmd_merge_pr,
+    "commit-all": cmd_commit_all,
+    "run-timeline": cmd_run_timeline,
+    "run-many": cmd_run_many,
+    "generate": cmd_generate,
+    "serve": cmd_serve,
+}
+
+
+def _writes_commits(ns: argparse.Namespace) -> bool:
+    """Whether the command makes commits, and so needs an author/committer identity."""
+    if ns.cmd in ("open-pr", "serve"):
+        return False
+    if ns.cmd == "generate":
+        return ns.run
+    return True
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ns = _parse_args(argv)
+    _apply_verbosity(ns.verbose)
+    return run(ns)
+
+
+def run(ns: argparse.Namespace, cfg: Optional[AppConfig] = None) -> int:
+    """
+    Run a parsed command line and return the exit status. `cfg` replaces
+    loading the configuration; the server passes a copy of its warm one.
+    """
+    if ns.trace:
+        tracing.start()
     try:
-        cfg = _resolve_config(ns)
-        cfg = _hydrate_identity(cfg)
+        with tracing.span("config", "stage"):
+            cfg = _resolve_config(ns, cfg)
+        github_scheduler().configure(
+            retries=cfg.gh_retries, writes_per_minute=cfg.gh_writes_per_minute
+        )
+        if cfg.template_dir:
+            set_template_dirs([cfg.template_dir])
+        if _writes_commits(ns):
+            with tracing.span("identity", "stage"):
+                cfg = _hydrate_identity(cfg, refresh=ns.refresh_identity, offline=cfg.dry_run)
         LOG.debug("Config: %s", cfg)
 
-        cmd = ns.cmd.replace("-", "_")
-        if cmd == "create_repo":
-            cmd_create_repo(ns, cfg)
-        elif cmd == "create_branch":
-            cmd_create_branch(ns, cfg)
-        elif cmd == "commit":
-            cmd_commit(ns, cfg)
-        elif cmd == "open_pr":
-            cmd_open_pr(ns, cfg)
-        elif cmd == "merge_pr":
-            cmd_merge_pr(ns, cfg)
-        elif cmd == "commit_all":
-            cmd_commit_all(ns, cfg)
-        else:
+        handler = _COMMANDS.get(ns.cmd)
+        if handler is None:
             raise BackdateError(f"Unknown command: {ns.cmd}")
+        try:
+            with tracing.span(ns.cmd, "step"):
+                handler(ns, cfg)
+        except (BackdateError, CommandError):
+            if cfg.push_queue is not None and len(cfg.push_queue):
+                LOG.warning("Not pushed: %s", " ".join(cfg.push_queue.pending()))
+            raise
+        _finish(cfg)
+        LOG.debug("Exec: %s", default_executor().stats.summary())
+        sched = github_scheduler()
+        if sched.retried or sched.waited:
+            LOG.info("GitHub pacing: %d retries, %.1fs waited", sched.retried, sched.waited)
         return 0
     except BackdateError as e:
         LOG.error(str(e))
@@ -485,6 +1274,10 @@ def main() -> int:
     except KeyboardInterrupt:
         LOG.error("Interrupted.")
         return 130
+    finally:
+        if ns.trace:
+            tracing.stop(ns.trace)
+            LOG.info("Trace written to %s", ns.trace)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+"""
+Thin client for `legends serve`.
+
+    legends serve &
+    legends-client commit --branch feature-x --date "2025-02-10 15:00" --message "feat: x"
+    legends-client --shutdown
+
+The arguments are the ones `legends` takes. They are sent with the current
+directory to the server, which runs them in its warm process; its output and
+exit status come back as if `legends` had run here. When no server is
+listening, the command runs in this process instead. This module imports
+nothing else from the package, so the client starts as fast as the interpreter.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+from typing import IO, Optional, Sequence
+
+
+def socket_path() -> str:
+    """$LEGENDS_SOCKET, else legends.sock in the cache dir (LEGENDS_CACHE_DIR or XDG)."""
+    path = os.getenv("LEGENDS_SOCKET")
+    if path:
+        return path
+    root = os.getenv("LEGENDS_CACHE_DIR")
+    if not root:
+        xdg = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        root = os.path.join(xdg, "legends")
+    return os.path.join(root, "legends.sock")
+
+
+def send(
+    request: dict,
+    path: Optional[str] = None,
+    *,
+    out: IO[str] = sys.stdout,
+    err: IO[str] = sys.stderr,
+) -> int:
+    """
+    Send one request and relay the replies until the exit status arrives.
+    Raises OSError (FileNotFoundError, ConnectionRefusedError) when no server listens.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path or socket_path())
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                msg = json.loads(line)
+                if "exit" in msg:
+                    return int(msg["exit"])
+                stream = out if "out" in msg else err
+                stream.write(msg.get("out", msg.get("err", "")))
+                stream.flush()
+    err.write("legends: the server closed the connection without an exit status\n")
+    return 1
+
+
+def run(argv: Sequence[str], path: Optional[str] = None) -> int:
+    """Run a `legends` command line on the server, or here when none is listening."""
+    try:
+        return send({"argv": list(argv), "cwd": os.getcwd()}, path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        from .cli import main
+
+        return main(list(argv))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    path = None
+    if argv[:1] == ["--socket"] and len(argv) > 1:
+        path, argv = argv[1], argv[2:]
+    if argv == ["--shutdown"]:
+        try:
+            return send({"shutdown": True}, path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            print(f"legends: no server at {path or socket_path()}", file=sys.stderr)
+            return 1
+    return run(argv, path)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
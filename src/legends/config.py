@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Optional
 
 from .exceptions import ConfigError
 
+if TYPE_CHECKING:
+    from .prs import PRPool
+    from .pushq import PushQueue
+
 
 @dataclass
 class AppConfig:
@@ -22,8 +26,20 @@ class AppConfig:
     committer_email: str | None = None
 
     token_env: str = "GITHUB_TOKEN"
+    identity_ttl: int = 24 * 3600
+    identity_public_email: bool = False
+    pr_workers: int = 8
+    gh_retries: int = 5
+    gh_writes_per_minute: int = 80
+    template_dir: str | None = None
 
     dry_run: bool = False
+    plumbing: bool = False
+    defer_push: bool = False
+
+    # Runtime state shared by the commands of one run (not configuration).
+    push_queue: Optional["PushQueue"] = field(default=None, repr=False, compare=False)
+    pr_pool: Optional["PRPool"] = field(default=None, repr=False, compare=False)
 
     def visibility_flag(self) -> str:
         return "--private" if self.visibility.lower() == "private" else "--public"
@@ -44,6 +60,16 @@ def _read_yaml(path: Path) -> dict[str, Any]:
         raise ConfigError(f"Failed to read YAML config: {path}") from exc
 
 
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if not isinstance(raw, str) or not raw.strip():
+        return default
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise ConfigError(f"{name} must be an integer") from exc
+
+
 def load_config(yaml_path: str | None = None) -> AppConfig:
     """
     Load configuration from (optional) YAML file and environment variables.
@@ -76,6 +102,22 @@ def load_config(yaml_path: str | None = None) -> AppConfig:
             cfg.committer_email = data["committer"].get("email") or cfg.committer_email
         if "token_env" in data:
             cfg.token_env = str(data["token_env"])
+        if "identity_ttl" in data:
+            cfg.identity_ttl = int(data["identity_ttl"])
+        if "identity_public_email" in data:
+            cfg.identity_public_email = bool(data["identity_public_email"])
+        if "pr_workers" in data:
+            cfg.pr_workers = int(data["pr_workers"])
+        if "gh_retries" in data:
+            cfg.gh_retries = int(data["gh_retries"])
+        if "gh_writes_per_minute" in data:
+            cfg.gh_writes_per_minute = int(data["gh_writes_per_minute"])
+        if data.get("template_dir"):
+            cfg.template_dir = str(data["template_dir"])
+        if "plumbing" in data:
+            cfg.plumbing = bool(data["plumbing"])
+        if "defer_push" in data:
+            cfg.defer_push = bool(data["defer_push"])
 
     cfg.base_branch = os.getenv("GHB_BASE_BRANCH", cfg.base_branch)
     cfg.remote_name = os.getenv("GHB_REMOTE", cfg.remote_name)
@@ -88,11 +130,30 @@ def load_config(yaml_path: str | None = None) -> AppConfig:
     cfg.committer_email = os.getenv("GIT_COMMITTER_EMAIL", cfg.committer_email) or cfg.committer_email
 
     cfg.token_env = os.getenv("GHB_TOKEN_ENV", cfg.token_env)
+    cfg.identity_ttl = _env_int("GHB_IDENTITY_TTL", cfg.identity_ttl)
+    cfg.pr_workers = _env_int("GHB_PR_WORKERS", cfg.pr_workers)
+    cfg.gh_retries = _env_int("GHB_GH_RETRIES", cfg.gh_retries)
+    cfg.gh_writes_per_minute = _env_int("GHB_GH_WRITES_PER_MINUTE", cfg.gh_writes_per_minute)
+    cfg.template_dir = os.getenv("GHB_TEMPLATE_DIR") or cfg.template_dir
+    if cfg.pr_workers < 1:
+        raise ConfigError("pr_workers must be at least 1")
 
     dry = os.getenv("GHB_DRY_RUN")
     if isinstance(dry, str) and dry.strip():
         cfg.dry_run = dry.strip().lower() in {"1", "true", "yes", "on"}
 
+    plumbing = os.getenv("GHB_PLUMBING")
+    if isinstance(plumbing, str) and plumbing.strip():
+        cfg.plumbing = plumbing.strip().lower() in {"1", "true", "yes", "on"}
+
+    public = os.getenv("GHB_IDENTITY_PUBLIC_EMAIL")
+    if isinstance(public, str) and public.strip():
+        cfg.identity_public_email = public.strip().lower() in {"1", "true", "yes", "on"}
+
+    defer = os.getenv("GHB_DEFER_PUSH")
+    if isinstance(defer, str) and defer.strip():
+        cfg.defer_push = defer.strip().lower() in {"1", "true", "yes", "on"}
+
     if cfg.visibility not in {"private", "public"}:
         raise ConfigError("GHB_VISIBILITY must be 'private' or 'public'")
 
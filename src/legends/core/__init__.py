@@ -1,11 +1,10 @@
 from __future__ import annotations
 
-import os
-import shutil
-import subprocess
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Mapping, MutableMapping, Optional, Sequence
+from typing import Mapping, Optional, Sequence
+
+from ..executor import default_executor, which
 
 
 @dataclass
@@ -37,7 +36,7 @@ class CoreCommandError(RuntimeError):
 
 def ensure_tool(name: str, hint: str | None = None) -> None:
     """Ensure a required tool is on PATH."""
-    if shutil.which(name) is None:
+    if which(name) is None:
         h = f" Install '{name}' and ensure it is available on PATH." if hint is None else f" {hint}"
         raise CoreCommandError([name, "--version"], 127, "", f"Required tool not found: {name}.{h}")
 
@@ -51,19 +50,11 @@ def _run(
     capture: bool = True,
 ) -> RunResult:
     """Run a command and return a structured result (raises on failure if check=True)."""
-    full_env: MutableMapping[str, str] = dict(os.environ)
-    if env:
-        full_env.update(env)
-
-    kwargs: dict = {"cwd": str(cwd) if cwd else None, "env": full_env, "text": True}
-    if capture:
-        kwargs.update({"stdout": subprocess.PIPE, "stderr": subprocess.PIPE})
-    proc = subprocess.run(list(cmd), **kwargs)
-
-    out, err = proc.stdout or "", proc.stderr or ""
+    ex = default_executor()
+    proc = ex.run(cmd, cwd=cwd, env=ex.env(env), check=False, capture=capture)
     if check and proc.returncode != 0:
-        raise CoreCommandError(list(cmd), proc.returncode, out, err)
-    return RunResult(list(cmd), proc.returncode, out, err)
+        raise CoreCommandError(list(cmd), proc.returncode, proc.stdout, proc.stderr)
+    return RunResult(list(cmd), proc.returncode, proc.stdout, proc.stderr)
 
 
 def git(args: Sequence[str], **kwargs) -> RunResult:
@@ -72,7 +63,12 @@ def git(args: Sequence[str], **kwargs) -> RunResult:
     return _run(["git", *args], **kwargs)
 
 
-def gh(args: Sequence[str], **kwargs) -> RunResult:
-    """Run a GitHub CLI command."""
+def gh(args: Sequence[str], *, check: bool = True, **kwargs) -> RunResult:
+    """Run a GitHub CLI command (paced and retried by the GitHub scheduler)."""
+    from ..ratelimit import github_scheduler
+
     ensure_tool("gh", "See https://cli.github.com/")
-    return _run(["gh", *args], **kwargs)
+    res = github_scheduler().call(args, lambda a: _run(["gh", *a], check=False, **kwargs))
+    if check and res.returncode != 0:
+        raise CoreCommandError(res.cmd, res.returncode, res.stdout, res.stderr)
+    return RunResult(res.cmd, res.returncode, res.stdout, res.stderr)
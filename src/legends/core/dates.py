@@ -1,46 +1,115 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Dict, Optional
+import functools
+import re
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, List, Optional
 
+from ..exceptions import DateParseError
 
-class DateParseError(ValueError):
-    pass
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # pragma: no cover - stripped-down Python builds
+    ZoneInfo = None  # type: ignore[assignment,misc]
+    ZoneInfoNotFoundError = KeyError  # type: ignore[assignment,misc]
 
+GIT_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+_OFFSET = re.compile(r"([+-])(\d\d):?(\d\d)")
 
-def normalize_git_date(date_str: str) -> str:
+
+@functools.lru_cache(maxsize=None)
+def resolve_tz(name: Optional[str]) -> Optional[tzinfo]:
     """
-    Normalize a date string into 'YYYY-MM-DDTHH:MM:SSZ' (UTC).
-    Accepts:
-      - 'YYYY-MM-DD'
-      - 'YYYY-MM-DD HH:MM[:SS]'
-      - 'YYYY-MM-DDTHH:MM[:SS]'
-      - with optional 'Z' or '+/-HH:MM' offset
-
-    Naive (no offset) times are treated as local time and converted to UTC.
+    Resolve a zone name once: None/'local' -> None (the system's local time,
+    DST included), 'UTC'/'Z', fixed offsets like '+05:30', or an IANA name
+    such as 'Europe/Berlin'.
     """
-    if not date_str:
-        raise DateParseError("Empty date string")
+    if name is None or name.strip().lower() in ("", "local"):
+        return None
+    name = name.strip()
+    if name.upper() in ("UTC", "Z", "GMT"):
+        return timezone.utc
+    m = _OFFSET.fullmatch(name)
+    if m:
+        delta = timedelta(hours=int(m.group(2)), minutes=int(m.group(3)))
+        return timezone(-delta if m.group(1) == "-" else delta)
+    if ZoneInfo is not None:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    raise DateParseError(f"Unknown time zone: {name!r}")
 
+
+@functools.lru_cache(maxsize=65536)
+def _parse(date_str: str, tz: Optional[str]) -> datetime:
     s = date_str.strip().replace(" ", "T")
     if len(s) == 10 and s.count("-") == 2:
         s = s + "T00:00:00"
-
     try:
-        if s.endswith("Z"):
-            dt = datetime.fromisoformat(s[:-1])
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        has_offset = any(x in s[10:] for x in ["+", "-"])
-        dt = datetime.fromisoformat(s)
-        if dt.tzinfo is None:
-            local_tz = datetime.now().astimezone().tzinfo or timezone.utc
-            dt = dt.replace(tzinfo=local_tz)
-        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    except Exception as exc:
+        dt = datetime.fromisoformat(s[:-1] if s.endswith("Z") else s)
+        if s.endswith("Z") and dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+    except ValueError as exc:
         raise DateParseError(f"Could not parse date: {date_str!r}") from exc
+    if dt.tzinfo is None:
+        zone = resolve_tz(tz)
+        # A naive datetime's astimezone() applies the local zone's rules for
+        # that date, so DST is honoured without asking the OS per call.
+        dt = dt.astimezone() if zone is None else dt.replace(tzinfo=zone)
+    return dt.astimezone(timezone.utc)
+
+
+def parse_date(date_str: str, tz: Optional[str] = None) -> datetime:
+    """
+    Parse a date into an aware UTC datetime.
+
+    Accepts 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM[:SS]' and 'YYYY-MM-DDTHH:MM[:SS]',
+    with an optional 'Z' or '+/-HH:MM' offset. Naive times are read in `tz`
+    (see `resolve_tz`), by default local time. Results are memoized, so
+    timelines that repeat dates parse each distinct string once.
+    """
+    if not date_str:
+        raise DateParseError("Empty date string")
+    return _parse(str(date_str), tz)
+
+
+def normalize_git_date(date_str: str, tz: Optional[str] = None) -> str:
+    """Normalize a date string into 'YYYY-MM-DDTHH:MM:SSZ' (UTC)."""
+    return parse_date(date_str, tz).strftime(GIT_DATE_FORMAT)
+
+
+def git_epoch(date_str: str, tz: Optional[str] = None) -> int:
+    """Seconds since the epoch for a date string (as used in raw git timestamps)."""
+    return int(parse_date(date_str, tz).timestamp())
+
+
+class DateBatch:
+    """
+    Normalize many dates in one pass, collecting every error with its
+    location instead of stopping at the first one.
+    """
+
+    def __init__(self, default_tz: Optional[str] = None):
+        self.default_tz = default_tz
+        self.errors: List[str] = []
+
+    def parse(self, value: object, where: str, tz: Optional[str] = None) -> Optional[datetime]:
+        try:
+            return parse_date(str(value), tz or self.default_tz)
+        except DateParseError as exc:
+            self.errors.append(f"{where}: {exc}")
+            return None
+
+    def check_order(
+        self, earlier: Optional[datetime], later: Optional[datetime], where: str, what: str
+    ) -> None:
+        """Record an error unless `earlier <= later` (skipped when either failed to parse)."""
+        if earlier is not None and later is not None and later < earlier:
+            self.errors.append(
+                f"{where}: {what} ({later.strftime(GIT_DATE_FORMAT)} is before "
+                f"{earlier.strftime(GIT_DATE_FORMAT)})"
+            )
 
 
 def build_commit_env(
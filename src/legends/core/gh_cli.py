@@ -4,6 +4,7 @@ import json
 from pathlib import Path
 from typing import Optional, Sequence
 
+from ..prs import PRSpec, create_pr
 from . import RunResult, gh
 
 
@@ -49,19 +50,9 @@ def pr_create(
     cwd: Path,
 ) -> int:
     """
-    Create a PR and return its number.
+    Create a PR and return its number (taken from the API response).
     """
-    args = ["pr", "create", "--head", head, "--base", base, "--title", title]
-    if body:
-        args.extend(["--body", body])
-    if draft:
-        args.append("--draft")
-    gh(args, cwd=cwd)
-
-    num = pr_number_for_branch(head, cwd=cwd)
-    if num is None:
-        raise RuntimeError("PR was created but the PR number could not be resolved.")
-    return num
+    return create_pr(PRSpec(head, base, title, body, draft), cwd=cwd).number
 
 
 def pr_number_for_branch(head: str, *, cwd: Path) -> Optional[int]:
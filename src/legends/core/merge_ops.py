@@ -5,7 +5,7 @@ from typing import Optional
 
 from .git_ops import merge_noff_no_commit, merge_commit, pull, push, checkout
 from .gh_cli import pr_close
-from .templates import TEMPLATES, render
+from ..templates import render_merge_message
 
 
 def merge_branch_backdated(
@@ -28,16 +28,7 @@ def merge_branch_backdated(
     pull(repo_dir, "origin", base)
     merge_noff_no_commit(repo_dir, base, head)
 
-    if pr_number is not None:
-        msg = render(
-            TEMPLATES.merge_message_with_pr,
-            {"pr_number": pr_number, "branch": head, "base": base, "title": f"Merge {head}"},
-        )
-    else:
-        msg = render(
-            TEMPLATES.merge_message_plain,
-            {"branch": head, "base": base, "title": f"Merge {head}"},
-        )
+    msg = render_merge_message(base=base, branch=head, pr_number=pr_number)
 
     merge_commit(
         repo_dir,
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from . import tracing
+
+LOCAL = "local"
+NETWORK = "network"
+
+
+@dataclass(eq=False)
+class Task:
+    """
+    One node of the DAG.
+
+    LOCAL tasks read or write the repository's index, working tree or refs and
+    run one at a time per `lock` (one working tree each); NETWORK tasks
+    (pushes, GitHub API calls) overlap with them and with each other, up to
+    the runner's `network_slots`.
+    """
+
+    name: str
+    action: Callable[[], Awaitable[Any]]
+    deps: list["Task"] = field(default_factory=list)
+    kind: str = LOCAL
+    lock: str = ""
+    start: float = 0.0
+    end: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.end - self.start)
+
+
+@dataclass
+class Report:
+    tasks: int
+    wall: float
+    serial: float
+    critical: float
+    path: list[Task]
+
+    def format(self, limit: int = 10) -> str:
+        speedup = self.serial / self.wall if self.wall else 1.0
+        lines = [
+            f"{self.tasks} tasks in {self.wall:.2f}s (serial {self.serial:.2f}s, "
+            f"x{speedup:.1f}); critical path {self.critical:.2f}s over {len(self.path)} tasks"
+        ]
+        for t in sorted(self.path, key=lambda t: t.duration, reverse=True)[:limit]:
+            lines.append(f"  {t.duration:8.3f}s  {t.kind:<7}  {t.name}")
+        return "\n".join(lines)
+
+
+class DagRunner:
+    """
+    Run tasks as soon as their dependencies have finished.
+
+    Tasks must be added after their dependencies, so insertion order is a
+    topological order. When a task fails, its dependents are skipped, tasks
+    already running are allowed to finish, and the first failure is raised.
+    """
+
+    def __init__(self, *, network_slots: int = 8):
+        self.network_slots = max(1, network_slots)
+        self.tasks: list[Task] = []
+
+    def add(
+        self,
+        name: str,
+        action: Callable[[], Awaitable[Any]],
+        *,
+        deps: Iterable[Optional[Task]] = (),
+        kind: str = LOCAL,
+        lock: str = "",
+    ) -> Task:
+        task = Task(name, action, [d for d in deps if d is not None], kind, lock=lock)
+        self.tasks.append(task)
+        return task
+
+    async def _run_all(self) -> None:
+        local: dict[str, asyncio.Lock] = {}
+        network = asyncio.Semaphore(self.network_slots)
+        running: dict[Task, asyncio.Future] = {}
+
+        async def run_one(task: Task) -> None:
+            for dep in task.deps:
+                await running[dep]
+            slot = local.setdefault(task.lock, asyncio.Lock()) if task.kind == LOCAL else network
+            async with slot:
+                task.start = time.perf_counter()
+                try:
+                    with tracing.span(task.name, "step", kind=task.kind):
+                        await task.action()
+                finally:
+                    task.end = time.perf_counter()
+
+        for task in self.tasks:
+            running[task] = asyncio.ensure_future(run_one(task))
+        results = await asyncio.gather(*running.values(), return_exceptions=True)
+        # Dependents re-raise their dependency's exception, so the first one in
+        # insertion order is the root cause.
+        for res in results:
+            if isinstance(res, BaseException):
+                raise res
+
+    def run(self) -> Report:
+        t0 = time.perf_counter()
+        asyncio.run(self._run_all())
+        return self.report(time.perf_counter() - t0)
+
+    def report(self, wall: float) -> Report:
+        """
+        Summarise a finished run. The critical path is the longest chain of
+        dependencies weighted by measured durations: the wall time the plan
+        would take with unlimited workers and no lock contention.
+        """
+        best: dict[Task, tuple[float, Optional[Task]]] = {}
+        for t in self.tasks:
+            prev = max(t.deps, key=lambda d: best[d][0], default=None)
+            best[t] = (t.duration + (best[prev][0] if prev else 0.0), prev)
+
+        path: list[Task] = []
+        node = max(best, key=lambda t: best[t][0], default=None)
+        critical = best[node][0] if node else 0.0
+        while node is not None:
+            path.append(node)
+            node = best[node][1]
+        path.reverse()
+        return Report(
+            tasks=len(self.tasks),
+            wall=wall,
+            serial=sum(t.duration for t in self.tasks),
+            critical=critical,
+            path=path,
+        )
@@ -52,3 +52,7 @@ class GitError(BackdateError):
 
 class GitHubCLIError(BackdateError):
     """Generic GitHub CLI (`gh`) failure wrapper."""
+
+
+class TimelineError(BackdateError):
+    """Raised when a timeline file is malformed or cannot be compiled."""
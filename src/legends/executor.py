@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import atexit
+import functools
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+from . import tracing
+from .exceptions import CommandError
+
+
+@functools.lru_cache(maxsize=None)
+def which(name: str) -> Optional[str]:
+    """`shutil.which`, resolved once per process."""
+    return shutil.which(name)
+
+
+@dataclass
+class RunResult:
+    cmd: list[str]
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+@dataclass
+class ExecStats:
+    """Counters for external work: processes spawned vs. requests served by batch sessions."""
+
+    spawned: Counter = field(default_factory=Counter)
+    spawn_seconds: float = 0.0
+    batched: Counter = field(default_factory=Counter)
+
+    def summary(self) -> str:
+        procs = sum(self.spawned.values())
+        ops = sum(self.batched.values())
+        avg = (self.spawn_seconds / procs * 1000) if procs else 0.0
+        return (
+            f"{procs} processes ({self.spawn_seconds:.3f}s, {avg:.1f}ms avg; "
+            f"{dict(self.spawned)}), {ops} batched ops ({dict(self.batched)})"
+        )
+
+
+def _git_dir_id(cwd: str | Path) -> Optional[tuple[int, int]]:
+    """(device, inode) of the `.git` `cwd` is in; a re-created repository has a new one."""
+    start = Path(cwd)
+    for d in (start, *start.parents):
+        try:
+            st = os.stat(d / ".git")
+        except OSError:
+            continue
+        return (st.st_dev, st.st_ino)
+    return None
+
+
+class _Session:
+    """A long-lived git process speaking a line protocol on stdin/stdout."""
+
+    def __init__(self, args: Sequence[str], *, cwd: str, env: Mapping[str, str]):
+        self.args = list(args)
+        self.cwd = cwd
+        self.repo = _git_dir_id(cwd)
+        self.proc = subprocess.Popen(
+            self.args,
+            cwd=cwd,
+            env=dict(env),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self.lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def request(self, payload: str, replies: int) -> list[str]:
+        """Write `payload` and read `replies` response lines."""
+        try:
+            self.proc.stdin.write(payload)
+            self.proc.stdin.flush()
+            out = []
+            for _ in range(replies):
+                line = self.proc.stdout.readline()
+                if not line:
+                    break
+                out.append(line.rstrip("\n"))
+        except BrokenPipeError:
+            out = []
+        if len(out) < replies:
+            self.close()
+            raise CommandError(
+                ["git", *self.args[1:]],
+                self.proc.returncode or 1,
+                "\n".join(out),
+                self.proc.stderr.read(),
+            )
+        return out
+
+    def close(self) -> None:
+        if self.alive:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            self.proc.wait()
+
+
+class Executor:
+    """
+    Run git/gh commands with a prepared base environment and memoized tool
+    paths, and keep per-repository batch processes for hot operations:
+
+    - `git cat-file --batch-check` answers "does this ref exist / what does it
+      point to" without a `rev-parse` process per lookup;
+    - `git update-ref --stdin` applies ref updates as transactions on one
+      long-lived process.
+    """
+
+    def __init__(self):
+        self._base_env: Optional[dict[str, str]] = None
+        self._sessions: dict[tuple[str, str], _Session] = {}
+        self._lock = threading.Lock()
+        self.stats = ExecStats()
+
+    def base_env(self) -> dict[str, str]:
+        if self._base_env is None:
+            self._base_env = dict(os.environ)
+        return self._base_env
+
+    def env(self, overlay: Mapping[str, str] | None = None) -> dict[str, str]:
+        base = self.base_env()
+        return {**base, **overlay} if overlay else base
+
+    def run(
+        self,
+        cmd: Sequence[str],
+        *,
+        cwd: str | Path | None = None,
+        env: Mapping[str, str] | None = None,
+        check: bool = True,
+        capture: bool = True,
+        input: str | None = None,
+    ) -> RunResult:
+        """Run `cmd`; `env` is the complete environment (None -> the prepared base env)."""
+        argv = list(cmd)
+        exe = which(argv[0]) or argv[0]
+        pipe = subprocess.PIPE if capture else None
+        start = time.perf_counter()
+        with tracing.command_span(argv) as sp:
+            proc = subprocess.run(
+                [exe, *argv[1:]],
+                cwd=str(cwd) if cwd else None,
+                env=dict(env) if env is not None else self.base_env(),
+                input=input,
+                stdout=pipe,
+                stderr=pipe,
+                text=True,
+            )
+            tracing.record_result(sp, proc.returncode, proc.stdout or "", proc.stderr or "")
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats.spawn_seconds += elapsed
+            self.stats.spawned[argv[0]] += 1
+
+        out, err = proc.stdout or "", proc.stderr or ""
+        if check and proc.returncode != 0:
+            raise CommandError(argv, proc.returncode, out, err)
+        return RunResult(argv, proc.returncode, out, err)
+
+    async def arun(
+        self,
+        cmd: Sequence[str],
+        *,
+        cwd: str | Path | None = None,
+        env: Mapping[str, str] | None = None,
+        check: bool = True,
+        input: str | None = None,
+    ) -> RunResult:
+        """`run` for asyncio callers: the child is awaited, not waited on by a thread."""
+        import asyncio  # loaded by the caller's event loop; kept off the sync startup path
+
+        argv = list(cmd)
+        exe = which(argv[0]) or argv[0]
+        start = time.perf_counter()
+        with tracing.command_span(argv) as sp:
+            proc = await asyncio.create_subprocess_exec(
+                exe,
+                *argv[1:],
+                cwd=str(cwd) if cwd else None,
+                env=dict(env) if env is not None else self.base_env(),
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            raw_out, raw_err = await proc.communicate(input.encode("utf-8") if input else None)
+            tracing.record_result(sp, proc.returncode, raw_out, raw_err)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats.spawn_seconds += elapsed
+            self.stats.spawned[argv[0]] += 1
+
+        out = raw_out.decode("utf-8", "replace")
+        err = raw_err.decode("utf-8", "replace")
+        if check and proc.returncode != 0:
+            raise CommandError(argv, proc.returncode, out, err)
+        return RunResult(argv, proc.returncode, out, err)
+
+    def _session(self, kind: str, args: Sequence[str], cwd: str | Path | None) -> _Session:
+        key = (kind, str(Path(cwd or ".").resolve()))
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is None or not s.alive:
+                exe = which("git") or "git"
+                with tracing.command_span(["git", *args]):
+                    s = _Session([exe, *args], cwd=key[1], env=self.base_env())
+                self.stats.spawned["git"] += 1
+                self._sessions[key] = s
+            return s
+
+    def resolve(self, rev: str, *, cwd: str | Path | None = None) -> Optional[str]:
+        """Return the object id `rev` names (e.g. 'main', 'x^{tree}'), or None if missing."""
+        if not rev or "\n" in rev:
+            return None
+        s = self._session("cat-file", ["cat-file", "--batch-check"], cwd)
+        with s.lock, tracing.span("cat-file --batch-check", "batch", rev=rev):
+            line = s.request(f"{rev}\n", 1)[0]
+        self.stats.batched["cat-file"] += 1
+        parts = line.split()
+        if len(parts) == 3 and parts[1] in {"commit", "tree", "blob", "tag"}:
+            return parts[0]
+        return None
+
+    def ref_exists(self, rev: str, *, cwd: str | Path | None = None) -> bool:
+        return self.resolve(rev, cwd=cwd) is not None
+
+    def update_refs(self, commands: Sequence[str], *, cwd: str | Path | None = None) -> None:
+        """
+        Apply `update-ref --stdin` commands (e.g. "update refs/heads/x <new> <old>")
+        as one all-or-nothing transaction on the repository's session.
+        """
+        if not commands:
+            return
+        s = self._session("update-ref", ["update-ref", "--stdin"], cwd)
+        payload = "start\n" + "".join(f"{c}\n" for c in commands) + "commit\n"
+        with s.lock, tracing.span("update-ref --stdin", "batch", updates=len(commands)):
+            replies = s.request(payload, 2)
+        if replies != ["start: ok", "commit: ok"]:
+            s.close()
+            raise CommandError(["git", "update-ref", "--stdin"], 1, "\n".join(replies), "")
+        self.stats.batched["update-ref"] += len(commands)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for s in sessions:
+            s.close()
+
+    def drop_stale(self) -> None:
+        """
+        Close the batch processes whose repository was deleted or re-created
+        since they started; they would go on answering for the old one. For
+        long-lived callers (the server) between commands.
+        """
+        with self._lock:
+            stale = [k for k, s in self._sessions.items() if _git_dir_id(s.cwd) != s.repo]
+            sessions = [self._sessions.pop(k) for k in stale]
+        for s in sessions:
+            s.close()
+
+    def _after_fork(self) -> None:
+        # A forked child (e.g. a process pool worker) must not write to its
+        # parent's batch processes; it starts its own on first use.
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.stats = ExecStats()
+
+
+_DEFAULT: Optional[Executor] = None
+
+
+def default_executor() -> Executor:
+    """The process-wide executor used by `utils.git`/`utils.gh` and the core wrappers."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = Executor()
+        atexit.register(_DEFAULT.close)
+        os.register_at_fork(after_in_child=_DEFAULT._after_fork)
+    return _DEFAULT
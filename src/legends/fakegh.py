@@ -0,0 +1,593 @@
+"""
+Local stand-in for the GitHub CLI.
+
+Implements the `gh` commands and API endpoints legends uses against state
+kept on disk instead of GitHub: repositories are bare git repositories and
+pull requests live in a JSON file. For offline runs, tests and profiling:
+
+    python -m legends.fakegh install /tmp/fakegh/bin --latency 0.2
+    PATH=/tmp/fakegh/bin:$PATH legends commit-all ...
+    /tmp/fakegh/bin/gh stats     # calls made, limits, PRs (`gh reset` forgets all)
+
+Supported: `repo create`; `pr create|list|view|close|review|comment`;
+`api user`, `api user/emails`, `api rate_limit`, `api repos/{owner}/{repo}/pulls`
+(POST, GET by number and GET ?head=&state=) and `api graphql` pull request
+state lookups.
+
+Behaviour is set through the environment (baked into the shim by `install`):
+
+    LEGENDS_FAKE_GH_HOME               state directory (default ~/.cache/legends/fakegh)
+    LEGENDS_FAKE_GH_LATENCY            seconds per call, or 'read,write' (default 0)
+    LEGENDS_FAKE_GH_RATE_LIMIT         requests per window and resource (default 5000)
+    LEGENDS_FAKE_GH_RATE_WINDOW        rate-limit window in seconds (default 3600)
+    LEGENDS_FAKE_GH_WRITES_PER_MINUTE  content-creation cap; above it writes get a
+                                       secondary rate limit (default 0: no cap)
+    LEGENDS_FAKE_GH_FAIL_EVERY         reject every n-th write with a secondary
+                                       rate limit, deterministically (default 0)
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: calls are not serialized
+    fcntl = None  # type: ignore[assignment]
+
+LOGIN = "legends-bot"
+_ENV = "LEGENDS_FAKE_GH_"
+_PR_FIELDS = (
+    "number", "url", "title", "body", "state", "isDraft", "headRefName", "baseRefName",
+    "headRefOid", "createdAt", "mergedAt", "closedAt", "comments", "reviews",
+)  # fmt: skip
+
+
+class _Reply(Exception):
+    """Ends a call: HTTP `status`, a JSON `body` (or plain text) and an error message."""
+
+    def __init__(
+        self, status: int, body: Any = None, error: str = "", headers: Optional[dict] = None
+    ):
+        super().__init__(error)
+        self.status = status
+        self.body = body
+        self.error = error
+        self.headers = headers or {}
+
+
+def _home() -> Path:
+    root = os.getenv(_ENV + "HOME")
+    if root:
+        return Path(root)
+    xdg = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(xdg) / "legends" / "fakegh"
+
+
+def _num(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(_ENV + name) or default)
+    except ValueError:
+        return default
+
+
+def _latency(writes: bool) -> float:
+    raw = os.getenv(_ENV + "LATENCY") or "0"
+    read, _, write = raw.partition(",")
+    try:
+        return float(write if writes and write else read)
+    except ValueError:
+        return 0.0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@contextlib.contextmanager
+def _locked(home: Path) -> Iterator[dict[str, Any]]:
+    """The state file, read and written back under an exclusive lock."""
+    home.mkdir(parents=True, exist_ok=True)
+    path = home / "state.json"
+    with open(home / "state.lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            state = {"repos": {}, "limits": {}, "calls": {}}
+        try:
+            yield state
+        finally:
+            # Rejected calls are saved too: they count against the limits.
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, path)
+
+
+def _git(args: list[str], cwd: str | Path | None = None, check: bool = True) -> str:
+    r = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if check and r.returncode != 0:
+        raise _Reply(500, None, f"git {' '.join(args)}: {r.stderr.strip()}")
+    return r.stdout.strip() if r.returncode == 0 else ""
+
+
+def _opt(args: list[str], *names: str) -> Optional[str]:
+    for i, a in enumerate(args):
+        for name in names:
+            if a == name and i + 1 < len(args):
+                return args[i + 1]
+            if a.startswith(name + "="):
+                return a.split("=", 1)[1]
+    return None
+
+
+def _fields(args: list[str]) -> dict[str, str]:
+    out = {}
+    for flag, value in zip(args, args[1:]):
+        if flag in ("-f", "-F", "--field", "--raw-field"):
+            key, _, val = value.partition("=")
+            out[key] = val
+    return out
+
+
+class FakeGitHub:
+    """One gh invocation against the state in `state` (already locked by the caller)."""
+
+    def __init__(self, state: dict[str, Any], home: Path, cwd: Path):
+        self.state = state
+        self.home = home
+        self.cwd = cwd
+
+    # -- repositories -------------------------------------------------------
+
+    def _repo(self, args: list[str]) -> tuple[str, dict[str, Any]]:
+        """The repository a call is about: -R/--repo, else the one a remote of `cwd` points to."""
+        name = _opt(args, "-R", "--repo")
+        repos = self.state["repos"]
+        if name:
+            name = name if "/" in name else f"{LOGIN}/{name}"
+            if name in repos:
+                return name, repos[name]
+            raise _Reply(
+                404, {"message": "Not Found"}, f"Could not resolve to a Repository: {name}"
+            )
+        urls = _git(["config", "--get-regexp", r"^remote\..*\.url$"], cwd=self.cwd, check=False)
+        for line in urls.splitlines():
+            url = str((self.cwd / line.split(" ", 1)[-1]).resolve())
+            for full, repo in repos.items():
+                if repo["path"] == url:
+                    return full, repo
+        raise _Reply(404, None, "none of the git remotes point to a known repository")
+
+    def repo_create(self, args: list[str]) -> str:
+        full = args[0] if "/" in args[0] else f"{LOGIN}/{args[0]}"
+        if full in self.state["repos"]:
+            raise _Reply(422, None, f"Name already exists on this account: {full}")
+        bare = self.home / "remotes" / f"{full}.git"
+        _git(["init", "-q", "--bare", str(bare)])
+        _git(["symbolic-ref", "HEAD", "refs/heads/main"], cwd=bare)
+        self.state["repos"][full] = {
+            "path": str(bare.resolve()),
+            "private": "--public" not in args,
+            "description": _opt(args, "--description", "-d") or "",
+            "next": 0,
+            "prs": {},
+        }
+        source = _opt(args, "--source", "-s")
+        if source:
+            src = (self.cwd / source).resolve()
+            remote = _opt(args, "--remote", "-r") or "origin"
+            _git(["remote", "add", remote, str(bare)], cwd=src)
+            if "--push" in args:
+                branch = _git(["symbolic-ref", "--short", "HEAD"], cwd=src)
+                _git(["symbolic-ref", "HEAD", f"refs/heads/{branch}"], cwd=bare)
+                _git(["push", "-q", "-u", remote, "HEAD"], cwd=src)
+        return f"https://github.com/{full}\n"
+
+    # -- pull requests ------------------------------------------------------
+
+    def _tip(self, repo: dict[str, Any], branch: str) -> str:
+        return _git(["rev-parse", "--verify", "-q", f"refs/heads/{branch}"], repo["path"], False)
+
+    def _refresh(self, repo: dict[str, Any], pr: dict[str, Any]) -> dict[str, Any]:
+        """Mark an open PR merged once its head is contained in its base, as GitHub does."""
+        if pr["state"] == "OPEN":
+            pr["headRefOid"] = self._tip(repo, pr["headRefName"]) or pr["headRefOid"]
+            check = [
+                "merge-base",
+                "--is-ancestor",
+                pr["headRefOid"],
+                f"refs/heads/{pr['baseRefName']}",
+            ]
+            if (
+                subprocess.run(["git", *check], cwd=repo["path"], capture_output=True).returncode
+                == 0
+            ):
+                pr["state"], pr["mergedAt"] = "MERGED", _now()
+        return pr
+
+    def _pr(self, repo: dict[str, Any], ref: str) -> dict[str, Any]:
+        pr = repo["prs"].get(ref.lstrip("#"))
+        if pr is None:
+            open_for = [p for p in repo["prs"].values() if p["headRefName"] == ref]
+            pr = open_for[-1] if open_for else None
+        if pr is None:
+            raise _Reply(404, None, f"no pull requests found for {ref!r}")
+        return self._refresh(repo, pr)
+
+    def open_pr(self, full: str, repo: dict[str, Any], fields: dict[str, str]) -> dict[str, Any]:
+        head, base = fields.get("head") or "", fields.get("base") or "main"
+        sha = self._tip(repo, head)
+        if not sha:
+            raise _Reply(422, {"message": "Validation Failed"}, f"Head ref {head!r} not found")
+        if not self._tip(repo, base):
+            raise _Reply(422, {"message": "Validation Failed"}, f"Base ref {base!r} not found")
+        for p in repo["prs"].values():
+            if p["headRefName"] == head and self._refresh(repo, p)["state"] == "OPEN":
+                raise _Reply(422, {"message": "Validation Failed"},
+                             f"A pull request already exists for {head}")  # fmt: skip
+        repo["next"] += 1
+        n = repo["next"]
+        pr = {
+            "number": n,
+            "url": f"https://github.com/{full}/pull/{n}",
+            "title": fields.get("title") or head,
+            "body": fields.get("body") or "",
+            "state": "OPEN",
+            "isDraft": fields.get("draft") == "true",
+            "headRefName": head,
+            "baseRefName": base,
+            "headRefOid": sha,
+            "createdAt": _now(),
+            "mergedAt": None,
+            "closedAt": None,
+            "comments": [],
+            "reviews": [],
+        }
+        repo["prs"][str(n)] = pr
+        return pr
+
+    def pr(self, verb: str, args: list[str]) -> str:
+        full, repo = self._repo(args)
+        if verb == "create":
+            fields = {
+                "head": _opt(args, "--head", "-H") or _git(["branch", "--show-current"], self.cwd),
+                "base": _opt(args, "--base", "-B") or "main",
+                "title": _opt(args, "--title", "-t") or "",
+                "body": _opt(args, "--body", "-b") or "",
+                "draft": "true" if "--draft" in args or "-d" in args else "false",
+            }
+            return self.open_pr(full, repo, fields)["url"] + "\n"
+        if verb == "list":
+            state = (_opt(args, "--state", "-s") or "open").upper()
+            head, base = _opt(args, "--head", "-H"), _opt(args, "--base", "-B")
+            newest = sorted(repo["prs"].values(), key=lambda p: -p["number"])
+            found = [
+                p for p in (self._refresh(repo, p) for p in newest)
+                if (state == "ALL" or p["state"] == state)
+                and head in (None, p["headRefName"]) and base in (None, p["baseRefName"])
+            ]  # fmt: skip
+            return json.dumps([self._view(p, args) for p in found]) + "\n"
+        if not args or args[0].startswith("-"):
+            raise _Reply(400, None, f"pr {verb}: a PR number or branch is required")
+        pr = self._pr(repo, args[0])
+        if verb == "view":
+            return json.dumps(self._view(pr, args)) + "\n"
+        if verb == "close":
+            if pr["state"] != "OPEN":
+                raise _Reply(
+                    422, None, f"Pull request #{pr['number']} is already {pr['state'].lower()}"
+                )
+            pr["state"], pr["closedAt"] = "CLOSED", _now()
+            comment = _opt(args, "--comment", "-c")
+            if comment:
+                pr["comments"].append({"author": {"login": LOGIN}, "body": comment})
+            if "--delete-branch" in args or "-d" in args:
+                _git(["update-ref", "-d", f"refs/heads/{pr['headRefName']}"], repo["path"], False)
+            return ""
+        if verb == "comment":
+            pr["comments"].append(
+                {"author": {"login": LOGIN}, "body": _opt(args, "--body", "-b") or ""}
+            )
+            return f"{pr['url']}#issuecomment-{len(pr['comments'])}\n"
+        if verb == "review":
+            review_state = (
+                "APPROVED" if "--approve" in args or "-a" in args
+                else "CHANGES_REQUESTED" if "--request-changes" in args or "-r" in args
+                else "COMMENTED"
+            )  # fmt: skip
+            body = _opt(args, "--body", "-b") or ""
+            pr["reviews"].append({"author": {"login": LOGIN}, "state": review_state, "body": body})
+            return ""
+        raise _Reply(400, None, f"unsupported command: pr {verb}")
+
+    def _view(self, pr: dict[str, Any], args: list[str]) -> dict[str, Any]:
+        wanted = (_opt(args, "--json") or "number,url,title,state").split(",")
+        unknown = [f for f in wanted if f not in _PR_FIELDS]
+        if unknown:
+            raise _Reply(400, None, f"Unknown JSON field: {unknown[0]!r}")
+        return {f: pr[f] for f in wanted}
+
+    # -- REST and GraphQL ---------------------------------------------------
+
+    def api(self, endpoint: str, method: str, fields: dict[str, str], args: list[str]) -> Any:
+        if endpoint == "user":
+            return {"login": LOGIN, "id": 1, "name": "Legends Bot", "email": None}
+        if endpoint == "user/emails":
+            return [{"email": f"{LOGIN}@example.com", "primary": True, "verified": True}]
+        if endpoint == "rate_limit":
+            return {"resources": {k: self._limit(k, False) for k in ("core", "graphql")}}
+        if endpoint == "graphql":
+            full, repo = self._repo(args)
+            nodes = {}
+            for alias, n in re.findall(
+                r"(\w+): pullRequest\(number: (\d+)\)", fields.get("query", "")
+            ):
+                pr = repo["prs"].get(n)
+                nodes[alias] = {"state": self._refresh(repo, pr)["state"]} if pr else None
+            return {"data": {"repository": nodes}}
+        endpoint, _, query = endpoint.partition("?")
+        m = re.fullmatch(r"repos/([^/]+)/([^/]+)/pulls(?:/(\d+))?", endpoint)
+        if m:
+            if m.group(1) != "{owner}":
+                args = [*args, "-R", f"{m.group(1)}/{m.group(2)}"]
+            full, repo = self._repo(args)
+            if method == "POST" and not m.group(3):
+                pr = self.open_pr(full, repo, fields)
+                return {"number": pr["number"], "html_url": pr["url"], "state": "open"}
+            if method == "GET" and not m.group(3):
+                params = dict(urllib.parse.parse_qsl(query))
+                head = params.get("head", "").rpartition(":")[2]
+                state = params.get("state", "open").upper()
+                prs = [self._refresh(repo, p) for p in repo["prs"].values()]
+                return [
+                    {"number": p["number"], "html_url": p["url"], "state": p["state"].lower()}
+                    for p in prs
+                    if (not head or p["headRefName"] == head) and state in ("ALL", p["state"])
+                ]
+            if method == "GET" and m.group(3):
+                pr = self._pr(repo, m.group(3))
+                return {
+                    "number": pr["number"], "html_url": pr["url"], "title": pr["title"],
+                    "state": "open" if pr["state"] == "OPEN" else "closed",
+                    "merged": pr["state"] == "MERGED", "draft": pr["isDraft"],
+                    "head": {"ref": pr["headRefName"], "sha": pr["headRefOid"]},
+                    "base": {"ref": pr["baseRefName"]},
+                }  # fmt: skip
+        raise _Reply(404, {"message": "Not Found"}, "Not Found")
+
+    # -- limits -------------------------------------------------------------
+
+    def _limit(self, resource: str, spend: bool) -> dict[str, int]:
+        limit, window = int(_num("RATE_LIMIT", 5000)), int(_num("RATE_WINDOW", 3600))
+        now = time.time()
+        w = self.state["limits"].setdefault(resource, {"used": 0, "reset": int(now) + window})
+        if now >= w["reset"]:
+            w["used"], w["reset"] = 0, int(now) + window
+        if spend:
+            w["used"] += 1
+        return {
+            "limit": limit,
+            "used": w["used"],
+            "remaining": max(0, limit - w["used"]),
+            "reset": w["reset"],
+        }
+
+    def check_limits(self, resource: str, writes: bool) -> dict[str, str]:
+        """Spend one request; raise the rejection GitHub would send once a limit is hit."""
+        w = self._limit(resource, True)
+        headers = {
+            "X-Ratelimit-Limit": str(w["limit"]),
+            "X-Ratelimit-Remaining": str(w["remaining"]),
+            "X-Ratelimit-Reset": str(w["reset"]),
+            "X-Ratelimit-Resource": resource,
+        }
+        if w["used"] > w["limit"]:
+            headers["X-Ratelimit-Remaining"] = "0"
+            raise _Reply(403, {"message": "API rate limit exceeded"},
+                         "API rate limit exceeded for user", headers)  # fmt: skip
+        if not writes:
+            return headers
+        now = time.time()
+        writes_log = self.state["limits"].setdefault("writes", {"n": 0, "recent": []})
+        writes_log["n"] += 1
+        every = int(_num("FAIL_EVERY", 0))
+        per_minute = int(_num("WRITES_PER_MINUTE", 0))
+        recent = [t for t in writes_log["recent"] if now - t < 60]
+        retry_after = None
+        if every and writes_log["n"] % every == 0:
+            retry_after = 1
+        elif per_minute and len(recent) >= per_minute:
+            retry_after = max(1, int(recent[0] + 60 - now) + 1)
+        else:
+            recent.append(now)
+        writes_log["recent"] = recent[-per_minute:] if per_minute else []
+        if retry_after is not None:
+            headers["Retry-After"] = str(retry_after)
+            raise _Reply(403, {"message": "You have exceeded a secondary rate limit."},
+                         "You have exceeded a secondary rate limit", headers)  # fmt: skip
+        return headers
+
+
+def _api_call(args: list[str]) -> tuple[str, str, dict[str, str], bool]:
+    """(endpoint, method, fields, include) of a `gh api` argument list."""
+    include = "--include" in args or "-i" in args
+    fields = _fields(args)
+    method = (_opt(args, "-X", "--method") or ("POST" if fields else "GET")).upper()
+    skip, endpoint = False, ""
+    for a in args[1:]:
+        if skip:
+            skip = False
+        elif a in ("-X", "--method", "-f", "-F", "--field", "--raw-field", "-H", "--header",
+                   "-q", "--jq", "-R", "--repo"):  # fmt: skip
+            skip = True
+        elif not a.startswith("-"):
+            endpoint = a
+            break
+    if endpoint == "graphql":
+        method = "POST"
+    return endpoint, method, fields, include
+
+
+def _writes(args: list[str], method: str) -> bool:
+    if args[0] == "api":
+        query = _fields(args).get("query", "")
+        return (
+            re.match(r"\s*mutation\b", query) is not None if "graphql" in args else method != "GET"
+        )
+    return tuple(args[:2]) not in {("pr", "list"), ("pr", "view")}
+
+
+def run(
+    args: list[str], *, cwd: str | Path | None = None, home: Optional[Path] = None
+) -> tuple[int, str, str]:
+    """Handle one gh invocation; returns (exit status, stdout, stderr) like the real gh."""
+    home = home or _home()
+    cwd = Path(cwd or os.getcwd())
+    endpoint, method, fields, include = (
+        _api_call(args) if args[:1] == ["api"] else ("", "GET", {}, False)
+    )
+    writes = bool(args) and _writes(args, method)
+    headers: dict[str, str] = {}
+    try:
+        with _locked(home) as state:
+            key = f"api {method} {endpoint}" if args[:1] == ["api"] else " ".join(args[:2])
+            state["calls"][key] = state["calls"].get(key, 0) + 1
+            gh = FakeGitHub(state, home, cwd)
+            if args[:1] == ["api"]:
+                resource = "graphql" if endpoint == "graphql" else "core"
+                if endpoint != "rate_limit":
+                    headers = gh.check_limits(resource, writes)
+                body = gh.api(endpoint, method, fields, args)
+                out = json.dumps(body) + "\n"
+                status = 201 if method == "POST" and endpoint != "graphql" else 200
+            elif args[:2] == ["repo", "create"] and len(args) > 2:
+                gh.check_limits("core", True)
+                out, status = gh.repo_create(args[2:]), 201
+            elif args[:1] == ["pr"] and len(args) > 1:
+                gh.check_limits("graphql", writes)
+                out, status = gh.pr(args[1], args[2:]), 200
+            else:
+                raise _Reply(400, None, f"unknown command {' '.join(args[:2])!r} for fake gh")
+    except _Reply as r:
+        headers = {**headers, **r.headers}
+        out = json.dumps(r.body) + "\n" if r.body is not None and include else ""
+        status, err = r.status, f"gh: {r.error} (HTTP {r.status})\n"
+    else:
+        err = ""
+    # Latency is served outside the lock, so concurrent calls overlap as they would on GitHub.
+    delay = _latency(writes)
+    if delay > 0:
+        time.sleep(delay)
+    if include:
+        head = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        out = f"HTTP/2.0 {status} {'OK' if status < 400 else 'Error'}\r\n{head}\r\n{out}"
+    return (0 if status < 400 else 1), out, err
+
+
+_SETTINGS = {
+    "latency": "LATENCY",
+    "rate_limit": "RATE_LIMIT",
+    "rate_window": "RATE_WINDOW",
+    "writes_per_minute": "WRITES_PER_MINUTE",
+    "fail_every": "FAIL_EVERY",
+}
+
+
+def install(bin_dir: str | Path, *, home: Optional[str | Path] = None, **settings: Any) -> Path:
+    """
+    Write a `gh` shim into `bin_dir` that runs this module with the Python
+    running now; `settings` (latency, rate_limit, ...) are baked into it.
+    """
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    src = Path(__file__).resolve().parent.parent
+    env = {}
+    if home is not None:
+        env[_ENV + "HOME"] = str(Path(home).resolve())
+    for name, value in settings.items():
+        if value is not None:
+            env[_ENV + _SETTINGS[name]] = str(value)
+    lines = ["#!/bin/sh", f"export PYTHONPATH={shlex.quote(str(src))}${{PYTHONPATH:+:$PYTHONPATH}}"]
+    lines += [f"export {k}={shlex.quote(v)}" for k, v in env.items()]
+    lines.append(f'exec {shlex.quote(sys.executable)} -m legends.fakegh "$@"')
+    shim = bin_dir / "gh"
+    shim.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    shim.chmod(0o755)
+    return shim
+
+
+def _manage(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(
+        prog="python -m legends.fakegh", description=__doc__.split("\n\n")[0].strip()
+    )
+    sub = p.add_subparsers(dest="cmd", required=True)
+    pi = sub.add_parser("install", help="Write a gh shim into a directory (put it first on PATH).")
+    pi.add_argument("bin_dir")
+    pi.add_argument("--home", help="State directory for this shim.")
+    pi.add_argument("--latency", help="Seconds per call, or 'read,write'.")
+    pi.add_argument("--rate-limit", type=int, help="Requests per window and resource.")
+    pi.add_argument("--rate-window", type=int, help="Rate-limit window in seconds.")
+    pi.add_argument("--writes-per-minute", type=int, help="Content-creation cap per minute.")
+    pi.add_argument("--fail-every", type=int, help="Reject every n-th write (secondary limit).")
+    sub.add_parser("stats", help="Show call counts, limits and pull requests.")
+    sub.add_parser("reset", help="Forget all repositories, pull requests and counters.")
+    ns = p.parse_args(argv)
+    if ns.cmd == "install":
+        shim = install(
+            ns.bin_dir, home=ns.home, latency=ns.latency, rate_limit=ns.rate_limit,
+            rate_window=ns.rate_window, writes_per_minute=ns.writes_per_minute,
+            fail_every=ns.fail_every,
+        )  # fmt: skip
+        print(shim)
+        return 0
+    home = _home()
+    with _locked(home) as state:
+        if ns.cmd == "reset":
+            shutil.rmtree(home / "remotes", ignore_errors=True)
+            state.clear()
+            state.update({"repos": {}, "limits": {}, "calls": {}})
+            return 0
+        summary = {
+            "home": str(home),
+            "calls": state["calls"],
+            "limits": {k: v for k, v in state["limits"].items() if k != "writes"},
+            "repos": {
+                name: {s: sum(p["state"] == s for p in repo["prs"].values())
+                       for s in ("OPEN", "MERGED", "CLOSED")}
+                for name, repo in state["repos"].items()
+            },  # fmt: skip
+        }
+    print(json.dumps(summary, indent=2, sort_keys=True))
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] in (["install"], ["stats"], ["reset"]):
+        return _manage(argv)
+    if argv[:1] == ["--version"]:
+        print("gh version 2.0.0 (legends fake)")
+        return 0
+    status, out, err = run(argv)
+    sys.stdout.write(out)
+    sys.stderr.write(err)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
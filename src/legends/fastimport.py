@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional
+
+from . import tracing
+from .config import AppConfig
+from .core.dates import git_epoch
+from .exceptions import CommandError, TimelineError
+from .executor import default_executor
+from .timeline import Step
+from .templates import render_merge_subject
+from .utils import LOG, ensure_tool, git, split_ident
+
+MARKER_FILE = ".backdate_work.txt"
+
+
+def git_timestamp(date: str) -> str:
+    """Return '<epoch> +0000' for a date string, as fast-import expects."""
+    return f"{git_epoch(date)} +0000"
+
+
+def _data(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    return b"data %d\n%s\n" % (len(raw), raw)
+
+
+@dataclass
+class _Branch:
+    mark: str
+    # Files written on this branch since it forked, as {path: content}; they are
+    # replayed into the merge commit so it carries the branch's tree.
+    files: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class FastImportResult:
+    commits: int = 0
+    merges: int = 0
+    refs: dict[str, str] = field(default_factory=dict)
+    deleted: list[str] = field(default_factory=list)
+
+    def resolve(self, by_mark: dict[str, str]) -> None:
+        """Replace marks by the commit ids fast-import exported for them."""
+        self.refs = {ref: by_mark.get(m, m) for ref, m in self.refs.items()}
+
+
+class HistoryStream:
+    """
+    Translate plan steps into a `git fast-import` command stream.
+
+    Branch tips are tracked as marks, so the whole history is written by one
+    process and no working tree or index is involved. `result.refs` maps each
+    branch touched to its final mark once the stream has been consumed.
+    """
+
+    def __init__(self, cfg: AppConfig, *, base_tips: dict[str, str], ident: tuple[str, str]):
+        self.cfg = cfg
+        self.base_tips = dict(base_tips)
+        self.author = (cfg.author_name or ident[0], cfg.author_email or ident[1])
+        self.committer = (
+            cfg.committer_name or self.author[0],
+            cfg.committer_email or self.author[1],
+        )
+        self.branches: dict[str, _Branch] = {}
+        self.result = FastImportResult()
+        self._mark = 0
+
+    def _next_mark(self) -> str:
+        self._mark += 1
+        return f":{self._mark}"
+
+    def _tip(self, ref: str) -> str:
+        if ref in self.branches:
+            return self.branches[ref].mark
+        if ref in self.base_tips:
+            return self.base_tips[ref]
+        raise TimelineError(f"fast-import: branch {ref!r} does not exist at this point of the plan")
+
+    def _commit(
+        self,
+        ref: str,
+        *,
+        parent: str,
+        message: str,
+        date: str,
+        merge: Optional[str] = None,
+        files: Optional[dict[str, str]] = None,
+        author: Optional[tuple[str, str]] = None,
+    ) -> bytes:
+        mark = self._next_mark()
+        when = git_timestamp(date)
+        author = author or self.author
+        out = [
+            b"commit refs/heads/%s\n" % ref.encode("utf-8"),
+            b"mark %s\n" % mark.encode(),
+            b"author %s <%s> %s\n"
+            % (author[0].encode("utf-8"), author[1].encode("utf-8"), when.encode()),
+            b"committer %s <%s> %s\n"
+            % (self.committer[0].encode("utf-8"), self.committer[1].encode("utf-8"), when.encode()),
+            # One trailing LF, as `git commit -m` stores it; the LF `_data` adds
+            # after the block is fast-import's separator, not part of the data.
+            _data(message.strip() + "\n"),
+            b"from %s\n" % parent.encode(),
+        ]
+        if merge:
+            out.append(b"merge %s\n" % merge.encode())
+        for path, content in (files or {}).items():
+            out.append(b"M 100644 inline %s\n" % path.encode("utf-8"))
+            out.append(_data(content))
+        out.append(b"\n")
+
+        branch = self.branches.setdefault(ref, _Branch(mark))
+        branch.mark = mark
+        if files and ref not in self.base_tips:
+            branch.files.update(files)
+        self.result.commits += 1
+        return b"".join(out)
+
+    def _create_branch(self, a: dict) -> bytes:
+        branch, base = a["branch"], a["base"] or self.cfg.base_branch
+        if branch in self.branches:
+            raise TimelineError(f"fast-import: branch {branch!r} is created twice")
+        msg = a.get("message") or f"chore({branch}): branch birth"
+        return self._commit(branch, parent=self._tip(base), message=msg, date=a["date"])
+
+    def _plain_commit(self, a: dict) -> bytes:
+        if a.get("touch") or a.get("add_all"):
+            raise TimelineError(
+                "fast-import backend cannot stage working-tree content "
+                f"('touch'/'add_all' on {a['branch']!r}); use the default backend."
+            )
+        return self._commit(
+            a["branch"],
+            parent=self._tip(a["branch"]),
+            message=a["message"],
+            date=a["date"],
+            author=split_ident(a["author"]) if a.get("author") else None,
+        )
+
+    def _merge(
+        self, base: str, branch: str, *, date: str, message: Optional[str], delete: bool
+    ) -> bytes:
+        head = self._tip(branch)
+        files = dict(self.branches[branch].files) if branch in self.branches else {}
+        msg = message or render_merge_subject(base=base, branch=branch)
+        out = self._commit(
+            base, parent=self._tip(base), merge=head, message=msg, date=date, files=files
+        )
+        self.result.merges += 1
+        if delete:
+            self.branches.pop(branch, None)
+            self.result.deleted.append(branch)
+        return out
+
+    def _commit_all(self, a: dict) -> bytes:
+        base, branch = a["base"] or self.cfg.base_branch, a["branch"]
+        out = b""
+        if branch not in self.branches:
+            self.branches[branch] = _Branch(self._tip(base))
+        marker = {MARKER_FILE: f"{a['commit_date']} :: {a['message']}\n"}
+        out += self._commit(
+            branch,
+            parent=self._tip(branch),
+            message=a["message"],
+            date=a["commit_date"],
+            files=marker,
+        )
+        out += self._merge(
+            base, branch, date=a["merge_date"], message=None, delete=a.get("delete_branch", True)
+        )
+        return out
+
+    def feed(self, step: Step) -> bytes:
+        a = step.args
+        if step.kind == "create-branch":
+            return self._create_branch(a)
+        if step.kind == "commit":
+            return self._plain_commit(a)
+        if step.kind == "merge-pr":
+            base = a["base"] or self.cfg.base_branch
+            return self._merge(
+                base,
+                a["branch"],
+                date=a["date"],
+                message=a.get("message"),
+                delete=a.get("delete_branch", True),
+            )
+        if step.kind == "commit-all":
+            return self._commit_all(a)
+        if step.kind == "open-pr":
+            LOG.info("fast-import: skipping PR for %s (PRs need a live remote branch)", a["branch"])
+            return b""
+        raise TimelineError(f"fast-import backend does not support step {step.kind!r}")
+
+    def stream(self, steps: Iterable[Step]) -> Iterator[bytes]:
+        yield b"feature done\n"
+        for step in steps:
+            chunk = self.feed(step)
+            if chunk:
+                yield chunk
+        for ref, branch in self.branches.items():
+            self.result.refs[ref] = branch.mark
+        yield b"done\n"
+
+
+def _ident() -> tuple[str, str]:
+    """Fallback identity from git config (`git var GIT_AUTHOR_IDENT`)."""
+    raw = git(["var", "GIT_AUTHOR_IDENT"]).stdout.strip()
+    name, _, rest = raw.partition(" <")
+    return name, rest.split(">", 1)[0]
+
+
+def _write(stdin: IO[bytes], chunks: Iterable[bytes]) -> None:
+    for chunk in chunks:
+        stdin.write(chunk)
+    stdin.close()
+
+
+def import_history(
+    steps: Iterable[Step],
+    cfg: AppConfig,
+    *,
+    cwd: str | Path | None = None,
+    history: type[HistoryStream] = HistoryStream,
+) -> FastImportResult:
+    """
+    Stream `steps` into a single `git fast-import` process in `cwd`.
+
+    Feature branches that the plan deletes after merging are removed locally
+    afterwards; nothing is pushed here (see `push_history`). `history` is the
+    stream class; subclasses can record more of the plan in their result.
+    """
+    ensure_tool("git", "See https://git-scm.com/downloads")
+    base = cfg.base_branch
+    tip = default_executor().resolve(f"refs/heads/{base}", cwd=cwd)
+    if tip is None:
+        raise TimelineError(f"fast-import: base branch {base!r} does not exist")
+    head_ref = git(["symbolic-ref", "-q", "HEAD"], cwd=cwd, check=False).stdout.strip()
+
+    hs = history(cfg, base_tips={base: tip}, ident=_ident())
+    if cfg.dry_run:
+        for chunk in hs.stream(steps):
+            pass
+        LOG.info(
+            "fast-import (dry-run): %d commits, %d merges", hs.result.commits, hs.result.merges
+        )
+        return hs.result
+
+    marks = Path(git(["rev-parse", "--git-dir"], cwd=cwd).stdout.strip())
+    if not marks.is_absolute():
+        marks = Path(cwd or ".") / marks
+    marks = marks / "legends-fast-import.marks"
+    cmd = ["git", "fast-import", "--quiet", "--done", f"--export-marks={marks}"]
+    LOG.info("%s", " ".join(cmd))
+    with tracing.command_span(cmd) as sp:
+        proc = subprocess.Popen(
+            cmd, cwd=str(cwd) if cwd else None, stdin=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            _write(proc.stdin, hs.stream(steps))
+        except BrokenPipeError:
+            pass
+        finally:
+            err = proc.stderr.read().decode("utf-8", "replace")
+            proc.wait()
+        tracing.record_result(sp, proc.returncode, "", err)
+        sp.set(commits=hs.result.commits, merges=hs.result.merges)
+    if proc.returncode != 0:
+        raise CommandError(cmd, proc.returncode, "", err)
+
+    by_mark = {}
+    for line in marks.read_text(encoding="utf-8").splitlines():
+        m, _, sha = line.partition(" ")
+        by_mark[m] = sha
+    marks.unlink()
+    hs.result.resolve(by_mark)
+
+    if hs.result.deleted:
+        default_executor().update_refs(
+            [f"delete refs/heads/{b}" for b in hs.result.deleted], cwd=cwd
+        )
+
+    if head_ref == f"refs/heads/{base}" and base in hs.result.refs:
+        # fast-import moved the checked-out branch; bring index and worktree along.
+        git(["read-tree", "-m", "-u", tip, hs.result.refs[base]], cwd=cwd)
+
+    LOG.info("fast-import: %d commits, %d merges", hs.result.commits, hs.result.merges)
+    return hs.result
+
+
+def push_history(
+    result: FastImportResult, cfg: AppConfig, *, cwd: str | Path | None = None
+) -> None:
+    """Push every surviving ref from an import in one atomic push."""
+    refs = sorted(result.refs)
+    if not refs:
+        return
+    args = ["push", "--atomic", cfg.remote_name, *[f"refs/heads/{r}:refs/heads/{r}" for r in refs]]
+    LOG.info("git %s", " ".join(args))
+    if not cfg.dry_run:
+        git(args, cwd=cwd)
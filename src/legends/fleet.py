@@ -0,0 +1,224 @@
+"""
+`legends run-many`: one timeline per repository, across a pool of processes.
+
+    # repos.yaml
+    jobs: 4
+    repos:
+      - timelines/api.yaml
+      - timeline: timelines/web.jsonl
+        dir: out/web            # where it runs (default: the manifest's directory)
+        backend: fast-import    # default: --backend
+
+Relative paths are taken from the manifest's directory. Each timeline runs
+in a worker process that works in that entry's `dir`: the parent never
+changes directory, and no two repositories share a working directory, an
+index or the executor's git batch processes. The identity is resolved once,
+before the pool starts, and handed to the workers with the config. The
+GitHub budget (reads, writes per minute and per hour) is split evenly
+between the workers, so the pool as a whole paces like one process. Under
+`legends --trace`, each worker records its own spans and sends them back
+with its report; they land in the one trace file, one process per worker.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import dataclasses
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from . import cli, tracing
+from .config import AppConfig, _read_yaml
+from .exceptions import BackdateError, ConfigError
+from .executor import default_executor
+from .ratelimit import github_scheduler
+from .templates import set_template_dirs
+from .utils import LOG, git, pushd
+
+BACKENDS = ("steps", "dag", "worktree", "fast-import", "two-phase")
+
+
+@dataclass
+class RepoJob:
+    timeline: str
+    dir: str
+    backend: str = "steps"
+
+
+@dataclass
+class RepoReport:
+    job: RepoJob
+    repo: str = ""  # the repository's directory
+    seconds: float = 0.0
+    commits: int = 0
+    error: Optional[str] = None
+    trace: list[dict[str, Any]] = field(default_factory=list)  # the worker's trace events
+    trace_origin: int = 0
+
+    @property
+    def rate(self) -> float:
+        return self.commits / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class FleetReport:
+    workers: int
+    wall: float
+    repos: list[RepoReport] = field(default_factory=list)
+
+    @property
+    def failed(self) -> list[RepoReport]:
+        return [r for r in self.repos if r.error is not None]
+
+    def format(self) -> str:
+        commits = sum(r.commits for r in self.repos)
+        busy = sum(r.seconds for r in self.repos)
+        rate = commits / self.wall if self.wall else 0.0
+        lines = [
+            f"{len(self.repos)} repositories on {self.workers} worker(s) in {self.wall:.2f}s "
+            f"(serial {busy:.2f}s): {commits} commits, {rate:.1f} commits/s"
+            + (f"; {len(self.failed)} failed" if self.failed else "")
+        ]
+        for r in self.repos:
+            what = f"FAILED: {r.error.splitlines()[0]}" if r.error else f"{r.rate:8.1f} commits/s"
+            lines.append(f"  {r.seconds:8.2f}s  {r.commits:7d}  {what}  {r.repo or r.job.timeline}")
+        return "\n".join(lines)
+
+
+def load_manifest(
+    path: str | Path, *, backend: str = "steps"
+) -> tuple[list[RepoJob], Optional[int]]:
+    """Read a run-many manifest; returns the jobs and its `jobs` setting, if any."""
+    p = Path(path)
+    if not p.exists():
+        raise ConfigError(f"Manifest not found: {p}")
+    data: Any = _read_yaml(p)
+    if isinstance(data, list):
+        data = {"repos": data}
+    if not isinstance(data, dict) or not isinstance(data.get("repos"), list):
+        raise ConfigError(f"{p}: expected a 'repos' list")
+    root = p.resolve().parent
+    jobs = []
+    for i, entry in enumerate(data["repos"], 1):
+        if isinstance(entry, str):
+            entry = {"timeline": entry}
+        if not isinstance(entry, dict) or not entry.get("timeline"):
+            raise ConfigError(f"{p}: repos[{i}] needs a 'timeline'")
+        kind = str(entry.get("backend") or backend)
+        if kind not in BACKENDS:
+            raise ConfigError(f"{p}: repos[{i}]: unknown backend {kind!r}")
+        jobs.append(
+            RepoJob(
+                timeline=str(root / str(entry["timeline"])),
+                dir=str(root / str(entry.get("dir") or ".")),
+                backend=kind,
+            )
+        )
+    workers = data.get("jobs")
+    return jobs, int(workers) if workers else None
+
+
+def _count_commits(repo: Path) -> int:
+    if not (repo / ".git").exists():
+        return 0
+    return int(git(["rev-list", "--count", "--all"], cwd=repo).stdout.strip() or 0)
+
+
+def _run_repo(
+    job: RepoJob, cfg: AppConfig, opts: dict[str, Any], share: float, trace: bool = False
+) -> RepoReport:
+    """Worker: run one timeline in `job.dir`, in this (pool) process."""
+    label = Path(job.timeline).stem
+    # A forked worker inherits the parent's tracer; spans recorded in that copy
+    # would never reach the trace file.
+    tracing.stop()
+    if trace:
+        tracing.start(f"legends {label}")
+    for h in LOG.handlers:
+        h.setFormatter(logging.Formatter(f"[%(levelname)s] {label}: %(message)s"))
+    github_scheduler().configure(
+        retries=cfg.gh_retries, writes_per_minute=cfg.gh_writes_per_minute, share=share
+    )
+    if cfg.template_dir:
+        set_template_dirs([cfg.template_dir])
+    ns = argparse.Namespace(
+        cmd="run-timeline", file=job.timeline, config=None, backend=job.backend, **opts
+    )
+    report = RepoReport(job)
+    t0 = time.perf_counter()
+    try:
+        Path(job.dir).mkdir(parents=True, exist_ok=True)
+        with pushd(job.dir):
+            cfg = cli._resolve_config(ns, cfg)
+            cli.cmd_run_timeline(ns, cfg)
+            cli._finish(cfg)
+            name = ns.timeline.get("repo")
+            repo = Path(job.dir, str(name)) if name and not ns.skip_create_repo else Path(job.dir)
+            report.repo = str(repo)
+            if not cfg.dry_run:
+                report.commits = _count_commits(repo)
+    except BackdateError as e:
+        report.error = str(e)
+    finally:
+        report.seconds = time.perf_counter() - t0
+        pool, cfg.pr_pool = cfg.pr_pool, None
+        if pool is not None:
+            pool.close()
+        default_executor().close()
+        tracer = tracing.stop()
+        if tracer is not None:
+            report.trace, report.trace_origin = tracer.to_json()["traceEvents"], tracer.origin
+    return report
+
+
+def run_many(
+    jobs: list[RepoJob],
+    cfg: AppConfig,
+    *,
+    workers: Optional[int] = None,
+    skip_create_repo: bool = False,
+    resume: bool = True,
+) -> FleetReport:
+    """Run every job on `workers` processes (default: one per CPU, at most one per job)."""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    cfg = dataclasses.replace(cfg, push_queue=None, pr_pool=None)
+    opts = {
+        "skip_create_repo": skip_create_repo,
+        "resume": resume,
+        "dry_run": cfg.dry_run,
+        "plumbing": cfg.plumbing,
+        "defer_push": cfg.defer_push,
+    }
+    tracer = tracing.active()
+    LOG.info("run-many: %d repositories on %d worker(s)", len(jobs), workers)
+    t0 = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(_run_repo, job, cfg, opts, 1.0 / workers, tracer is not None): job
+            for job in jobs
+        }
+        done: dict[int, RepoReport] = {}
+        try:
+            for fut in concurrent.futures.as_completed(futures):
+                job = futures[fut]
+                try:
+                    report = fut.result()
+                except Exception as e:  # the worker died, or did not return
+                    report = RepoReport(job, error=f"{type(e).__name__}: {e}")
+                done[id(job)] = report
+                if tracer is not None and report.trace:
+                    tracer.merge(report.trace, report.trace_origin)
+                    report.trace = []
+                LOG.info(
+                    "run-many: %s %s in %.2fs",
+                    job.timeline, "failed" if report.error else "done", report.seconds,
+                )  # fmt: skip
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return FleetReport(workers, time.perf_counter() - t0, [done[id(j)] for j in jobs])
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import IO, Any, Iterable, Iterator, Optional
+
+from .exceptions import ConfigError
+from .utils import split_ident
+
+_TYPES = ["feat", "fix", "refactor", "docs", "test", "chore", "perf"]
+_VERBS = ["add", "update", "remove", "rework", "simplify", "handle", "support", "clean up"]
+_NOUNS = [
+    "parser", "cache", "config loader", "retry logic", "login flow", "api client",
+    "settings page", "logging", "error messages", "build script", "docs", "search",
+    "export", "scheduler", "migrations", "metrics", "cli flags", "templates",
+]  # fmt: skip
+_FMT = "%Y-%m-%dT%H:%M:%S"
+
+
+@dataclass
+class ActivityModel:
+    """
+    Statistical description of a project's activity.
+
+    Weekdays get on average `commits_per_day` commits (Poisson), weekends that
+    rate times `weekend_factor`. Commits fall inside `work_hours` except for an
+    `after_hours` share. Work happens on up to `parallel_branches` feature
+    branches whose lifetimes (days) and merge lags (hours after the last
+    commit) are exponentially distributed around the given means. Each branch
+    is written by one of `authors`, earlier authors being more active.
+    """
+
+    start: date
+    end: date
+    commits_per_day: float = 4.0
+    weekend_factor: float = 0.15
+    work_hours: tuple[int, int] = (9, 18)
+    after_hours: float = 0.1
+    branch_days: float = 3.0
+    parallel_branches: int = 3
+    merge_lag_hours: float = 6.0
+    pr_ratio: float = 1.0
+    authors: list[str] = field(default_factory=list)
+    seed: Optional[int] = None
+
+    def validate(self) -> None:
+        if self.end <= self.start:
+            raise ConfigError("generate: end must be after start")
+        lo, hi = self.work_hours
+        if not 0 <= lo < hi <= 24:
+            raise ConfigError("generate: work hours must satisfy 0 <= start < end <= 24")
+        if self.commits_per_day < 0 or self.weekend_factor < 0:
+            raise ConfigError("generate: rates must not be negative")
+        if self.branch_days <= 0 or self.merge_lag_hours <= 0 or self.parallel_branches < 1:
+            raise ConfigError("generate: branch lifetime, merge lag and parallelism must be > 0")
+        for a in self.authors:
+            split_ident(a)
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    """Knuth's method; fine for the handful of commits a day is made of."""
+    if lam <= 0:
+        return 0
+    limit, k, p = math.exp(-lam), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+@dataclass
+class _Branch:
+    name: str
+    author: Optional[str]
+    closes: datetime
+    last: datetime
+
+
+class _Generator:
+    def __init__(self, model: ActivityModel):
+        self.m = model
+        self.rng = random.Random(model.seed)
+        self.open: list[_Branch] = []
+        # Merges that are due later, as (time, order, event).
+        self.later: list[tuple[datetime, int, dict[str, Any]]] = []
+        self.n_branches = 0
+        self.order = 0
+        # Date of the last event written; new branches are born after it.
+        self.clock = datetime.combine(model.start, datetime.min.time())
+        self.author_weights = [1.0 / (i + 1) for i in range(len(model.authors))]
+
+    def _schedule(self, when: datetime, event: dict[str, Any]) -> None:
+        self.order += 1
+        heapq.heappush(self.later, (when, self.order, event))
+
+    def _due(self, until: Optional[datetime]) -> Iterator[dict[str, Any]]:
+        while self.later and (until is None or self.later[0][0] <= until):
+            when, _, event = heapq.heappop(self.later)
+            event["date"] = when.strftime(_FMT)
+            self.clock = max(self.clock, when)
+            yield event
+
+    def _day_times(self, day: date) -> list[datetime]:
+        m, rng = self.m, self.rng
+        lam = m.commits_per_day * (m.weekend_factor if day.weekday() >= 5 else 1.0)
+        lo, hi = m.work_hours
+        base = datetime.combine(day, datetime.min.time())
+        times = []
+        for _ in range(_poisson(rng, lam)):
+            if rng.random() < m.after_hours:
+                seconds = rng.uniform(0, 86400)
+            else:
+                seconds = rng.uniform(lo * 3600, hi * 3600)
+            times.append(base + timedelta(seconds=int(seconds)))
+        times.sort()
+        return times
+
+    def _close(self, b: _Branch, now: datetime) -> Iterator[dict[str, Any]]:
+        self.open.remove(b)
+        merge_at = max(b.last, now) + timedelta(
+            seconds=int(self.rng.expovariate(1.0 / self.m.merge_lag_hours) * 3600) + 60
+        )
+        if self.rng.random() < self.m.pr_ratio:
+            title = b.name.split("/", 1)[-1].replace("-", " ")
+            yield {"event": "pr", "branch": b.name, "title": title.capitalize()}
+        self._schedule(merge_at, {"event": "merge", "branch": b.name})
+
+    def _branch_for(self, when: datetime) -> Iterator[dict[str, Any]]:
+        """Close branches past their lifetime, then pick or open the branch for a commit at `when`."""
+        m, rng = self.m, self.rng
+        for b in [b for b in self.open if b.closes <= when]:
+            yield from self._close(b, when)
+        if len(self.open) < m.parallel_branches and (not self.open or rng.random() < 0.3):
+            self.n_branches += 1
+            noun = rng.choice(_NOUNS).replace(" ", "-")
+            name = f"feature/{self.n_branches:05d}-{noun}"
+            author = rng.choices(m.authors, weights=self.author_weights)[0] if m.authors else None
+            born = max(self.clock, when - timedelta(minutes=rng.randint(1, 90)))
+            lifetime = timedelta(days=rng.expovariate(1.0 / m.branch_days))
+            self.open.append(_Branch(name, author, born + lifetime, born))
+            self.clock = born
+            yield {"event": "branch", "branch": name, "date": born.strftime(_FMT)}
+
+    def _commit(self, when: datetime) -> dict[str, Any]:
+        rng = self.rng
+        b = rng.choice(self.open)
+        b.last = when
+        msg = f"{rng.choice(_TYPES)}: {rng.choice(_VERBS)} {rng.choice(_NOUNS)}"
+        event = {"event": "commit", "branch": b.name, "date": when.strftime(_FMT), "message": msg}
+        if b.author:
+            event["author"] = b.author
+        return event
+
+    def events(self) -> Iterator[dict[str, Any]]:
+        day = self.m.start
+        while day < self.m.end:
+            for when in self._day_times(day):
+                yield from self._due(when)
+                yield from self._branch_for(when)
+                yield self._commit(when)
+                self.clock = when
+            day += timedelta(days=1)
+        for b in list(self.open):
+            yield from self._close(b, self.clock)
+        yield from self._due(None)
+
+
+def generate_events(
+    model: ActivityModel, *, repo: Optional[str] = None, timezone: Optional[str] = "UTC"
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield a JSONL timeline (see docs/03-timeline-mode.md) drawn from `model`,
+    in date order: a `timeline` header, then branch, commit, pr and merge
+    events. The same model and seed always give the same events.
+    """
+    model.validate()
+    header: dict[str, Any] = {"event": "timeline"}
+    if repo:
+        header["repo"] = repo
+    if timezone:
+        header["timezone"] = timezone
+    header["initial_commit"] = {"date": f"{model.start.isoformat()}T00:00:00"}
+    yield header
+    yield from _Generator(model).events()
+
+
+def write_jsonl(events: Iterable[dict[str, Any]], out: IO[str]) -> int:
+    """Write events one per line; returns how many were written."""
+    n = 0
+    for n, event in enumerate(events, 1):
+        out.write(json.dumps(event, separators=(",", ":")))
+        out.write("\n")
+    return n
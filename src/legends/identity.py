@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from .exceptions import CommandError
+from .utils import LOG, ensure_tool, gh, json_loads
+
+DEFAULT_TTL = 24 * 3600
+
+
+@dataclass
+class GitHubIdentity:
+    login: str
+    id: Optional[int] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+    fetched_at: float = 0.0
+
+    @property
+    def noreply_email(self) -> str:
+        if self.id:
+            return f"{self.id}+{self.login}@users.noreply.github.com"
+        return f"{self.login}@users.noreply.github.com"
+
+
+def cache_path() -> Path:
+    """Location of the identity cache (LEGENDS_CACHE_DIR, else the XDG cache dir)."""
+    root = os.getenv("LEGENDS_CACHE_DIR")
+    if not root:
+        xdg = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+        root = os.path.join(xdg, "legends")
+    return Path(root) / "identity.json"
+
+
+def _gh_config_dir() -> Path:
+    if os.getenv("GH_CONFIG_DIR"):
+        return Path(os.environ["GH_CONFIG_DIR"])
+    xdg = os.getenv("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+    return Path(xdg) / "gh"
+
+
+def _hosts_users(path: Path) -> dict[str, str]:
+    """Read {host: user} from gh's hosts.yml without importing YAML."""
+    users: dict[str, str] = {}
+    host = None
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return users
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace() and line.rstrip().endswith(":"):
+            host = line.rstrip()[:-1].strip()
+        elif host and line.startswith("    user:"):
+            users[host] = line.split(":", 1)[1].strip().strip("'\"")
+    return users
+
+
+def auth_key() -> Optional[str]:
+    """
+    Identify the active gh account without a network call: '<host>:<user>'
+    from gh's hosts.yml, or a token fingerprint when a token env var is used.
+    Returns None when neither is available (caching is then skipped).
+    """
+    host = os.getenv("GH_HOST") or "github.com"
+    token = os.getenv("GH_TOKEN") or os.getenv("GITHUB_TOKEN")
+    if token:
+        return f"{host}:token:{hashlib.sha256(token.encode()).hexdigest()[:16]}"
+    user = _hosts_users(_gh_config_dir() / "hosts.yml").get(host)
+    return f"{host}:{user}" if user else None
+
+
+def _load_cache() -> dict:
+    try:
+        return json.loads(cache_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_cache(data: dict) -> None:
+    path = cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".identity-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, path)
+    except OSError as exc:
+        LOG.debug("Could not write identity cache %s: %s", path, exc)
+
+
+def fetch_identity(
+    prefer_verified: bool = True, *, public_email: bool = False
+) -> Optional[GitHubIdentity]:
+    """
+    Fetch the authenticated account from `gh api user`.
+
+    The email is the verified primary address from `user/emails` when
+    `prefer_verified` is on, else the profile's public email, else the
+    noreply address. With `public_email`, a public profile email is taken
+    as is and `user/emails` is only asked when there is none: one call
+    instead of two, at the cost of a different address for accounts whose
+    public email is not their primary.
+    """
+    try:
+        ensure_tool("gh", "See https://cli.github.com/")
+        data = json_loads(gh(["api", "user"]).stdout)
+    except Exception:
+        return None
+    login = data.get("login")
+    if not login:
+        return None
+
+    public = data.get("email") or None
+    email = public if public_email else None
+    if not email and prefer_verified:
+        try:
+            emails = json.loads(gh(["api", "user/emails"]).stdout or "[]")
+            email = next(
+                (e.get("email") for e in emails if e.get("primary") and e.get("verified")), None
+            )
+        except (CommandError, ValueError, AttributeError):
+            email = None
+    email = email or public
+
+    ident = GitHubIdentity(
+        login=login,
+        id=data.get("id"),
+        name=data.get("name") or login,
+        email=email,
+        fetched_at=time.time(),
+    )
+    if not ident.email:
+        ident.email = ident.noreply_email
+    return ident
+
+
+def github_identity(
+    *,
+    ttl: int = DEFAULT_TTL,
+    refresh: bool = False,
+    prefer_verified: bool = True,
+    public_email: bool = False,
+    cached_only: bool = False,
+) -> Optional[GitHubIdentity]:
+    """
+    Return the GitHub identity, from the on-disk cache when a fresh entry
+    exists for the active gh account. `refresh` drops the cached entry first;
+    `ttl <= 0` bypasses the cache entirely. With `cached_only`, a cache miss
+    returns None instead of asking GitHub. `public_email` is passed on to
+    `fetch_identity`, and is cached apart from the default lookup.
+    """
+    key = auth_key() if ttl > 0 else None
+    if key and public_email:
+        key += ":public"
+    cache = _load_cache() if key else {}
+
+    if key and not refresh:
+        entry = cache.get(key)
+        if isinstance(entry, dict) and time.time() - entry.get("fetched_at", 0) < ttl:
+            try:
+                ident = GitHubIdentity(**entry)
+            except TypeError:
+                ident = None
+            if ident is not None:
+                LOG.debug("Identity cache hit for %s", key)
+                return ident
+    if cached_only:
+        return None
+
+    ident = fetch_identity(prefer_verified, public_email=public_email)
+    if key:
+        if ident is not None:
+            cache[key] = asdict(ident)
+        else:
+            cache.pop(key, None)
+        _store_cache(cache)
+    return ident
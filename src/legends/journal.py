@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from .timeline import Step
+from .utils import LOG, git
+
+
+def step_keys(steps: Iterable[Step]) -> Iterator[tuple[str, Step]]:
+    """
+    Pair each step with a key derived from its content (kind and arguments).
+
+    Keys do not depend on a step's position, so steps added to or removed
+    from elsewhere in a timeline leave the keys of the others unchanged. The
+    n-th repeat of an identical step gets a `#n` suffix.
+    """
+    seen: Counter = Counter()
+    for step in steps:
+        raw = json.dumps([step.kind, step.args], sort_keys=True, default=str)
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+        seen[digest] += 1
+        n = seen[digest]
+        yield (digest if n == 1 else f"{digest}#{n}"), step
+
+
+def journal_path(name: str, *, cwd: str | Path | None = None) -> Path:
+    """`<git-dir>/legends/<name>.jsonl` for the repository at `cwd`."""
+    git_dir = Path(git(["rev-parse", "--git-dir"], cwd=cwd).stdout.strip())
+    if not git_dir.is_absolute():
+        git_dir = Path(cwd or ".").resolve() / git_dir
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "-", name).strip("-") or "timeline"
+    return git_dir / "legends" / f"{slug}.jsonl"
+
+
+Key = Union[str, int]
+
+
+class Journal:
+    """
+    Append-only record of completed timeline steps.
+
+    Each line is one JSON record, flushed and fsync'd before the next step
+    starts, so a crash loses at most the step that was running. Records carry
+    the branch tips a step left behind (`refs`, None for a deleted branch) and
+    the PR number it opened; `refs` folds all records into the state the
+    journal vouches for.
+
+    Keys are either content keys (`step_keys`) or, for streamed event files,
+    1-based positions. Positions are folded into a watermark (every position
+    up to `seq` is done) plus the few finished out of order, so a journal of
+    a million streamed steps stays small in memory.
+    """
+
+    def __init__(self, path: Path, *, fresh: bool = False):
+        self.path = path
+        if fresh:
+            path.unlink(missing_ok=True)
+        self.done: dict[str, dict[str, Any]] = {}
+        self.refs: dict[str, Optional[str]] = {}
+        self.seq = 0
+        self._ahead: set[int] = set()
+        self._lock = threading.Lock()
+        self._load()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = path.open("a", encoding="utf-8")
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.done) + self.seq + len(self._ahead)
+
+    def _apply(self, rec: dict[str, Any]) -> None:
+        if rec.get("event") == "step":
+            key = rec["key"]
+            if isinstance(key, int):
+                self._ahead.add(key)
+                while self.seq + 1 in self._ahead:
+                    self.seq += 1
+                    self._ahead.discard(self.seq)
+            else:
+                self.done[key] = rec
+        self.refs.update(rec.get("refs") or {})
+
+    def _load(self) -> None:
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        good = 0
+        for line in raw.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("truncated record")
+                self._apply(json.loads(line))
+            except ValueError:
+                break
+            good += len(line)
+        if good < len(raw):
+            # A torn write from a crash: drop it so new records start on a clean line.
+            LOG.warning(
+                "journal %s: discarding %d bytes of a partial record", self.path, len(raw) - good
+            )
+            with self.path.open("r+b") as f:
+                f.truncate(good)
+
+    def _append(self, rec: dict[str, Any]) -> None:
+        line = json.dumps(rec, sort_keys=True) + "\n"
+        with self._lock:
+            if self._fh.closed:
+                LOG.warning("journal %s is closed; not recorded: %s", self.path, line.strip())
+                return
+            self._fh.write(line)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._apply(rec)
+
+    def is_done(self, key: Key) -> bool:
+        if isinstance(key, int):
+            return key <= self.seq or key in self._ahead
+        return key in self.done
+
+    def start(self, refs: dict[str, Optional[str]]) -> None:
+        """Note the refs a run starts from (used to roll back a half-finished first step)."""
+        self._append({"event": "start", "t": time.time(), "refs": refs})
+
+    def record(
+        self,
+        key: Key,
+        step: Step,
+        *,
+        refs: Optional[dict[str, Optional[str]]] = None,
+        pr: Optional[int] = None,
+    ) -> None:
+        rec: dict[str, Any] = {"event": "step", "key": key, "kind": step.kind, "t": time.time()}
+        if step.feature:
+            rec["feature"] = step.feature
+        if refs:
+            rec["refs"] = refs
+        if pr:
+            rec["pr"] = pr
+        self._append(rec)
+
+    def record_when_done(self, fut: Future, key: Key, step: Step) -> None:
+        """Record `step` once `fut` (a PR being opened in the background) succeeds."""
+
+        def done(f: Future) -> None:
+            if not f.cancelled() and f.exception() is None:
+                pr = f.result()
+                self.record(key, step, pr=getattr(pr, "number", None))
+
+        fut.add_done_callback(done)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
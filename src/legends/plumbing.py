@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import functools
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+from .core.dates import git_epoch
+from .exceptions import BackdateError, CommandError
+from .executor import default_executor
+from .utils import LOG, git
+
+ZERO_OID = "0" * 40
+
+
+def rev(ref: str, *, cwd: str | Path | None = None) -> Optional[str]:
+    """Resolve `ref` to a commit id, or None if it does not exist."""
+    return default_executor().resolve(f"{ref}^{{commit}}", cwd=cwd)
+
+
+def _tree(commit: str, cwd: str | Path | None) -> str:
+    tree = default_executor().resolve(f"{commit}^{{tree}}", cwd=cwd)
+    if tree is None:
+        raise BackdateError(f"Cannot resolve the tree of {commit!r}.")
+    return tree
+
+
+@functools.lru_cache(maxsize=64)
+def _toplevel_of(path: str) -> Path:
+    return Path(git(["rev-parse", "--show-toplevel"], cwd=path).stdout.strip())
+
+
+def _toplevel(cwd: str | Path | None) -> Path:
+    return _toplevel_of(str(Path(cwd or ".").resolve()))
+
+
+def _checked_out(branch: str, cwd: str | Path | None) -> bool:
+    r = git(["symbolic-ref", "-q", "HEAD"], cwd=cwd, check=False)
+    return r.stdout.strip() == f"refs/heads/{branch}"
+
+
+def _hash_content(content: str, *, cwd: str | Path | None) -> str:
+    return git(["hash-object", "-w", "--stdin"], cwd=cwd, input=content).stdout.strip()
+
+
+def _worktree_entries(top: Path, paths: Sequence[str]) -> list[str]:
+    """Build `update-index --index-info` lines for worktree paths (root-relative)."""
+    lines: list[str] = []
+    regular: list[str] = []
+    for rel in paths:
+        p = top / rel
+        if p.is_symlink():
+            oid = _hash_content(os.readlink(p), cwd=top)
+            lines.append(f"120000 {oid}\t{rel}")
+        elif p.is_file():
+            regular.append(rel)
+        else:
+            lines.append(f"0 {ZERO_OID}\t{rel}")
+    if regular:
+        oids = git(
+            ["hash-object", "-w", "--stdin-paths"],
+            cwd=top,
+            input="".join(f"{r}\n" for r in regular),
+        ).stdout.split()
+        for rel, oid in zip(regular, oids):
+            mode = "100755" if os.stat(top / rel).st_mode & 0o111 else "100644"
+            lines.append(f"{mode} {oid}\t{rel}")
+    return lines
+
+
+def repo_paths(paths: Sequence[str], *, cwd: str | Path | None = None) -> list[str]:
+    """Convert cwd-relative paths into the root-relative form plumbing expects."""
+    top = _toplevel(cwd).resolve()
+    here = Path(cwd or ".").resolve()
+    return [(here / p).resolve().relative_to(top).as_posix() for p in paths]
+
+
+def worktree_changes(*, cwd: str | Path | None = None) -> list[str]:
+    """Root-relative paths that `git add -A` would stage: changes vs HEAD plus untracked files."""
+    top = _toplevel(cwd)
+    changed = git(["diff", "--name-only", "-z", "HEAD"], cwd=top).stdout.split("\0")
+    untracked = git(["ls-files", "-z", "--others", "--exclude-standard"], cwd=top).stdout.split(
+        "\0"
+    )
+    return sorted({p for p in (*changed, *untracked) if p})
+
+
+def write_tree(
+    parent: str,
+    *,
+    files: Mapping[str, str] | None = None,
+    paths: Sequence[str] = (),
+    cwd: str | Path | None = None,
+) -> str:
+    """
+    Return the tree of `parent` with `files` ({path: content}) and worktree
+    `paths` applied, built in a temporary GIT_INDEX_FILE.
+
+    The real index and working tree are never read or written (apart from
+    hashing the given worktree paths).
+    """
+    base_tree = _tree(parent, cwd)
+    if not files and not paths:
+        return base_tree
+
+    top = _toplevel(cwd)
+    lines = [f"100644 {_hash_content(c, cwd=top)}\t{p}" for p, c in (files or {}).items()]
+    lines += _worktree_entries(top, paths)
+
+    tmp = tempfile.mkdtemp(prefix="legends-index-")
+    env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmp, "index"))
+    try:
+        git(["read-tree", base_tree], cwd=top, env=env)
+        git(["update-index", "--index-info"], cwd=top, env=env, input="\n".join(lines) + "\n")
+        return git(["write-tree"], cwd=top, env=env).stdout.strip()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def commit_tree(
+    tree: str,
+    parents: Sequence[str],
+    message: str,
+    *,
+    env: Mapping[str, str],
+    cwd: str | Path | None = None,
+) -> str:
+    """
+    Create a commit object for `tree`; dates/identity come from GIT_* in `env`.
+    The message ends in one newline, as `git commit -m` (and `_raw_commit`)
+    store it, so plumbing builds the same objects as porcelain.
+    """
+    args = ["commit-tree", tree]
+    for p in parents:
+        args += ["-p", p]
+    return git(args, cwd=cwd, env=dict(env), input=message.strip() + "\n").stdout.strip()
+
+
+def _drop_identical_untracked(old: str, new: str, cwd: str | Path | None) -> bool:
+    """
+    Remove the untracked files that block moving the worktree from `old` to
+    `new` when each already holds the content `new` brings, so that nothing
+    is lost. Returns False, removing nothing, when any file differs.
+    """
+    top = _toplevel(cwd)
+    added = git(
+        ["diff-tree", "-r", "-z", "--name-only", "--diff-filter=A", old, new], cwd=top
+    ).stdout.split("\0")
+    present = [p for p in added if p and (top / p).is_file() and not (top / p).is_symlink()]
+    if not present:
+        return False
+    tracked = git(["ls-files", "-z", "--", *present], cwd=top).stdout.split("\0")
+    if any(tracked):
+        return False
+    oids = git(
+        ["hash-object", "--stdin-paths"], cwd=top, input="".join(f"{p}\n" for p in present)
+    ).stdout.split()
+    for path, oid in zip(present, oids):
+        if default_executor().resolve(f"{new}:{path}", cwd=top) != oid:
+            return False
+    for path in present:
+        (top / path).unlink()
+    return True
+
+
+def update_branch(
+    branch: str,
+    new: str,
+    old: Optional[str],
+    *,
+    cwd: str | Path | None = None,
+    sync_worktree: bool = True,
+) -> None:
+    """
+    Move refs/heads/<branch> from `old` to `new` (creating it when `old` is None).
+
+    If the branch is checked out, the index follows the new commit. With
+    `sync_worktree` the files that differ between `old` and `new` are also
+    written out (a two-way `read-tree -m -u`), otherwise the working tree is
+    assumed to already hold the committed content.
+    """
+    checked_out = old is not None and _checked_out(branch, cwd)
+    if checked_out and sync_worktree:
+        # Update index/worktree first so a refusal leaves the ref untouched.
+        try:
+            git(["read-tree", "-m", "-u", old, new], cwd=cwd)
+        except CommandError as e:
+            if not _drop_identical_untracked(old, new, cwd):
+                raise BackdateError(
+                    f"{branch!r} is checked out and has local changes to files this update "
+                    "touches; commit or stash them first."
+                ) from e
+            git(["read-tree", "-m", "-u", old, new], cwd=cwd)
+    default_executor().update_refs([f"update refs/heads/{branch} {new} {old or ZERO_OID}"], cwd=cwd)
+    if checked_out and not sync_worktree:
+        git(["read-tree", new], cwd=cwd)
+
+
+def merge_tree(base: str, head: str, *, cwd: str | Path | None = None) -> str:
+    """Return the tree a `merge --no-ff base head` would record, without a worktree."""
+    r = git(["merge-base", "--is-ancestor", base, head], cwd=cwd, check=False)
+    if r.returncode == 0:
+        return _tree(head, cwd)
+    try:
+        out = git(["merge-tree", "--write-tree", "--no-messages", base, head], cwd=cwd).stdout
+    except CommandError as e:
+        if e.returncode == 1:
+            raise BackdateError(
+                f"Merging {head} into {base} has conflicts; merge it without --plumbing."
+            ) from e
+        raise
+    return out.splitlines()[0].strip()
+
+
+def commit(
+    branch: str,
+    message: str,
+    *,
+    env: Mapping[str, str],
+    files: Mapping[str, str] | None = None,
+    paths: Sequence[str] = (),
+    allow_empty: bool = False,
+    start_point: Optional[str] = None,
+    cwd: str | Path | None = None,
+) -> str:
+    """
+    Commit `files`/`paths` on top of `branch` without checking it out.
+
+    If the branch does not exist and `start_point` is given, it is created
+    from there. Returns the new commit id.
+    """
+    old = rev(f"refs/heads/{branch}", cwd=cwd)
+    parent = old or (rev(start_point, cwd=cwd) if start_point else None)
+    if parent is None:
+        raise BackdateError(f"Branch {branch!r} does not exist.")
+    tree = write_tree(parent, files=files, paths=paths, cwd=cwd)
+    if not allow_empty and tree == _tree(parent, cwd):
+        raise BackdateError(f"Nothing to commit on {branch!r} (use --allow-empty).")
+    new = commit_tree(tree, [parent], message, env=env, cwd=cwd)
+    update_branch(branch, new, old, cwd=cwd, sync_worktree=not paths)
+    LOG.debug("plumbing: %s -> %s", branch, new)
+    return new
+
+
+def create_branch(
+    branch: str, base: str, message: str, *, env: Mapping[str, str], cwd: str | Path | None = None
+) -> str:
+    """Create `branch` at a new empty 'birth' commit on top of `base`."""
+    if rev(f"refs/heads/{branch}", cwd=cwd):
+        raise BackdateError(f"Branch {branch!r} already exists.")
+    parent = rev(base, cwd=cwd)
+    if parent is None:
+        raise BackdateError(f"Base branch {base!r} does not exist.")
+    tree = _tree(parent, cwd)
+    new = commit_tree(tree, [parent], message, env=env, cwd=cwd)
+    update_branch(branch, new, None, cwd=cwd)
+    return new
+
+
+@functools.lru_cache(maxsize=4)
+def _configured_ident(role: str, cwd: Optional[str]) -> str:
+    """'Name <email>' for AUTHOR/COMMITTER as git would pick it (user.name/user.email)."""
+    return git(["var", f"GIT_{role}_IDENT"], cwd=cwd).stdout.rsplit(">", 1)[0] + ">"
+
+
+def _raw_commit(
+    tree: str, parents: Sequence[str], message: str, env: Mapping[str, str], cwd: str | Path | None
+) -> str:
+    """The commit object `git commit -m` would write, with identity and dates from `env`."""
+
+    def ident(role: str) -> str:
+        name, email, date = (env.get(f"GIT_{role}_{k}") for k in ("NAME", "EMAIL", "DATE"))
+        if not date:
+            raise BackdateError("Bulk commits need a date.")
+        who = f"{name} <{email}>" if name and email else _configured_ident(role, str(cwd or "."))
+        return f"{who} {git_epoch(date)} +0000"
+
+    head = [f"tree {tree}", *(f"parent {p}" for p in parents)]
+    head += [f"author {ident('AUTHOR')}", f"committer {ident('COMMITTER')}"]
+    return "\n".join(head) + "\n\n" + message.strip() + "\n"
+
+
+def write_commits(objects: Sequence[str], *, cwd: str | Path | None = None) -> list[str]:
+    """Write raw commit objects with one `hash-object` process; returns their ids in order."""
+    if not objects:
+        return []
+    tmp = tempfile.mkdtemp(prefix="legends-commits-")
+    try:
+        paths = []
+        for i, text in enumerate(objects):
+            path = os.path.join(tmp, str(i))
+            Path(path).write_bytes(text.encode("utf-8"))
+            paths.append(path)
+        return git(
+            ["hash-object", "-w", "-t", "commit", "--stdin-paths"],
+            cwd=cwd,
+            input="".join(f"{p}\n" for p in paths),
+        ).stdout.split()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def create_branches(
+    births: Sequence[tuple[str, str, str, Mapping[str, str]]],
+    deletions: Sequence[str] = (),
+    *,
+    cwd: str | Path | None = None,
+) -> dict[str, str]:
+    """
+    Create each (branch, base, message, env) at a new empty commit on top of
+    `base`, and delete the `deletions`, in one ref transaction: every ref
+    changes or none does. A base may be a branch born earlier in the list.
+    No commit-tree or checkout per branch: the commit objects are written
+    in one `hash-object` process per level of branches-of-branches. Returns
+    the new tips.
+    """
+    names = [b for b, *_ in births]
+    dupes = sorted({b for b in names if names.count(b) > 1} | (set(names) & set(deletions)))
+    exist = [b for b in names if rev(f"refs/heads/{b}", cwd=cwd)]
+    if dupes or exist:
+        raise BackdateError(f"Branches listed twice or already present: {', '.join(dupes + exist)}")
+    commands = []
+    for b in deletions:
+        old = rev(f"refs/heads/{b}", cwd=cwd)
+        if old is None:
+            raise BackdateError(f"Cannot delete {b!r}: branch not found.")
+        if _checked_out(b, cwd):
+            raise BackdateError(f"Cannot delete {b!r}: it is checked out.")
+        commands.append(f"delete refs/heads/{b} {old}")
+
+    tips: dict[str, str] = {}
+    bases: dict[str, tuple[str, str]] = {}  # base -> (commit, tree)
+    pending = list(births)
+    while pending:
+        waiting = {b for b, *_ in pending}
+        ready = [b for b in pending if b[1] not in waiting]
+        if not ready:
+            raise BackdateError(f"Branch bases form a cycle: {', '.join(sorted(waiting))}")
+        objects = []
+        for branch, base, message, env in ready:
+            if base not in bases:
+                parent = tips.get(base) or rev(base, cwd=cwd)
+                if parent is None:
+                    raise BackdateError(f"Base branch {base!r} of {branch!r} does not exist.")
+                bases[base] = (parent, _tree(parent, cwd))
+            parent, tree = bases[base]
+            objects.append(_raw_commit(tree, [parent], message, env, cwd))
+        for (branch, *_), oid in zip(ready, write_commits(objects, cwd=cwd)):
+            tips[branch] = oid
+        pending = [b for b in pending if b[0] not in tips]
+    commands += [f"update refs/heads/{b} {tips[b]} {ZERO_OID}" for b in names]
+    default_executor().update_refs(commands, cwd=cwd)
+    return tips
+
+
+def sync_from_remote(branch: str, remote: str, *, cwd: str | Path | None = None) -> None:
+    """
+    Plumbing counterpart of `git pull remote branch` for a branch that may not
+    be checked out: fetch, then fast-forward the local ref if it is behind.
+    """
+    git(["fetch", remote, branch], cwd=cwd)
+    theirs = rev("FETCH_HEAD", cwd=cwd)
+    ours = rev(f"refs/heads/{branch}", cwd=cwd)
+    if not theirs or theirs == ours:
+        return
+    if ours is None:
+        update_branch(branch, theirs, None, cwd=cwd)
+        return
+    if git(["merge-base", "--is-ancestor", ours, theirs], cwd=cwd, check=False).returncode == 0:
+        update_branch(branch, theirs, ours, cwd=cwd)
+    elif git(["merge-base", "--is-ancestor", theirs, ours], cwd=cwd, check=False).returncode != 0:
+        raise BackdateError(
+            f"Local {branch!r} has diverged from {remote}/{branch}; pull it manually."
+        )
+
+
+def merge_noff(
+    base: str, head: str, message: str, *, env: Mapping[str, str], cwd: str | Path | None = None
+) -> str:
+    """Record a --no-ff merge commit of `head` into `base` and advance `base`."""
+    ours = rev(f"refs/heads/{base}", cwd=cwd)
+    theirs = rev(head, cwd=cwd)
+    if ours is None or theirs is None:
+        raise BackdateError(f"Cannot merge {head!r} into {base!r}: branch not found.")
+    tree = merge_tree(ours, theirs, cwd=cwd)
+    new = commit_tree(tree, [ours, theirs], message, env=env, cwd=cwd)
+    update_branch(base, new, ours, cwd=cwd)
+    return new
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import contextvars
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+from .exceptions import CommandError
+from .executor import default_executor
+from .ratelimit import github_scheduler
+from .utils import LOG, ensure_tool, gh, git, json_loads
+
+DEFAULT_WORKERS = 8
+# Aliased pullRequest fields per GraphQL query; keeps each query well under
+# GitHub's node and complexity limits.
+STATE_CHUNK = 100
+
+
+@dataclass(frozen=True)
+class PRSpec:
+    head: str
+    base: str
+    title: Optional[str] = None
+    body: Optional[str] = None
+    draft: bool = False
+
+
+@dataclass
+class PullRequest:
+    number: int
+    url: str
+    head: str
+    base: str
+    state: str = "OPEN"
+
+
+def _default_title(head: str, cwd: str | Path | None) -> str:
+    """What `gh pr create --fill` would use for a single-commit branch: the tip's subject."""
+    r = git(["log", "-1", "--format=%s", head], cwd=cwd, check=False)
+    return r.stdout.strip() or head
+
+
+def create_args(spec: PRSpec, title: str) -> list[str]:
+    """`gh api` arguments that open `spec` on the repository of the working directory."""
+    args = [
+        "api", "-X", "POST", "repos/{owner}/{repo}/pulls",
+        "-f", f"head={spec.head}",
+        "-f", f"base={spec.base}",
+        "-f", f"title={title}",
+    ]  # fmt: skip
+    if spec.body:
+        args += ["-f", f"body={spec.body}"]
+    if spec.draft:
+        args += ["-F", "draft=true"]
+    return args
+
+
+def _from_response(stdout: str, spec: PRSpec) -> PullRequest:
+    data = json_loads(stdout)
+    if isinstance(data, list):  # a `find_args` listing
+        data = data[0] if data else {}
+    if not data.get("number"):
+        raise CommandError(["gh", "api", "repos/{owner}/{repo}/pulls"], 1, stdout, "")
+    return PullRequest(
+        number=int(data["number"]),
+        url=data.get("html_url") or "",
+        head=spec.head,
+        base=spec.base,
+        state=(data.get("state") or "open").upper(),
+    )
+
+
+def find_args(head: str) -> list[str]:
+    """`gh api` arguments that list the open PRs whose head is `head` (in the repo's own owner)."""
+    query = f"head={{owner}}:{urllib.parse.quote(head)}&state=open"
+    return ["api", f"repos/{{owner}}/{{repo}}/pulls?{query}"]
+
+
+def _already_exists(exc: CommandError) -> bool:
+    """Whether a create was refused because `head` already has an open PR (HTTP 422)."""
+    return "already exists" in f"{exc.stdout}\n{exc.stderr}"
+
+
+def _existing(stdout: str, spec: PRSpec, exc: CommandError) -> PullRequest:
+    """The open PR a refused create ran into, from the `find_args` listing."""
+    try:
+        pr = _from_response(stdout, spec)
+    except CommandError:
+        raise exc from None
+    LOG.info("%s already has an open PR (#%d); using it", spec.head, pr.number)
+    return pr
+
+
+def create_pr(spec: PRSpec, *, cwd: str | Path | None = None) -> PullRequest:
+    """
+    Open a pull request with one REST call and return it.
+
+    Number and URL come from the create response, so no follow-up
+    `gh pr list` is needed to find out what was created. If `head` already
+    has an open PR (one opened by a run that died before recording it),
+    that PR is returned instead.
+    """
+    title = spec.title or _default_title(spec.head, cwd)
+    try:
+        return _from_response(gh(create_args(spec, title), cwd=cwd).stdout, spec)
+    except CommandError as exc:
+        if not _already_exists(exc):
+            raise
+        r = gh(find_args(spec.head), cwd=cwd, check=False)
+        return _existing(r.stdout if r.returncode == 0 else "", spec, exc)
+
+
+async def acreate_pr(spec: PRSpec, *, cwd: str | Path | None = None) -> PullRequest:
+    """`create_pr` for the asyncio engine (see dag.py)."""
+    ex = default_executor()
+    title = spec.title
+    if not title:
+        r = await ex.arun(["git", "log", "-1", "--format=%s", spec.head], cwd=cwd, check=False)
+        title = r.stdout.strip() or spec.head
+    ensure_tool("gh", "See https://cli.github.com/")
+    sched = github_scheduler()
+    r = await sched.acall(
+        create_args(spec, title), lambda a: ex.arun(["gh", *a], cwd=cwd, check=False)
+    )
+    if r.returncode == 0:
+        return _from_response(r.stdout, spec)
+    exc = CommandError(r.cmd, r.returncode, r.stdout, r.stderr)
+    if not _already_exists(exc):
+        raise exc
+    r = await sched.acall(find_args(spec.head), lambda a: ex.arun(["gh", *a], cwd=cwd, check=False))
+    return _existing(r.stdout if r.returncode == 0 else "", spec, exc)
+
+
+class PRPool:
+    """
+    Bounded worker pool for PR creation.
+
+    `submit` returns immediately; callers that need the number (e.g. for a
+    merge message) wait on that one PR via `get`, while the others keep
+    going in the background. `wait` joins everything and re-raises the
+    first failure.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, *, cwd: str | Path | None = None):
+        self.cwd = cwd
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pr")
+        self._futures: dict[str, Future] = {}
+        self._released = 0
+
+    def __len__(self) -> int:
+        return len(self._futures) + self._released
+
+    def submit(self, spec: PRSpec) -> Future:
+        # Run in the caller's context so traces attribute the PR to the step that opened it.
+        ctx = contextvars.copy_context()
+        fut = self._executor.submit(ctx.run, create_pr, spec, cwd=self.cwd)
+        self._futures[spec.head] = fut
+        return fut
+
+    def future(self, head: str) -> Optional[Future]:
+        return self._futures.get(head)
+
+    def get(self, head: str) -> Optional[PullRequest]:
+        """The PR opened for `head` in this run (waiting for it), or None if none was."""
+        fut = self._futures.get(head)
+        return fut.result() if fut is not None else None
+
+    def release(self, head: str) -> None:
+        """Drop `head`'s PR once it has been opened; long streamed runs call this after merging."""
+        fut = self._futures.get(head)
+        if fut is not None and fut.done() and fut.exception() is None:
+            del self._futures[head]
+            self._released += 1
+
+    def wait(self) -> list[PullRequest]:
+        done, error = [], None
+        for fut in list(self._futures.values()):
+            try:
+                done.append(fut.result())
+            except Exception as exc:
+                LOG.error("PR creation failed: %s", exc)
+                error = error or exc
+        if error is not None:
+            raise error
+        return done
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def create_prs(
+    specs: Iterable[PRSpec], *, workers: int = DEFAULT_WORKERS, cwd: str | Path | None = None
+) -> list[PullRequest]:
+    """Open every PR in `specs` concurrently; results are in input order."""
+    pool = PRPool(workers, cwd=cwd)
+    try:
+        futures = [pool.submit(s) for s in specs]
+        pool.wait()
+        return [f.result() for f in futures]
+    finally:
+        pool.close()
+
+
+def _states_query(numbers: Sequence[int]) -> str:
+    fields = " ".join(f"pr{n}: pullRequest(number: {n}) {{ state }}" for n in numbers)
+    return (
+        "query($owner: String!, $name: String!) "
+        f"{{ repository(owner: $owner, name: $name) {{ {fields} }} }}"
+    )
+
+
+def pr_states(numbers: Iterable[int], *, cwd: str | Path | None = None) -> dict[int, str]:
+    """
+    Return {number: state} ('OPEN', 'CLOSED', 'MERGED') for many PRs, asking
+    GitHub in GraphQL queries of up to STATE_CHUNK aliased lookups each.
+    PRs that do not exist are left out.
+    """
+    wanted = sorted({int(n) for n in numbers})
+    states: dict[int, str] = {}
+    for i in range(0, len(wanted), STATE_CHUNK):
+        chunk = wanted[i : i + STATE_CHUNK]
+        args = [
+            "api", "graphql",
+            "-F", "owner={owner}",
+            "-F", "name={repo}",
+            "-f", f"query={_states_query(chunk)}",
+        ]  # fmt: skip
+        # A missing PR makes gh exit non-zero but still prints the partial data.
+        r = gh(args, cwd=cwd, check=False)
+        repo = (json_loads(r.stdout).get("data") or {}).get("repository")
+        if repo is None:
+            raise CommandError(["gh", *args[:2]], r.returncode, r.stdout, r.stderr)
+        for n in chunk:
+            node = repo.get(f"pr{n}")
+            if node and node.get("state"):
+                states[n] = node["state"].upper()
+    return states
@@ -0,0 +1,216 @@
+"""
+Two-phase runs (`run-timeline --backend two-phase`): build everything, then publish.
+
+The build phase writes the whole history with one `git fast-import` process
+(see fastimport.py), without touching the network, and records which PRs
+the plan opens: their head commit, the base commit the branch was born
+from, and the base commit that merges them. The publish phase then talks
+to GitHub only:
+
+1. one atomic push of every PR head (and every other branch that survives);
+2. PR creation, in parallel. GitHub needs each PR's base to contain the
+   branch's fork point but not its head, so PRs are opened in waves. Each
+   wave first moves the remote base to a commit that suits all of its PRs.
+   When every branch forks from the same base commit, there is one wave;
+3. the final base push, which turns every merged PR into MERGED;
+4. one push deleting the merged feature branches.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .config import AppConfig
+from .exceptions import TimelineError
+from .fastimport import FastImportResult, HistoryStream, import_history
+from .prs import PRPool, PRSpec
+from .timeline import Step
+from .utils import LOG, git
+
+
+@dataclass
+class PlannedPR:
+    spec: PRSpec
+    # Positions in the base branch's history (see `PublishPlan.base_commits`):
+    # the commit the head branch was born from, and the merge, if any.
+    fork: int
+    merged: Optional[int] = None
+    head: str = ""  # head commit (a mark until the import resolves it)
+
+
+@dataclass
+class PublishPlan(FastImportResult):
+    # Successive tips of the base branch during the build; [0] is the starting tip.
+    base_commits: list[str] = field(default_factory=list)
+    prs: list[PlannedPR] = field(default_factory=list)
+
+    def resolve(self, by_mark: dict[str, str]) -> None:
+        super().resolve(by_mark)
+        self.base_commits = [by_mark.get(m, m) for m in self.base_commits]
+        for pr in self.prs:
+            pr.head = by_mark.get(pr.head, pr.head)
+
+
+class PlanningStream(HistoryStream):
+    """A fast-import stream that also records the PRs to open, for `publish`."""
+
+    def __init__(self, cfg: AppConfig, *, base_tips: dict[str, str], ident: tuple[str, str]):
+        super().__init__(cfg, base_tips=base_tips, ident=ident)
+        self.base = cfg.base_branch
+        self.result = PublishPlan(base_commits=[base_tips[self.base]])
+        self.born: dict[str, int] = {}
+        self.subjects: dict[str, str] = {}
+        self.opened: dict[str, PlannedPR] = {}
+
+    def _commit(self, ref: str, *, message: str, **kwargs) -> bytes:
+        out = super()._commit(ref, message=message, **kwargs)
+        self.subjects[ref] = message.split("\n", 1)[0]
+        if ref == self.base:
+            self.result.base_commits.append(self._tip(ref))
+        return out
+
+    def _born(self, branch: str, base: str) -> None:
+        if branch not in self.branches:
+            now = len(self.result.base_commits) - 1
+            # A branch of a branch forks from the base where its parent did.
+            self.born[branch] = now if base == self.base else self.born.get(base, now)
+
+    def _create_branch(self, a: dict) -> bytes:
+        self._born(a["branch"], a["base"] or self.base)
+        return super()._create_branch(a)
+
+    def _open(self, spec: PRSpec) -> None:
+        if spec.base != self.base:
+            raise TimelineError(
+                f"two-phase backend opens PRs against {self.base!r} only "
+                f"(PR for {spec.head!r} targets {spec.base!r})"
+            )
+        fork = self.born.get(spec.head, len(self.result.base_commits) - 1)
+        self.opened[spec.head] = PlannedPR(spec, fork)
+
+    def _commit_all(self, a: dict) -> bytes:
+        base = a["base"] or self.base
+        self._born(a["branch"], base)
+        self._open(PRSpec(a["branch"], base, a.get("pr_title") or a["message"], a.get("pr_body")))
+        return super()._commit_all(a)
+
+    def _close(self, pr: PlannedPR, branch: str) -> None:
+        pr.head = self._tip(branch)
+        if not pr.spec.title:
+            # What create_pr would read from the tip, which may be gone locally by then.
+            pr.spec = dataclasses.replace(pr.spec, title=self.subjects.get(branch, branch))
+        self.result.prs.append(pr)
+
+    def _merge(self, base: str, branch: str, **kwargs) -> bytes:
+        pr = self.opened.pop(branch, None)
+        if pr is not None:
+            self._close(pr, branch)
+        out = super()._merge(base, branch, **kwargs)
+        if pr is not None:
+            pr.merged = len(self.result.base_commits) - 1
+        return out
+
+    def feed(self, step: Step) -> bytes:
+        if step.kind == "open-pr":
+            a = step.args
+            self._open(
+                PRSpec(a["branch"], a["base"] or self.base, a["title"], a["body"], a["draft"])
+            )
+            return b""
+        return super().feed(step)
+
+    def stream(self, steps: Iterable[Step]):
+        yield from super().stream(steps)
+        # PRs whose branch is never merged stay open, with the branch's last commit.
+        for branch, pr in list(self.opened.items()):
+            self._close(pr, branch)
+        self.opened.clear()
+
+
+def build(steps: Iterable[Step], cfg: AppConfig, *, cwd: str | Path | None = None) -> PublishPlan:
+    """Phase one: write the history locally and return what `publish` needs."""
+    t0 = time.perf_counter()
+    plan = import_history(steps, cfg, cwd=cwd, history=PlanningStream)
+    LOG.info(
+        "build: %d commits, %d merges, %d PR(s) in %.2fs",
+        plan.commits, plan.merges, len(plan.prs), time.perf_counter() - t0,
+    )  # fmt: skip
+    return plan
+
+
+def waves(plan: PublishPlan) -> list[tuple[int, list[PlannedPR]]]:
+    """
+    Group the PRs into as few waves as possible. Each wave is a base
+    position that is at or after every member's fork and before every
+    member's merge. Waves come out in base order.
+    """
+    last = len(plan.base_commits) - 1
+
+    def merged(pr: PlannedPR) -> int:
+        return pr.merged if pr.merged is not None else last + 1
+
+    out: list[tuple[int, list[PlannedPR]]] = []
+    for pr in sorted(plan.prs, key=merged):
+        if out and pr.fork <= out[-1][0]:
+            out[-1][1].append(pr)
+        else:
+            out.append((merged(pr) - 1, [pr]))
+    return out
+
+
+def _push(args: list[str], cfg: AppConfig, cwd: str | Path | None) -> None:
+    LOG.info("git %s", " ".join(args))
+    if not cfg.dry_run:
+        git(args, cwd=cwd)
+
+
+def publish(plan: PublishPlan, cfg: AppConfig, *, cwd: str | Path | None = None) -> None:
+    """Phase two: push the heads, open the PRs wave by wave, push the base, clean up."""
+    remote, base = cfg.remote_name, cfg.base_branch
+    t0 = time.perf_counter()
+
+    # Each PR's head as it was merged. Kept branches may have moved on since,
+    # and they get their final tip in the last push.
+    heads = {pr.spec.head: pr.head for pr in plan.prs}
+    heads.update({r: sha for r, sha in plan.refs.items() if r != base and r not in heads})
+    if heads:
+        refspecs = [f"{sha}:refs/heads/{ref}" for ref, sha in sorted(heads.items())]
+        _push(["push", "--atomic", remote, *refspecs], cfg, cwd)
+
+    remote_base = plan.base_commits[0]
+    groups = waves(plan)
+    for at, prs in groups:
+        target = plan.base_commits[at]
+        if target != remote_base:
+            _push(["push", remote, f"{target}:refs/heads/{base}"], cfg, cwd)
+            remote_base = target
+        LOG.info("publish: opening %d PR(s) against %s", len(prs), target[:12])
+        if cfg.dry_run:
+            continue
+        pool = PRPool(cfg.pr_workers, cwd=cwd)
+        try:
+            for pr in prs:
+                pool.submit(pr.spec)
+            pool.wait()
+        finally:
+            pool.close()
+
+    final = [
+        f"{sha}:refs/heads/{ref}"
+        for ref, sha in sorted(plan.refs.items())
+        if (ref == base and sha != remote_base) or (ref != base and sha != heads.get(ref))
+    ]
+    if final:
+        _push(["push", "--atomic", remote, *final], cfg, cwd)
+    # After the base push, so GitHub records the PRs as merged, not closed.
+    gone = sorted(b for b in plan.deleted if b in heads)
+    if gone:
+        _push(["push", "--atomic", remote, *[f":refs/heads/{b}" for b in gone]], cfg, cwd)
+    LOG.info(
+        "publish: %d branch(es), %d PR(s) in %d wave(s) in %.2fs",
+        len(heads), len(plan.prs), len(groups), time.perf_counter() - t0,
+    )  # fmt: skip
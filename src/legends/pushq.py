@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from .executor import default_executor
+from .utils import LOG, git
+
+
+class PushQueue:
+    """
+    Coalesce the pushes of a run into as few `git push --atomic` calls as possible.
+
+    Branch pushes are recorded by name and sent with whatever the local tip is
+    at flush time, so several commits or merges on one branch cost one ref
+    update. Remote deletions are held back by one flush: a merged branch is
+    deleted only after the push that advanced its base has landed, so GitHub
+    sees the merge before the head branch disappears.
+    """
+
+    def __init__(self, remote: str, *, cwd: str | Path | None = None):
+        self.remote = remote
+        self.cwd = cwd
+        self._updates: dict[str, None] = {}
+        self._deletes_ready: dict[str, None] = {}
+        self._deletes_held: dict[str, None] = {}
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._updates) + len(self._deletes_ready) + len(self._deletes_held)
+
+    def push(self, branch: str) -> None:
+        self._deletes_ready.pop(branch, None)
+        self._deletes_held.pop(branch, None)
+        self._updates[branch] = None
+
+    def delete(self, branch: str) -> None:
+        self._updates.pop(branch, None)
+        self._deletes_held[branch] = None
+
+    def pending(self) -> list[str]:
+        """Human-readable list of queued refspecs (updates and deletions)."""
+        return [*self._updates, *(f":{b}" for b in (*self._deletes_ready, *self._deletes_held))]
+
+    def _on_remote(self, branch: str) -> bool:
+        ref = f"refs/remotes/{self.remote}/{branch}"
+        return default_executor().ref_exists(ref, cwd=self.cwd)
+
+    def flush(self, *, dry: bool = False) -> None:
+        """Send queued updates plus deletions that are ready, as one atomic push."""
+        specs = [f"refs/heads/{b}:refs/heads/{b}" for b in self._updates]
+        specs += [f":refs/heads/{b}" for b in self._deletes_ready if dry or self._on_remote(b)]
+        if specs:
+            args = ["push", "--atomic", self.remote, *specs]
+            LOG.info("git %s", " ".join(args))
+            if not dry:
+                git(args, cwd=self.cwd)
+            self.flushes += 1
+        self._updates.clear()
+        self._deletes_ready = self._deletes_held
+        self._deletes_held = {}
+
+    def drain(self, *, dry: bool = False) -> None:
+        """Flush until nothing is queued (held deletions need a second push)."""
+        while len(self):
+            self.flush(dry=dry)
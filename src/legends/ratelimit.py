@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Sequence
+
+from . import tracing
+from .executor import RunResult
+from .utils import LOG
+
+# GitHub's documented secondary limits: 900 points/minute for REST, where a GET
+# costs 1 point and a mutating request 5, and at most 80 content-creating
+# requests per minute and 500 per hour.
+READS_PER_SECOND = 15.0
+WRITES_PER_MINUTE = 80
+WRITES_PER_HOUR = 500
+# Below this many requests left in the window, spread the rest until the reset.
+LOW_WATER = 100
+# GitHub asks for at least a minute's pause after a secondary limit without Retry-After.
+SECONDARY_WAIT = 60.0
+
+_PRIMARY = re.compile(r"API rate limit exceeded|rate limit exceeded for", re.I)
+_SECONDARY = re.compile(
+    r"secondary rate limit|abuse detection|submitted too quickly|too many requests", re.I
+)
+_TRANSIENT = re.compile(
+    r"HTTP 50[0234]|connection reset|connection refused|timed? ?out|TLS handshake|unexpected EOF"
+    r"|server error|temporarily unavailable",
+    re.I,
+)
+_REJECTED = re.compile(r"HTTP 4(03|29)")
+_HEADERS = re.compile(r"\r?\n\r?\n")
+
+_READ_COMMANDS = {
+    ("pr", "list"), ("pr", "view"), ("pr", "status"), ("pr", "diff"), ("pr", "checks"),
+    ("repo", "view"), ("repo", "list"), ("auth", "status"), ("issue", "list"), ("issue", "view"),
+}  # fmt: skip
+_FIELD_FLAGS = {"-f", "-F", "--field", "--raw-field", "--input"}
+_VALUE_FLAGS = _FIELD_FLAGS | {
+    "-X", "--method", "-H", "--header", "-q", "--jq", "-t", "--template",
+    "-p", "--preview", "--hostname", "--cache",
+}  # fmt: skip
+
+
+def _endpoint(args: Sequence[str]) -> str:
+    """The endpoint argument of `gh api ...` (flags and their values skipped)."""
+    it = iter(args[1:])
+    for a in it:
+        if a in _VALUE_FLAGS:
+            next(it, None)
+        elif not a.startswith("-"):
+            return a
+    return ""
+
+
+def _api_method(args: Sequence[str]) -> str:
+    for i, a in enumerate(args):
+        if a in ("-X", "--method") and i + 1 < len(args):
+            return args[i + 1].upper()
+        if a.startswith("--method="):
+            return a.split("=", 1)[1].upper()
+    # Like gh itself: fields turn a request into a POST.
+    return "POST" if any(a in _FIELD_FLAGS for a in args) else "GET"
+
+
+def _graphql_query(args: Sequence[str]) -> str:
+    for i, a in enumerate(args[:-1]):
+        if a in ("-f", "-F", "--field", "--raw-field") and args[i + 1].startswith("query="):
+            return args[i + 1][len("query=") :]
+    return ""
+
+
+def classify(args: Sequence[str]) -> tuple[bool, bool]:
+    """
+    Return (writes, idempotent) for a gh invocation.
+
+    `writes` calls create or change content and are paced against the much
+    tighter content-creation limits. `idempotent` calls can be repeated
+    safely after an ambiguous failure (a 5xx or a dropped connection).
+    """
+    if not args:
+        return False, True
+    if args[0] != "api":
+        read = tuple(args[:2]) in _READ_COMMANDS
+        return not read, read
+    endpoint = _endpoint(args)
+    if endpoint == "graphql":
+        mutation = re.match(r"\s*mutation\b", _graphql_query(args)) is not None
+        return mutation, not mutation
+    method = _api_method(args)
+    return method not in {"GET", "HEAD"}, method in {"GET", "HEAD", "PUT", "DELETE"}
+
+
+def _describe(args: Sequence[str]) -> str:
+    if args and args[0] == "api":
+        endpoint = _endpoint(args)
+        if endpoint != "graphql":
+            return f"api {_api_method(args)} {endpoint}"
+    return " ".join(args[:2])
+
+
+def _with_headers(args: Sequence[str]) -> list[str]:
+    """Add `--include` to `gh api` calls whose output is the raw body, to read rate headers."""
+    args = list(args)
+    if not args or args[0] != "api":
+        return args
+    plain = {"-i", "--include", "--paginate", "-q", "--jq", "-t", "--template", "--silent"}
+    if any(a in plain or a.startswith(("--jq=", "--template=")) for a in args):
+        return args
+    return ["api", "--include", *args[1:]]
+
+
+def _split_headers(stdout: str) -> tuple[dict[str, str], str]:
+    if not stdout.startswith("HTTP/"):
+        return {}, stdout
+    parts = _HEADERS.split(stdout, maxsplit=1)
+    head, body = parts[0], parts[1] if len(parts) > 1 else ""
+    headers = {}
+    for line in head.splitlines()[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers, body
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `reserve()` takes a token and returns how long
+    the caller must wait for it; tokens may go negative, so queued callers
+    get increasing waits and are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.nominal = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def slow_down(self, factor: float = 0.5) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.nominal / 16, self.rate * factor)
+
+    def recover(self, step: float = 0.05) -> None:
+        with self._lock:
+            if self.rate < self.nominal:
+                self._refill(time.monotonic())
+                self.rate = min(self.nominal, self.rate + self.nominal * step)
+
+
+@dataclass
+class _Window:
+    remaining: int
+    reset: float  # epoch seconds
+
+
+class GitHubScheduler:
+    """
+    Pace and retry every gh call.
+
+    - Requests take a token from the read bucket, and content-creating ones
+      also from the per-minute and per-hour write buckets.
+    - Remaining quota is read from the `X-RateLimit-*` headers of `gh api`
+      responses (per resource: core, graphql, ...). When little is left the
+      remaining requests are spread over the time to the reset, and an
+      exhausted window waits for the reset.
+    - Rate-limit rejections are retried for every call, because GitHub did not
+      perform the request. Secondary limits honour Retry-After, else back off
+      exponentially from a minute, and halve the pace of the bucket involved.
+      The pace recovers additively on success.
+    - Transient failures (5xx, dropped connections) are retried with jittered
+      exponential backoff, but only for idempotent calls.
+    """
+
+    def __init__(
+        self,
+        *,
+        retries: int = 5,
+        writes_per_minute: float = WRITES_PER_MINUTE,
+        backoff: float = 1.0,
+        secondary_wait: float = SECONDARY_WAIT,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.secondary_wait = secondary_wait
+        self.share = 1.0
+        self.reads = TokenBucket(READS_PER_SECOND, READS_PER_SECOND)
+        self.writes: Optional[TokenBucket] = None
+        self.hourly: Optional[TokenBucket] = None
+        self._set_write_pace(writes_per_minute)
+        self.windows: dict[str, _Window] = {}
+        self.retried = 0
+        self.waited = 0.0
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def _set_write_pace(self, per_minute: float) -> None:
+        if per_minute <= 0:
+            # e.g. GitHub Enterprise Server with rate limiting disabled
+            self.writes = self.hourly = None
+            return
+        per_minute *= self.share
+        per_hour = WRITES_PER_HOUR * self.share
+        self.writes = TokenBucket(per_minute / 60.0, max(1.0, per_minute / 8))
+        self.hourly = TokenBucket(per_hour / 3600.0, max(1.0, per_hour))
+
+    def configure(self, *, retries: int, writes_per_minute: float, share: float = 1.0) -> None:
+        """
+        `share` is this process's part of the account's budget, when several
+        processes make calls at once (`legends run-many`): every pace, and
+        the spreading of what is left of a window, is scaled by it.
+        """
+        self.retries = retries
+        if share != self.share:
+            self.share = share
+            rate = READS_PER_SECOND * share
+            self.reads = TokenBucket(rate, max(1.0, rate))
+        self._set_write_pace(writes_per_minute)
+
+    def _bucket(self, writes: bool) -> TokenBucket:
+        return self.writes if writes and self.writes is not None else self.reads
+
+    # -- pacing -------------------------------------------------------------
+
+    def _delay_before(self, resource: str, writes: bool) -> float:
+        delay = self.reads.reserve()
+        if writes and self.writes is not None and self.hourly is not None:
+            delay = max(delay, self.writes.reserve(), self.hourly.reserve())
+        with self._lock:
+            w = self.windows.get(resource)
+            if w is not None:
+                left = w.reset - time.time()
+                if w.remaining <= 0 and left > 0:
+                    delay = max(delay, left + 1)
+                elif w.remaining < LOW_WATER and left > 0:
+                    delay = max(delay, left / (w.remaining * self.share))
+                if w.remaining > 0:
+                    w.remaining -= 1
+        return delay
+
+    def _observe(self, headers: dict[str, str], resource: str) -> None:
+        if "x-ratelimit-remaining" not in headers:
+            return
+        try:
+            w = _Window(int(headers["x-ratelimit-remaining"]), float(headers["x-ratelimit-reset"]))
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            self.windows[headers.get("x-ratelimit-resource", resource)] = w
+
+    # -- retry policy -------------------------------------------------------
+
+    def _jitter(self, attempt: int, base: float, cap: float = 300.0) -> float:
+        return random.uniform(base / 2, min(cap, base * 2**attempt))
+
+    def _retry_delay(
+        self, args: list[str], res: RunResult, headers: dict[str, str], resource: str, attempt: int
+    ) -> Optional[float]:
+        """Seconds to wait before retrying a failed call, or None to give up."""
+        if attempt >= self.retries:
+            return None
+        writes, idempotent = classify(args)
+        text = f"{res.stderr}\n{res.stdout}"
+        retry_after = headers.get("retry-after")
+        if _SECONDARY.search(text) or (retry_after is not None and _REJECTED.search(text)):
+            self._bucket(writes).slow_down()
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+            return self._jitter(attempt, self.secondary_wait)
+        if _PRIMARY.search(text) or headers.get("x-ratelimit-remaining") == "0":
+            w = self.windows.get(resource)
+            wait = (w.reset - time.time() + 1) if w else 0.0
+            return max(wait, self._jitter(attempt, self.backoff))
+        if _TRANSIENT.search(text) and idempotent:
+            return self._jitter(attempt, self.backoff, cap=30.0)
+        return None
+
+    def _attempt(
+        self, args: list[str], sent: list[str], res: RunResult, resource: str, writes: bool, n: int
+    ) -> tuple[RunResult, Optional[float]]:
+        headers, body = _split_headers(res.stdout) if sent != args else ({}, res.stdout)
+        self._observe(headers, resource)
+        res = RunResult(["gh", *args], res.returncode, body, res.stderr)
+        if res.returncode == 0:
+            self._bucket(writes).recover()
+            return res, None
+        delay = self._retry_delay(args, res, headers, resource, n)
+        if delay is not None:
+            self.retried += 1
+            LOG.warning(
+                "gh %s failed (%s); retry %d/%d in %.1fs",
+                _describe(args), (res.stderr.strip().splitlines() or ["?"])[-1],
+                n + 1, self.retries, delay,
+            )  # fmt: skip
+        return res, delay
+
+    def _prepare(self, args: Sequence[str]) -> tuple[list[str], list[str], str, bool]:
+        args = list(args)
+        writes, _ = classify(args)
+        resource = "graphql" if args[:2] == ["api", "graphql"] else "core"
+        return args, _with_headers(args), resource, writes
+
+    def call(self, args: Sequence[str], run: Callable[[list[str]], RunResult]) -> RunResult:
+        """Run `gh <args>` through `run` (which must not raise on failure), pacing and retrying."""
+        args, sent, resource, writes = self._prepare(args)
+        n = 0
+        while True:
+            wait = self._delay_before(resource, writes)
+            if wait > 0:
+                self.waited += wait
+                with tracing.span("gh pacing", "wait", call=_describe(args)):
+                    self._sleep(wait)
+            res, delay = self._attempt(args, sent, run(sent), resource, writes, n)
+            if delay is None:
+                return res
+            self.waited += delay
+            with tracing.span("gh retry wait", "wait", call=_describe(args), attempt=n + 1):
+                self._sleep(delay)
+            n += 1
+
+    async def acall(
+        self, args: Sequence[str], run: Callable[[list[str]], Awaitable[RunResult]]
+    ) -> RunResult:
+        """`call` for asyncio callers; waits with asyncio.sleep."""
+        import asyncio  # only reached from a running loop, so this is a dict lookup
+
+        args, sent, resource, writes = self._prepare(args)
+        n = 0
+        while True:
+            wait = self._delay_before(resource, writes)
+            if wait > 0:
+                self.waited += wait
+                with tracing.span("gh pacing", "wait", call=_describe(args)):
+                    await asyncio.sleep(wait)
+            res, delay = self._attempt(args, sent, await run(sent), resource, writes, n)
+            if delay is None:
+                return res
+            self.waited += delay
+            with tracing.span("gh retry wait", "wait", call=_describe(args), attempt=n + 1):
+                await asyncio.sleep(delay)
+            n += 1
+
+
+_DEFAULT: Optional[GitHubScheduler] = None
+
+
+def github_scheduler() -> GitHubScheduler:
+    """The process-wide scheduler used by `utils.gh`."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = GitHubScheduler()
+    return _DEFAULT
@@ -0,0 +1,203 @@
+"""
+`legends serve`: one long-lived process that runs commands sent over a Unix socket.
+
+Every `legends` invocation from a shell script pays for interpreter start,
+imports, config loading and the identity lookup before any git work. The
+server does that once. It keeps the loaded config (per `--config` file), the
+resolved identity, the memoized tool paths and the per-repository git batch
+processes of the executor, and runs each request against them.
+
+Protocol: the client sends one JSON line, `{"argv": [...], "cwd": "..."}`
+(or `{"shutdown": true}`). The server answers with JSON lines
+`{"out": text}` / `{"err": text}` as the command writes, then `{"exit": n}`.
+Requests run one at a time, in the requesting directory. The server's own
+environment applies, not the client's.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import dataclasses
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+from . import cli
+from .client import socket_path
+from .config import AppConfig, load_config
+from .exceptions import BackdateError
+from .executor import ExecStats, default_executor
+from .utils import LOG
+
+
+class _Stream:
+    """A text stream that forwards writes to the client as `{key: text}` messages."""
+
+    def __init__(self, wfile: IO[bytes], key: str, lock: threading.Lock):
+        self.wfile = wfile
+        self.key = key
+        self.lock = lock
+        self.closed = False
+
+    def write(self, text: str) -> int:
+        if text and not self.closed:
+            with self.lock:
+                try:
+                    self.wfile.write(json.dumps({self.key: text}).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                except OSError:
+                    # The client went away; let the command finish regardless.
+                    self.closed = True
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+@contextlib.contextmanager
+def _redirected(out: _Stream, err: _Stream) -> Iterator[None]:
+    """Send stdout, stderr and the legends log to the client while a request runs."""
+    handlers = [h for h in LOG.handlers if isinstance(h, logging.StreamHandler)]
+    saved = [h.setStream(err) for h in handlers]
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            yield
+    finally:
+        for h, stream in zip(handlers, saved):
+            h.setStream(stream)
+
+
+class Server(socketserver.UnixStreamServer):
+    request_queue_size = 64
+
+    def __init__(self, path: str, cfg: AppConfig, config_path: Optional[str]):
+        self.path = path
+        # Loaded configs by --config path; identity is filled in on first need.
+        self.configs: dict[Optional[str], tuple[float, AppConfig]] = {
+            config_path: (_mtime(config_path), cfg)
+        }
+        self.hydrated: set[Optional[str]] = set()
+        self.served = 0
+        old = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old)
+
+    def config_for(self, ns: argparse.Namespace) -> AppConfig:
+        """A fresh copy of the warm config for `ns.config`, reloaded when the file changed."""
+        key = ns.config
+        mtime = _mtime(key)
+        cached = self.configs.get(key)
+        if cached is None or cached[0] != mtime or ns.refresh_identity:
+            cached = (mtime, load_config(key))
+            self.configs[key] = cached
+            self.hydrated.discard(key)
+        cfg = cached[1]
+        if key not in self.hydrated and cli._writes_commits(ns) and not ns.dry_run:
+            cli._hydrate_identity(cfg, refresh=ns.refresh_identity)
+            self.hydrated.add(key)
+        return dataclasses.replace(cfg)
+
+    def execute(self, argv: list[str], cwd: Optional[str]) -> int:
+        """Run one command line as `legends` would, in `cwd`; returns its exit status."""
+        home, level = os.getcwd(), LOG.level
+        try:
+            ns = cli._parse_args(argv)
+        except SystemExit as exc:  # --help, or a usage error already printed
+            return exc.code if isinstance(exc.code, int) else 1
+        if ns.cmd == "serve":
+            LOG.error("serve: already serving")
+            return 2
+        try:
+            if cwd:
+                os.chdir(cwd)
+            cli._apply_verbosity(ns.verbose)
+            # Per-command process counts for `-vv`; the batch processes stay open
+            # unless their repository was re-created since the last command.
+            default_executor().drop_stale()
+            default_executor().stats = ExecStats()
+            return cli.run(ns, self.config_for(ns))
+        except Exception:
+            LOG.exception("legends %s failed", " ".join(argv))
+            return 1
+        finally:
+            os.chdir(home)
+            LOG.setLevel(level)
+            self.served += 1
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: Server
+
+    def handle(self) -> None:
+        lock = threading.Lock()
+        out, err = _Stream(self.wfile, "out", lock), _Stream(self.wfile, "err", lock)
+        try:
+            req = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            req = {}
+        if req.get("shutdown"):
+            status = 0
+            threading.Thread(target=self.server.shutdown).start()
+        elif not isinstance(req.get("argv"), list):
+            err.write("legends: malformed request\n")
+            status = 2
+        else:
+            with _redirected(out, err):
+                status = self.server.execute(req["argv"], req.get("cwd"))
+        with contextlib.suppress(OSError):
+            self.wfile.write(json.dumps({"exit": status}).encode("utf-8") + b"\n")
+
+
+def _mtime(path: Optional[str]) -> float:
+    try:
+        return os.stat(path).st_mtime if path else 0.0
+    except OSError:
+        return 0.0
+
+
+def _claim(path: str) -> None:
+    """Remove a stale socket left by a server that died; refuse if one is still listening."""
+    if not os.path.exists(path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise BackdateError(f"serve: a server is already listening on {path}")
+
+
+def serve(cfg: AppConfig, path: Optional[str] = None, config_path: Optional[str] = None) -> None:
+    """
+    Serve requests on `path` until a client asks for shutdown or the process
+    gets SIGINT/SIGTERM. `cfg` is the config loaded from `config_path`.
+    """
+    path = path or socket_path()
+    _claim(path)
+    server = Server(path, cfg, config_path)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    LOG.info("Serving on %s", path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+        default_executor().close()
+        LOG.info("Served %d command(s)", server.served)
@@ -0,0 +1,256 @@
+"""
+`legends.Session`: the CLI commands as methods, for programs that drive legends.
+
+    from legends import Session
+
+    s = Session("demo", "config/defaults.yaml")
+    s.create_repo(date="2024-12-01 12:00:00")
+    s.create_branch("feature-x", date="2025-02-10 09:00")
+    s.commit("feature-x", date="2025-02-10 15:00", message="feat: x", touch="x.txt")
+    pr = s.open_pr("feature-x", title="Feature X")
+    s.merge_pr("feature-x", date="2025-02-11 10:00")
+
+Each method does what the matching `legends` command does, including
+waiting for the PRs it opened and sending deferred pushes, and raises the
+same exceptions instead of returning an exit status. The session keeps the
+resolved config and identity across calls. The tool paths and git batch
+processes are kept per process.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from . import cli
+from .config import AppConfig, load_config
+from .prs import PRPool, PullRequest
+from .ratelimit import github_scheduler
+from .templates import set_template_dirs
+from .utils import LOG, pushd
+
+# Commands run in the session's directory, and the working directory belongs
+# to the process: sessions used from several threads take turns. Use a
+# process pool to run repositories in parallel.
+_LOCK = threading.RLock()
+
+
+def _reset_lock() -> None:
+    global _LOCK
+    _LOCK = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_lock)
+
+
+class Session:
+    """
+    Commands against one repository (`repo_dir`) with a config loaded once.
+
+    `config` is a YAML path, an AppConfig (copied), or None for defaults and
+    `GHB_*` variables. `dry_run`, `plumbing` and `defer_push` act as the
+    global CLI flags of the same names. Sessions pickle, so they can be
+    handed to process pool workers.
+    """
+
+    def __init__(
+        self,
+        repo_dir: str | Path = ".",
+        config: str | Path | AppConfig | None = None,
+        *,
+        dry_run: bool = False,
+        plumbing: bool = False,
+        defer_push: bool = False,
+    ):
+        self.repo_dir = Path(repo_dir).resolve()
+        if isinstance(config, AppConfig):
+            cfg = dataclasses.replace(config, push_queue=None, pr_pool=None)
+        else:
+            cfg = load_config(str(config) if config else None)
+        cfg.dry_run = cfg.dry_run or dry_run
+        cfg.plumbing = cfg.plumbing or plumbing
+        cfg.defer_push = cfg.defer_push or defer_push
+        self.cfg = cfg
+        self._identified = False
+
+    def __repr__(self) -> str:
+        return f"Session({str(self.repo_dir)!r})"
+
+    def _run(self, kind: str, cwd: Path, **args: Any) -> Optional[PRPool]:
+        """Run one command in `cwd` and finish it; returns its PR pool, if it opened PRs."""
+        cfg = self.cfg
+        with _LOCK, pushd(cwd):
+            github_scheduler().configure(
+                retries=cfg.gh_retries, writes_per_minute=cfg.gh_writes_per_minute
+            )
+            set_template_dirs([cfg.template_dir])
+            if kind != "open-pr" and not self._identified:
+                cli._hydrate_identity(cfg, offline=cfg.dry_run)
+                self._identified = not cfg.dry_run
+            try:
+                cli._COMMANDS[kind](argparse.Namespace(**args), cfg)
+                pool = cfg.pr_pool
+                cli._finish(cfg)
+                return pool
+            finally:
+                if cfg.push_queue is not None and len(cfg.push_queue):
+                    LOG.warning("Not pushed: %s", " ".join(cfg.push_queue.pending()))
+                leftover, cfg.pr_pool, cfg.push_queue = cfg.pr_pool, None, None
+                if leftover is not None:
+                    leftover.close()
+
+    def create_repo(
+        self,
+        *,
+        date: Optional[str] = None,
+        owner: Optional[str] = None,
+        visibility: Optional[str] = None,
+        description: str = "",
+        readme: str = "README.md",
+        branch: Optional[str] = None,
+    ) -> None:
+        """Create `repo_dir` with a backdated initial commit and its GitHub repository."""
+        self._run(
+            "create-repo",
+            self.repo_dir.parent,
+            name=self.repo_dir.name,
+            owner=owner,
+            date=date,
+            private=visibility == "private",
+            public=visibility == "public",
+            description=description,
+            readme=readme,
+            branch=branch,
+        )
+
+    def create_branch(
+        self,
+        branch: str,
+        *,
+        date: str,
+        base: Optional[str] = None,
+        message: Optional[str] = None,
+        push: bool = False,
+    ) -> None:
+        """Create `branch` from `base` with a backdated empty commit."""
+        self._run(
+            "create-branch",
+            self.repo_dir,
+            branch=branch,
+            base=base,
+            date=date,
+            message=message,
+            push=push,
+        )
+
+    def create_branches(
+        self,
+        from_file: str | Path,
+        *,
+        date: Optional[str] = None,
+        base: Optional[str] = None,
+        push: bool = False,
+    ) -> None:
+        """Create and delete the branches listed in `from_file` in one ref transaction."""
+        self._run(
+            "create-branches",
+            self.repo_dir,
+            from_file=str(Path(from_file).resolve()),
+            date=date,
+            base=base,
+            push=push,
+        )
+
+    def commit(
+        self,
+        branch: str,
+        *,
+        date: str,
+        message: str,
+        touch: Optional[str] = None,
+        add_all: bool = False,
+        allow_empty: bool = False,
+        author: Optional[str] = None,
+        push: bool = False,
+    ) -> None:
+        """Make a backdated commit on `branch`; `author` is 'Name <email>'."""
+        self._run(
+            "commit",
+            self.repo_dir,
+            branch=branch,
+            date=date,
+            message=message,
+            allow_empty=allow_empty,
+            add_all=add_all,
+            touch=touch,
+            author=author,
+            push=push,
+        )
+
+    def open_pr(
+        self,
+        branch: str,
+        *,
+        base: Optional[str] = None,
+        title: Optional[str] = None,
+        body: Optional[str] = None,
+        draft: bool = False,
+    ) -> Optional[PullRequest]:
+        """Push `branch` and open its PR; returns the PR (None in a dry run)."""
+        pool = self._run(
+            "open-pr", self.repo_dir, branch=branch, base=base, title=title, body=body, draft=draft
+        )
+        return pool.get(branch) if pool is not None else None
+
+    def merge_pr(
+        self,
+        branch: Optional[str] = None,
+        *,
+        date: str,
+        pr: Optional[int] = None,
+        base: Optional[str] = None,
+        message: Optional[str] = None,
+        delete_branch: bool = True,
+    ) -> None:
+        """Merge `branch` (or PR number `pr`) into its base with a backdated merge commit."""
+        self._run(
+            "merge-pr",
+            self.repo_dir,
+            branch=branch,
+            pr=pr,
+            base=base,
+            date=date,
+            message=message,
+            delete_branch=delete_branch,
+        )
+
+    def commit_all(
+        self,
+        branch: str,
+        *,
+        commit_date: str,
+        message: str,
+        merge_date: str,
+        base: Optional[str] = None,
+        pr_title: Optional[str] = None,
+        pr_body: Optional[str] = None,
+        delete_branch: bool = True,
+    ) -> Optional[PullRequest]:
+        """Commit, open a PR and merge it, as `legends commit-all`; returns the PR."""
+        pool = self._run(
+            "commit-all",
+            self.repo_dir,
+            branch=branch,
+            base=base,
+            commit_date=commit_date,
+            message=message,
+            pr_title=pr_title,
+            pr_body=pr_body,
+            merge_date=merge_date,
+            delete_branch=delete_branch,
+        )
+        return pool.get(branch) if pool is not None else None
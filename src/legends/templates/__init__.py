@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import functools
+import string
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Mapping, Optional
+from typing import Iterable, Mapping, Optional, Sequence
+
+from ..exceptions import ConfigError
 
 
 class _SafeDict(dict):
@@ -21,6 +25,100 @@ def _read_text(path: Path) -> str:
         return f.read()
 
 
+_FORMATTER = string.Formatter()
+
+
+class Template:
+    """
+    A template parsed once into literal text and placeholders.
+
+    Rendering walks the parsed parts instead of re-parsing the string, and
+    placeholders without a value are left in the output as written (as
+    `_render_str` does).
+    """
+
+    __slots__ = ("source", "origin", "_parts", "_nested")
+
+    def __init__(self, source: str, origin: Optional[Path] = None):
+        self.source = source
+        self.origin = origin
+        try:
+            parsed = list(_FORMATTER.parse(source))
+        except ValueError as exc:
+            raise ConfigError(f"Bad template {origin or source!r}: {exc}") from exc
+        # (literal, field, key, conversion, spec, raw placeholder)
+        self._parts = []
+        for literal, fld, spec, conv in parsed:
+            if fld is None:
+                self._parts.append((literal, None, None, None, None, None))
+                continue
+            raw = "{" + fld + (f"!{conv}" if conv else "") + (f":{spec}" if spec else "") + "}"
+            key = fld.partition(".")[0].partition("[")[0]
+            self._parts.append((literal, fld, key, conv, spec, raw))
+        # Specs with nested fields ("{x:{width}}") are left to str.format_map.
+        self._nested = any(p[4] and "{" in p[4] for p in self._parts)
+
+    def render(self, values: Mapping[str, object]) -> str:
+        if self._nested:
+            return _render_str(self.source, values)
+        out = []
+        for literal, fld, key, conv, spec, raw in self._parts:
+            out.append(literal)
+            if fld is None:
+                continue
+            if key not in values:
+                out.append(raw)
+                continue
+            obj = values[key] if fld == key else _FORMATTER.get_field(fld, (), values)[0]
+            if conv:
+                obj = _FORMATTER.convert_field(obj, conv)
+            out.append(format(obj, spec) if spec else str(obj))
+        return "".join(out)
+
+
+class TemplateSet:
+    """
+    Every template of the package directory plus override directories,
+    read and parsed once.
+
+    Templates are named by file stem (`merge_message.txt` -> "merge_message").
+    Later directories win, so a user directory only needs the files it
+    changes; it may also add templates of its own.
+    """
+
+    SUFFIXES = (".txt", ".md")
+
+    def __init__(self, dirs: Sequence[Path]):
+        self.dirs = tuple(dirs)
+        self._templates: dict[str, Template] = {}
+        for d in self.dirs:
+            if not d.is_dir():
+                raise ConfigError(f"Template directory not found: {d}")
+            for path in sorted(d.iterdir()):
+                if path.suffix in self.SUFFIXES and path.is_file():
+                    self._templates[path.stem] = Template(_read_text(path), path)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def names(self) -> list[str]:
+        return sorted(self._templates)
+
+    def get(self, name: str) -> Template:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise ConfigError(f"Unknown template {name!r} (have: {', '.join(self.names())})")
+
+    def render(self, name: str, values: Optional[Mapping[str, object]] = None, **kw) -> str:
+        return self.get(name).render({**(values or {}), **kw} if kw else values or {})
+
+    def render_many(self, name: str, rows: Iterable[Mapping[str, object]]) -> list[str]:
+        """Render one template for many value mappings, e.g. all messages of a run up front."""
+        render = self.get(name).render
+        return [render(row) for row in rows]
+
+
 @dataclass(frozen=True)
 class TemplateFiles:
     root: Path
@@ -29,6 +127,7 @@ class TemplateFiles:
     pr_body: str = "pr_body.md"
     review_body: str = "review_body.md"
     merge_message: str = "merge_message.txt"
+    merge_subject: str = "merge_subject.txt"
 
     def path(self, name: str) -> Path:
         return self.root / name
@@ -36,6 +135,25 @@ class TemplateFiles:
 
 _TPL_DIR = Path(__file__).resolve().parent
 FILES = TemplateFiles(root=_TPL_DIR)
+_OVERRIDES: tuple[str, ...] = ()
+
+
+@functools.lru_cache(maxsize=None)
+def load_templates(*override_dirs: str) -> TemplateSet:
+    """The packaged templates overlaid with `override_dirs`; each combination is loaded once."""
+    return TemplateSet([_TPL_DIR, *(Path(d).expanduser().resolve() for d in override_dirs)])
+
+
+def set_template_dirs(dirs: Iterable[str]) -> TemplateSet:
+    """Select the override directories used by `templates()` and the render_* helpers."""
+    global _OVERRIDES
+    _OVERRIDES = tuple(str(Path(d).expanduser().resolve()) for d in dirs if d)
+    return load_templates(*_OVERRIDES)
+
+
+def templates() -> TemplateSet:
+    """The active template set (see `set_template_dirs`)."""
+    return load_templates(*_OVERRIDES)
 
 
 def render_commit_message(
@@ -55,7 +173,6 @@ def render_commit_message(
       - {summary}
       - {date}
     """
-    tpl = _read_text(FILES.path(FILES.commit_message))
     values = {
         "type": type_,
         "branch": branch,
@@ -64,7 +181,7 @@ def render_commit_message(
     }
     if extra:
         values.update(extra)
-    return _render_str(tpl, values)
+    return templates().render("commit_message", values)
 
 
 def render_pr_title(
@@ -78,11 +195,10 @@ def render_pr_title(
     Template placeholders:
       - {summary}
     """
-    tpl = _read_text(FILES.path(FILES.pr_title))
     values = {"summary": summary}
     if extra:
         values.update(extra)
-    return _render_str(tpl, values)
+    return templates().render("pr_title", values)
 
 
 def render_pr_body(
@@ -104,7 +220,6 @@ def render_pr_body(
       - {date}
       - {notes}
     """
-    tpl = _read_text(FILES.path(FILES.pr_body))
     values = {
         "summary": summary,
         "branch": branch,
@@ -114,7 +229,7 @@ def render_pr_body(
     }
     if extra:
         values.update(extra)
-    return _render_str(tpl, values)
+    return templates().render("pr_body", values)
 
 
 def render_review_body(
@@ -130,14 +245,13 @@ def render_review_body(
       - {today} (defaults to today's date in ISO format)
       - {notes}
     """
-    tpl = _read_text(FILES.path(FILES.review_body))
     values = {
         "today": today or datetime.now().date().isoformat(),
         "notes": notes,
     }
     if extra:
         values.update(extra)
-    return _render_str(tpl, values)
+    return templates().render("review_body", values)
 
 
 def render_merge_message(
@@ -155,12 +269,38 @@ def render_merge_message(
       - {prefix}  -> computed line referencing either PR or branch
       - {title}   -> optional title (defaults to "Merge {branch}")
     """
+    return templates().render("merge_message", _merge_values(base, branch, pr_number, title, extra))
+
+
+def render_merge_subject(
+    *,
+    base: str,
+    branch: str,
+    pr_number: Optional[int] = None,
+    extra: Optional[Mapping[str, object]] = None,
+) -> str:
+    """
+    Render the default merge commit message of the CLI and the timeline
+    backends, which is the merge line alone.
+
+    File template uses the placeholders of `render_merge_message`; the
+    packaged one is just {prefix}.
+    """
+    return templates().render("merge_subject", _merge_values(base, branch, pr_number, None, extra))
+
+
+def _merge_values(
+    base: str,
+    branch: str,
+    pr_number: Optional[int],
+    title: Optional[str],
+    extra: Optional[Mapping[str, object]],
+) -> dict[str, object]:
     if pr_number is not None:
         prefix = f"Merge pull request #{pr_number} from {branch}"
     else:
         prefix = f"Merge branch '{branch}' into {base}"
 
-    tpl = _read_text(FILES.path(FILES.merge_message))
     values = {
         "prefix": prefix,
         "title": title or f"Merge {branch}",
@@ -170,4 +310,4 @@ def render_merge_message(
     }
     if extra:
         values.update(extra)
-    return _render_str(tpl, values)
+    return values
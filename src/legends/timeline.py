@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from .config import AppConfig, _read_yaml
+from .core.dates import GIT_DATE_FORMAT, DateBatch
+from .exceptions import ConfigError, TimelineError
+from .utils import split_ident
+
+# How many date problems a failed validation lists before summarising the rest.
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass(frozen=True)
+class Step:
+    """
+    One unit of work in a compiled timeline.
+
+    `kind` is the CLI subcommand that performs the step (e.g. "commit") and
+    `args` holds the same fields argparse would put on the Namespace for it.
+    """
+
+    kind: str
+    args: dict[str, Any] = field(default_factory=dict)
+    feature: str | None = None
+
+
+def load_timeline(path: str | Path) -> dict[str, Any]:
+    """Read a timeline YAML file once and return its mapping."""
+    p = Path(path)
+    if not p.exists():
+        raise ConfigError(f"Timeline file not found: {p}")
+    data = _read_yaml(p)
+    if not isinstance(data, dict):
+        raise TimelineError(f"Timeline must be a mapping at the top level: {p}")
+    return data
+
+
+def apply_timeline_config(cfg: AppConfig, data: dict[str, Any]) -> AppConfig:
+    """
+    Apply repo-level settings from a timeline onto the runtime config.
+
+    Timeline values win over YAML/env defaults: the file is given explicitly
+    on the command line, so it is treated like a CLI flag.
+    """
+    if data.get("base_branch"):
+        cfg.base_branch = str(data["base_branch"])
+    if data.get("remote_name"):
+        cfg.remote_name = str(data["remote_name"])
+    if data.get("owner"):
+        cfg.owner = str(data["owner"])
+    if data.get("visibility"):
+        vis = str(data["visibility"]).lower()
+        if vis not in {"private", "public"}:
+            raise TimelineError("visibility must be 'private' or 'public'")
+        cfg.visibility = vis
+    author = data.get("author")
+    if isinstance(author, dict):
+        cfg.author_name = author.get("name") or cfg.author_name
+        cfg.author_email = author.get("email") or cfg.author_email
+    committer = data.get("committer")
+    if isinstance(committer, dict):
+        cfg.committer_name = committer.get("name") or cfg.committer_name
+        cfg.committer_email = committer.get("email") or cfg.committer_email
+    return cfg
+
+
+def _require(entry: dict[str, Any], key: str, where: str) -> Any:
+    value = entry.get(key)
+    if value in (None, ""):
+        raise TimelineError(f"{where}: missing required key {key!r}")
+    return value
+
+
+def _utc(dt: Optional[datetime], raw: Any) -> str:
+    """The normalized form of a parsed date, or the raw value if it did not parse."""
+    return dt.strftime(GIT_DATE_FORMAT) if dt is not None else str(raw)
+
+
+def _repo_step(data: dict[str, Any], cfg: AppConfig, init: dict[str, Any], date: Any) -> Step:
+    return Step(
+        "create-repo",
+        {
+            "name": str(_require(data, "repo", "timeline")),
+            "owner": cfg.owner,
+            "date": date,
+            "private": cfg.visibility == "private",
+            "public": cfg.visibility == "public",
+            "description": init.get("description") or "",
+            "readme": init.get("readme") or "README.md",
+            "branch": cfg.base_branch,
+        },
+    )
+
+
+def _branch_step(branch: str, base: str, date: str, message: Optional[str]) -> Step:
+    return Step(
+        "create-branch",
+        {"branch": branch, "base": base, "date": date, "message": message, "push": False},
+        feature=branch,
+    )
+
+
+def _commit_step(branch: str, c: dict[str, Any], date: str, where: str) -> Step:
+    touch = c.get("touch")
+    add_all = bool(c.get("add_all", False))
+    args = {
+        "branch": branch,
+        "date": date,
+        "message": str(_require(c, "message", where)),
+        "allow_empty": bool(c.get("allow_empty", not (touch or add_all))),
+        "add_all": add_all,
+        "touch": touch,
+        "push": False,
+    }
+    if c.get("author"):
+        try:
+            args["author"] = "%s <%s>" % split_ident(str(c["author"]))
+        except ConfigError as exc:
+            raise TimelineError(f"{where}: {exc}") from exc
+    return Step("commit", args, feature=branch)
+
+
+def _pr_step(branch: str, base: str, pr: dict[str, Any]) -> Step:
+    return Step(
+        "open-pr",
+        {
+            "branch": branch,
+            "base": base,
+            "title": pr.get("title"),
+            "body": pr.get("body"),
+            "draft": bool(pr.get("draft", False)),
+        },
+        feature=branch,
+    )
+
+
+def _merge_step(
+    branch: str, base: str, date: str, message: Optional[str], delete_branch: Any
+) -> Step:
+    return Step(
+        "merge-pr",
+        {
+            "branch": branch,
+            "pr": None,
+            "base": base,
+            "date": date,
+            "message": message,
+            "delete_branch": bool(delete_branch),
+        },
+        feature=branch,
+    )
+
+
+def _check_merge(
+    dates: DateBatch,
+    merges: dict[str, tuple[datetime, str]],
+    base: str,
+    branch: str,
+    merged: Optional[datetime],
+    where: str,
+) -> None:
+    """Merges into one base must be dated in plan order; `merges` keeps the latest per base."""
+    if merged is None:
+        return
+    prev = merges.get(base)
+    if prev is not None:
+        dates.check_order(
+            prev[0], merged, where,
+            f"merge_date is before the previous merge into {base!r} ({prev[1]})",
+        )  # fmt: skip
+    merges[base] = (merged, branch)
+
+
+def _feature_steps(
+    ftr: dict[str, Any],
+    index: int,
+    base: str,
+    dates: DateBatch,
+    *,
+    initial: Optional[datetime] = None,
+    merges: Optional[dict[str, tuple[datetime, str]]] = None,
+) -> Iterator[Step]:
+    """
+    Steps for one feature. Dates are parsed into `dates`, and `merges` tracks
+    the latest merge into each base so far (branch, date) across features.
+    """
+    where = f"features[{index}]"
+    if not isinstance(ftr, dict):
+        raise TimelineError(f"{where}: expected a mapping")
+    branch = str(_require(ftr, "branch", where))
+    tz = ftr.get("timezone") or dates.default_tz
+    raw_start = _require(ftr, "start_date", where)
+    start = dates.parse(raw_start, f"{where}.start_date", tz)
+    dates.check_order(initial, start, where, "start_date is before the initial commit")
+    last = start
+
+    yield _branch_step(branch, base, _utc(start, raw_start), ftr.get("message"))
+
+    for n, c in enumerate(ftr.get("commits") or []):
+        cwhere = f"{where}.commits[{n}]"
+        if not isinstance(c, dict):
+            raise TimelineError(f"{cwhere}: expected a mapping")
+        raw = _require(c, "date", cwhere)
+        when = dates.parse(raw, f"{cwhere}.date", c.get("timezone") or tz)
+        dates.check_order(start, when, cwhere, "commit is dated before the branch start_date")
+        if when is not None and (last is None or when > last):
+            last = when
+        yield _commit_step(branch, c, _utc(when, raw), cwhere)
+
+    pr = ftr.get("pr")
+    if not pr:
+        return
+    if not isinstance(pr, dict):
+        raise TimelineError(f"{where}.pr: expected a mapping")
+    yield _pr_step(branch, base, pr)
+    if pr.get("merge_date"):
+        merged = dates.parse(pr["merge_date"], f"{where}.pr.merge_date", pr.get("timezone") or tz)
+        dates.check_order(last, merged, f"{where}.pr", "merge_date is before the branch's work")
+        if merges is not None:
+            _check_merge(dates, merges, base, branch, merged, f"{where}.pr")
+        yield _merge_step(
+            branch,
+            base,
+            _utc(merged, pr["merge_date"]),
+            pr.get("merge_message"),
+            pr.get("delete_branch", True),
+        )
+
+
+def compile_plan(data: dict[str, Any], cfg: AppConfig, *, create_repo: bool = True) -> list[Step]:
+    """
+    Compile a timeline mapping into the ordered list of steps to execute.
+
+    The order mirrors docs/03-timeline-mode.md: create the repo (if
+    `initial_commit` is present), then for each feature: branch birth,
+    commits, PR, merge.
+
+    Every date is parsed here, in the zone given by the nearest `timezone`
+    key (event, feature, then timeline), and written into the steps as UTC.
+    Dates that do not parse or break the ordering rules (initial commit <=
+    branch start <= commits <= merge; merges into a base in plan order) are
+    collected and raised together as one TimelineError, before any step runs.
+    """
+    base = cfg.base_branch
+    plan: list[Step] = []
+    tz = data.get("timezone")
+    dates = DateBatch(default_tz=str(tz) if tz else None)
+
+    init = data.get("initial_commit")
+    if init and not isinstance(init, dict):
+        raise TimelineError("initial_commit: expected a mapping")
+    initial = None
+    if init and init.get("date"):
+        initial = dates.parse(init["date"], "initial_commit.date", init.get("timezone"))
+    if create_repo and init:
+        date = _utc(initial, init["date"]) if init.get("date") else None
+        plan.append(_repo_step(data, cfg, init, date))
+
+    features = data.get("features") or []
+    if not isinstance(features, list):
+        raise TimelineError("features: expected a list")
+    merges: dict[str, tuple[datetime, str]] = {}
+    for i, ftr in enumerate(features):
+        plan.extend(_feature_steps(ftr, i, base, dates, initial=initial, merges=merges))
+
+    if dates.errors:
+        shown = dates.errors[:MAX_REPORTED_ERRORS]
+        more = len(dates.errors) - len(shown)
+        lines = "\n  ".join(shown + ([f"... and {more} more"] if more else []))
+        raise TimelineError(f"Timeline has {len(dates.errors)} date error(s):\n  {lines}")
+    return plan
+
+
+def is_event_stream(path: str | Path) -> bool:
+    """True for JSONL event files (`.jsonl`/`.ndjson`), which are run with `stream_plan`."""
+    return Path(path).suffix.lower() in (".jsonl", ".ndjson")
+
+
+def _file_events(path: Path) -> Iterator[tuple[str, dict[str, Any]]]:
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            where = f"{path}:{lineno}"
+            try:
+                event = json.loads(line)
+            except ValueError as exc:
+                raise TimelineError(f"{where}: invalid JSON: {exc}") from exc
+            if not isinstance(event, dict):
+                raise TimelineError(f"{where}: expected a JSON object")
+            yield where, event
+
+
+def _events(
+    source: str | Path | Iterable[dict[str, Any]],
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """(location, event) pairs from a JSONL file or from events produced in-process."""
+    if isinstance(source, (str, Path)):
+        yield from _file_events(Path(source))
+        return
+    for n, event in enumerate(source, 1):
+        yield f"event {n}", event
+
+
+def read_stream_header(path: str | Path) -> dict[str, Any]:
+    """
+    Return the `{"event": "timeline", ...}` header of a JSONL event file, or
+    {} if the first event is something else. Only the first line is read.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise ConfigError(f"Timeline file not found: {p}")
+    for _, event in _file_events(p):
+        return event if event.get("event") == "timeline" else {}
+    return {}
+
+
+@dataclass
+class _Live:
+    """What the stream remembers about a branch until it is merged and deleted."""
+
+    base: str
+    tz: Optional[str]
+    start: Optional[datetime]
+    last: Optional[datetime]
+
+
+def stream_plan(
+    source: str | Path | Iterable[dict[str, Any]], cfg: AppConfig, *, create_repo: bool = True
+) -> Iterator[Step]:
+    """
+    Compile a JSONL event file (or an iterable of the same events, e.g. from
+    `legends generate`) into steps lazily, one event at a time.
+
+    Each line is one JSON object with an `event` of "branch", "commit", "pr"
+    or "merge" (see docs/03-timeline-mode.md); an optional first line with
+    `"event": "timeline"` carries the same repo-level keys as a YAML
+    timeline. Events are checked against what came before them (the same
+    date rules as `compile_plan`) and a bad event raises TimelineError when
+    it is reached, after the steps before it have run. Only branches that
+    are still open are remembered, so memory does not grow with file length.
+    """
+    dates = DateBatch()
+    live: dict[str, _Live] = {}
+    merges: dict[str, tuple[datetime, str]] = {}
+    initial: Optional[datetime] = None
+    first = True
+
+    for where, ev in _events(source):
+        if ev.get("event") != "timeline":
+            first = False
+            step = _stream_step(ev, where, cfg, dates, live, merges, initial)
+            if dates.errors:
+                raise TimelineError("; ".join(dates.errors))
+            yield step
+            continue
+
+        if not first:
+            raise TimelineError(f"{where}: the timeline header must be the first event")
+        first = False
+        dates.default_tz = str(ev["timezone"]) if ev.get("timezone") else None
+        init = ev.get("initial_commit")
+        if init and not isinstance(init, dict):
+            raise TimelineError(f"{where}: initial_commit: expected a mapping")
+        date = None
+        if init and init.get("date"):
+            initial = dates.parse(init["date"], where, init.get("timezone"))
+            if dates.errors:
+                raise TimelineError("; ".join(dates.errors))
+            date = _utc(initial, init["date"])
+        if create_repo and init:
+            yield _repo_step(ev, cfg, init, date)
+
+
+def _stream_step(
+    ev: dict[str, Any],
+    where: str,
+    cfg: AppConfig,
+    dates: DateBatch,
+    live: dict[str, _Live],
+    merges: dict[str, tuple[datetime, str]],
+    initial: Optional[datetime],
+) -> Step:
+    kind = ev.get("event")
+    branch = str(_require(ev, "branch", where))
+    state = live.get(branch)
+    if kind == "branch":
+        if state is not None:
+            raise TimelineError(f"{where}: branch {branch!r} already exists")
+        base = str(ev.get("base") or cfg.base_branch)
+        tz = ev.get("timezone") or dates.default_tz
+        raw = _require(ev, "date", where)
+        start = dates.parse(raw, where, tz)
+        dates.check_order(initial, start, where, "branch is dated before the initial commit")
+        live[branch] = _Live(base, tz, start, start)
+        return _branch_step(branch, base, _utc(start, raw), ev.get("message"))
+
+    if kind not in ("commit", "pr", "merge"):
+        raise TimelineError(f"{where}: unknown event {kind!r}")
+    if state is None:
+        raise TimelineError(f"{where}: {kind} on branch {branch!r}, which has no branch event")
+    if kind == "pr":
+        return _pr_step(branch, state.base, ev)
+
+    raw = _require(ev, "date", where)
+    when = dates.parse(raw, where, ev.get("timezone") or state.tz)
+    if kind == "commit":
+        dates.check_order(state.start, when, where, "commit is dated before its branch event")
+        if when is not None and (state.last is None or when > state.last):
+            state.last = when
+        return _commit_step(branch, ev, _utc(when, raw), where)
+
+    dates.check_order(state.last, when, where, "merge is dated before the branch's work")
+    _check_merge(dates, merges, state.base, branch, when, where)
+    delete = ev.get("delete_branch", True)
+    if delete:
+        del live[branch]
+    return _merge_step(branch, state.base, _utc(when, raw), ev.get("message"), delete)
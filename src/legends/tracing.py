@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+# Longest command line kept in a span; commit messages and PR bodies can be long.
+MAX_CMD = 240
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "legends_span", default=None
+)
+
+
+class Span:
+    """
+    One timed section. Use as a context manager; `set` adds arguments (exit
+    code, sizes) before it closes. Spans nest through a context variable, so
+    work handed to threads with the caller's context (asyncio.to_thread, the
+    PR pool) keeps its parent step.
+    """
+
+    __slots__ = ("tracer", "name", "cat", "args", "parent", "step", "start", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self) -> "Span":
+        self.parent = _current.get()
+        parent_step = self.parent.step if self.parent is not None else None
+        self.step = self.name if self.cat == "step" else parent_step
+        self._token = _current.set(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def set(self, **args: Any) -> None:
+        self.args.update(args)
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter_ns()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        if self.parent is not None:
+            self.args["parent"] = self.parent.name
+        if self.step is not None and self.step != self.name:
+            self.args["step"] = self.step
+        self.tracer.add(self.name, self.cat, self.start, end - self.start, self.args)
+        return False
+
+
+class _NullSpan:
+    """What `span` returns while tracing is off: does nothing, allocates nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **args: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects finished spans as Chrome trace "complete" events (chrome://tracing, Perfetto)."""
+
+    def __init__(self, name: str = "legends"):
+        self.name = name
+        self.events: list[dict[str, Any]] = []
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, cat: str, start_ns: int, dur_ns: int, args: dict[str, Any]) -> None:
+        tid = threading.get_native_id()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start_ns - self.origin) / 1000,
+            "dur": dur_ns / 1000,
+            "pid": self.pid,
+            "tid": tid,
+            "args": args,
+        }
+        with self._lock:
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            self.events.append(event)
+
+    def merge(self, events: list[dict[str, Any]], origin: int) -> None:
+        """
+        Add the events of another process's tracer, started at `origin`, moved
+        onto this tracer's timeline. They keep their own pid, so they show up
+        as a process of their own; perf_counter is system-wide, so the offset
+        between the two origins lines them up.
+        """
+        shift = (origin - self.origin) / 1000
+        moved = [{**e, "ts": e["ts"] + shift} if "ts" in e else e for e in events]
+        with self._lock:
+            self.events.extend(moved)
+
+    def to_json(self) -> dict[str, Any]:
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": n}}
+            for tid, n in self._threads.items()
+        ]
+        meta.append(
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.name}}
+        )
+        return {"traceEvents": meta + self.events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str | Path) -> None:
+        with self._lock:
+            data = self.to_json()
+        Path(path).write_text(json.dumps(data), encoding="utf-8")
+
+
+_TRACER: Optional[Tracer] = None
+
+
+def start(name: str = "legends") -> Tracer:
+    """Start recording spans for this process."""
+    global _TRACER
+    _TRACER = Tracer(name)
+    return _TRACER
+
+
+def active() -> Optional[Tracer]:
+    """The tracer recording this process's spans, if tracing is on."""
+    return _TRACER
+
+
+def stop(path: str | Path | None = None) -> Optional[Tracer]:
+    """Stop recording; write the Chrome trace to `path` when given."""
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    if tracer is not None and path:
+        tracer.write(path)
+    return tracer
+
+
+def span(name: str, cat: str = "legends", **args: Any):
+    """A span named `name`, or a shared no-op when tracing is off."""
+    tracer = _TRACER
+    if tracer is None:
+        return NULL_SPAN
+    return Span(tracer, name, cat, args)
+
+
+def command_span(argv: Sequence[str]):
+    """A span for running `argv`, named after the tool and its subcommand ('git push')."""
+    tracer = _TRACER
+    if tracer is None:
+        return NULL_SPAN
+    sub = next((a for a in argv[1:] if not a.startswith("-")), "")
+    cmd = " ".join(argv)
+    if len(cmd) > MAX_CMD:
+        cmd = cmd[: MAX_CMD - 3] + "..."
+    return Span(tracer, f"{argv[0]} {sub}".strip(), argv[0], {"cmd": cmd})
+
+
+def record_result(sp, returncode: Optional[int], stdout: str | bytes, stderr: str | bytes) -> None:
+    """Add exit code and output sizes to a command span (no-op for the null span)."""
+    if sp is NULL_SPAN:
+        return
+    sp.set(
+        exit=returncode,
+        out_bytes=len(stdout.encode("utf-8") if isinstance(stdout, str) else stdout),
+        err_bytes=len(stderr.encode("utf-8") if isinstance(stderr, str) else stderr),
+    )
@@ -4,14 +4,13 @@ import contextlib
 import json
 import logging
 import os
-import shutil
-import subprocess
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import re
 from pathlib import Path
 from typing import Iterator, Sequence, Tuple, Optional
 
-from .exceptions import CommandError, ToolNotFound, DateParseError
+from .core.dates import normalize_git_date
+from .exceptions import CommandError, ConfigError, ToolNotFound
+from .executor import RunResult, default_executor, which
 
 LOG = logging.getLogger("legends")
 _handler = logging.StreamHandler()
@@ -22,22 +21,14 @@ LOG.setLevel(logging.INFO)
 
 
 def ensure_tool(name: str, hint: str | None = None) -> None:
-    """Ensure an external tool is available on PATH."""
-    if shutil.which(name) is None:
+    """Ensure an external tool is available on PATH (looked up once per process)."""
+    if which(name) is None:
         raise ToolNotFound(
             name,
             hint=(hint or f"Install {name!r} and ensure it is available on PATH."),
         )
 
 
-@dataclass
-class RunResult:
-    cmd: list[str]
-    returncode: int
-    stdout: str
-    stderr: str
-
-
 def _run(
     cmd: Sequence[str],
     *,
@@ -45,24 +36,11 @@ def _run(
     env: dict[str, str] | None = None,
     check: bool = True,
     capture: bool = True,
+    input: str | None = None,
 ) -> RunResult:
     """Run a command and optionally raise CommandError on failure."""
     LOG.debug("RUN: %s", " ".join(cmd))
-    kwargs = {
-        "cwd": str(cwd) if cwd else None,
-        "env": env,
-        "text": True,
-    }
-    if capture:
-        kwargs.update({"stdout": subprocess.PIPE, "stderr": subprocess.PIPE})
-    else:
-        kwargs.update({"stdout": None, "stderr": None})
-
-    proc = subprocess.run(list(cmd), **kwargs)
-    out, err = (proc.stdout or ""), (proc.stderr or "")
-    if check and proc.returncode != 0:
-        raise CommandError(list(cmd), proc.returncode, out, err)
-    return RunResult(list(cmd), proc.returncode, out, err)
+    return default_executor().run(cmd, cwd=cwd, env=env, check=check, capture=capture, input=input)
 
 
 def git(args: Sequence[str], **kwargs) -> RunResult:
@@ -70,44 +48,15 @@ def git(args: Sequence[str], **kwargs) -> RunResult:
     return _run(["git", *args], **kwargs)
 
 
-def gh(args: Sequence[str], **kwargs) -> RunResult:
-    ensure_tool("gh", "See https://cli.github.com/")
-    return _run(["gh", *args], **kwargs)
-
-
-def normalize_git_date(date_str: str) -> str:
-    """
-    Normalize input into 'YYYY-MM-DDTHH:MM:SSZ' (UTC).
+def gh(args: Sequence[str], *, check: bool = True, **kwargs) -> RunResult:
+    """Run gh, paced and retried by the process-wide GitHub scheduler (see ratelimit.py)."""
+    from .ratelimit import github_scheduler
 
-    Accepts:
-      - YYYY-MM-DD
-      - YYYY-MM-DD HH:MM[:SS]
-      - YYYY-MM-DDTHH:MM[:SS]
-      - with optional 'Z' or '+/-HH:MM' offset
-
-    Naive (no offset) times are treated as *local time* and converted to UTC.
-    """
-    if not date_str:
-        raise DateParseError("Empty date string")
-
-    s = date_str.strip().replace(" ", "T")
-    if len(s) == 10 and s.count("-") == 2:
-        s = s + "T00:00:00"
-
-    try:
-        if s.endswith("Z"):
-            dt = datetime.fromisoformat(s[:-1])
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        dt = datetime.fromisoformat(s)
-        if dt.tzinfo is None:
-            local_tz = datetime.now().astimezone().tzinfo or timezone.utc
-            dt = dt.replace(tzinfo=local_tz)
-        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    except Exception as exc:
-        raise DateParseError(f"Could not parse date: {date_str!r}") from exc
+    ensure_tool("gh", "See https://cli.github.com/")
+    res = github_scheduler().call(args, lambda a: _run(["gh", *a], check=False, **kwargs))
+    if check and res.returncode != 0:
+        raise CommandError(res.cmd, res.returncode, res.stdout, res.stderr)
+    return res
 
 
 def build_commit_env(
@@ -147,47 +96,40 @@ def build_commit_env(
     return env
 
 
+_IDENT = re.compile(r"\s*(.*?)\s*<([^<>\s]+)>\s*")
+
+
+def split_ident(value: str) -> Tuple[str, str]:
+    """Split a git-style identity 'Name <email>' into (name, email)."""
+    m = _IDENT.fullmatch(value or "")
+    if not m or not m.group(1):
+        raise ConfigError(f"Expected an identity like 'Name <email>', got {value!r}")
+    return m.group(1), m.group(2)
+
+
 def resolve_github_identity(prefer_verified: bool = True) -> Tuple[Optional[str], Optional[str]]:
     """
     Resolve the current GitHub identity from the authenticated `gh` CLI.
 
-    Returns: (name, email) where email is either a verified primary email
-    (when token has `user:email` scope) or the ID-based noreply
-    '<id>+<login>@users.noreply.github.com'. On failure, returns (None, None).
+    Returns: (name, email) where email is a verified primary email (when
+    token has `user:email` scope), else the public profile email, else the
+    ID-based noreply '<id>+<login>@users.noreply.github.com'. On failure,
+    returns (None, None). Served from the on-disk identity cache when fresh.
     """
-    try:
-        ensure_tool("gh", "See https://cli.github.com/")
-        login = gh(["api", "user", "--jq", ".login"]).stdout.strip()
-        uid = gh(["api", "user", "--jq", ".id"]).stdout.strip()
-        name = gh(["api", "user", "--jq", ".name // \"\""]).stdout.strip() or login
-
-        email: Optional[str] = None
-        if prefer_verified:
-            try:
-                email = gh(
-                    ["api", "user/emails", "--jq", "map(select(.primary==true and .verified==true)) | .[0].email"]
-                ).stdout.strip() or None
-            except CommandError:
-                email = None
-
-        if not email:
-            if login and uid:
-                email = f"{uid}+{login}@users.noreply.github.com"
-            elif login:
-                email = f"{login}@users.noreply.github.com"
-        return (name, email)
-    except Exception:
+    from .identity import github_identity
+
+    ident = github_identity(prefer_verified=prefer_verified)
+    if ident is None:
         return (None, None)
+    return (ident.name, ident.email)
 
 
 def resolve_github_login() -> Optional[str]:
     """Return the authenticated GitHub username (login), or None on failure."""
-    try:
-        ensure_tool("gh", "See https://cli.github.com/")
-        login = gh(["api", "user", "--jq", ".login"]).stdout.strip()
-        return login or None
-    except Exception:
-        return None
+    from .identity import github_identity
+
+    ident = github_identity()
+    return ident.login if ident else None
 
 
 @contextlib.contextmanager
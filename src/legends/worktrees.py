@@ -0,0 +1,104 @@
+"""
+One `git worktree` per feature branch, for `run-timeline --backend worktree`.
+
+The dag backend already overlaps network work with local work, but every
+local step checks out in the one working tree, so commits on different
+branches still take turns. Here each branch gets its own working tree under
+`.git/legends/worktrees/`, with its own index and HEAD. Commits on different
+branches then run at the same time. Merges are made in the working tree of
+their base, one at a time and in plan order, which is merge-date order.
+A branch's worktree is removed once the branch is merged, and every
+remaining worktree is removed when the run ends.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .config import AppConfig
+from .utils import LOG, git
+
+
+class Worktrees:
+    """
+    Working trees by branch. The branch checked out in the main working tree
+    (normally the base branch) is worked on there; any other branch gets a
+    worktree the first time it is used.
+    """
+
+    def __init__(self, cfg: AppConfig, root: str | Path):
+        self.cfg = cfg
+        self.root = Path(root).resolve()
+        self.dir = self.root / ".git" / "legends" / "worktrees"
+        self.main = cfg.base_branch
+        self.trees: dict[str, Path] = {}
+        # `git worktree add/remove` edit .git/worktrees/ without locking it.
+        self._admin = threading.Lock()
+
+    def lock(self, branch: str) -> str:
+        """The DAG lock for work on `branch`: one per working tree."""
+        return "" if branch == self.main else branch
+
+    def _git(self, args: list[str], cwd: Path, env: Optional[dict] = None) -> None:
+        LOG.info("git %s (in %s)", " ".join(args), cwd.name)
+        if not self.cfg.dry_run:
+            # No auto-gc: it would repack refs under the feet of the other trees.
+            git(["-c", "gc.auto=0", *args], cwd=cwd, env=env)
+
+    def _add(self, branch: str, start: str, *, new: bool = False) -> Path:
+        path = self.dir / branch.replace("/", "--")
+        opts = ["-b", branch] if new else []
+        with self._admin:
+            self._git(["worktree", "add", "-q", *opts, str(path), start], self.root)
+            self.trees[branch] = path
+        return path
+
+    def tree(self, branch: str) -> Path:
+        """The working tree `branch` is checked out in, adding one if needed."""
+        if branch == self.main:
+            return self.root
+        return self.trees.get(branch) or self._add(branch, branch)
+
+    def create_branch(self, branch: str, base: str, message: str, env: dict) -> None:
+        path = self._add(branch, base, new=True)
+        self._git(["commit", "--allow-empty", "-m", message], path, env)
+
+    def commit(self, a: dict, env: dict) -> None:
+        path = self.tree(a["branch"])
+        if a.get("touch"):
+            if not self.cfg.dry_run:
+                f = path / a["touch"]
+                f.parent.mkdir(parents=True, exist_ok=True)
+                f.touch()
+            self._git(["add", a["touch"]], path)
+        if a.get("add_all"):
+            self._git(["add", "-A"], path)
+        args = ["commit", "-m", a["message"]]
+        if a.get("allow_empty"):
+            args.insert(1, "--allow-empty")
+        self._git(args, path, env)
+
+    def merge(self, base: str, branch: str, message: str, env: dict) -> None:
+        """Record a --no-ff merge of `branch` in `base`'s tree, then drop `branch`'s tree."""
+        path = self.tree(base)
+        self._git(["merge", "--no-ff", "--no-commit", branch], path)
+        self._git(["commit", "-m", message], path, env)
+        self.remove(branch)
+
+    def remove(self, branch: str) -> None:
+        with self._admin:
+            path = self.trees.pop(branch, None)
+            if path is not None:
+                self._git(["worktree", "remove", "--force", str(path)], self.root)
+
+    def close(self) -> None:
+        """Remove every worktree this run added (the branches stay)."""
+        for branch in list(self.trees):
+            self.remove(branch)
+        with self._admin:
+            self._git(["worktree", "prune"], self.root)
+        with contextlib.suppress(OSError):
+            self.dir.rmdir()